@@ -2,12 +2,10 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
-import time
-
 from diem import (
-    diem_types,
     stdlib,
     testnet,
+    txnbuilder,
     utils,
     LocalAccount,
 )
@@ -22,25 +20,20 @@ def test_create_child_vasp():
 
     child_vasp = LocalAccount.generate()
     currency = testnet.TEST_CURRENCY_CODE
-    raw_txn = diem_types.RawTransaction(
-        sender=parent_vasp.account_address,
-        sequence_number=seq_num,
-        payload=diem_types.TransactionPayload__Script(
-            stdlib.encode_create_child_vasp_account_script(
-                coin_type=utils.currency_code(currency),
-                child_address=child_vasp.account_address,
-                auth_key_prefix=child_vasp.auth_key.prefix(),
-                add_all_currencies=False,
-                child_initial_balance=100_000_000,
-            )
+    builder = txnbuilder.TransactionBuilder(
+        txnbuilder.TransactionTemplate(sender=parent_vasp.account_address, chain_id=testnet.CHAIN_ID, currency=currency)
+    )
+    raw_txn = builder.build(
+        seq_num,
+        stdlib.encode_create_child_vasp_account_script(
+            coin_type=utils.currency_code(currency),
+            child_address=child_vasp.account_address,
+            auth_key_prefix=child_vasp.auth_key.prefix(),
+            add_all_currencies=False,
+            child_initial_balance=100_000_000,
         ),
-        max_gas_amount=1_000_000,
-        gas_unit_price=0,
-        gas_currency_code=currency,
-        expiration_timestamp_secs=int(time.time()) + 30,
-        chain_id=testnet.CHAIN_ID,
     )
-    txn = parent_vasp.sign(raw_txn)
+    txn = builder.sign(parent_vasp, raw_txn).hex()
     client.submit(txn)
     executed_txn = client.wait_for_transaction(txn)
     assert executed_txn is not None
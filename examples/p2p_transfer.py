@@ -1,14 +1,14 @@
 # Copyright (c) The Diem Core Contributors
 # SPDX-License-Identifier: Apache-2.0
 
-import time, secrets, typing
+import secrets, typing
 
 from diem import (
     identifier,
     jsonrpc,
-    diem_types,
     stdlib,
     testnet,
+    txnbuilder,
     txnmetadata,
     utils,
     LocalAccount,
@@ -34,9 +34,7 @@ def test_non_custodial_to_non_custodial():
         metadata_signature=b"",
     )
     seq_num = client.get_account_sequence(sender.account_address)
-    txn = create_transaction(sender, seq_num, script, testnet.TEST_CURRENCY_CODE)
-
-    signed_txn = sender.sign(txn)
+    signed_txn = create_signed_transaction(sender, seq_num, script, testnet.TEST_CURRENCY_CODE)
     client.submit(signed_txn)
     executed_txn = client.wait_for_transaction(signed_txn)
     assert executed_txn is not None
@@ -61,9 +59,7 @@ def test_non_custodial_to_custodial():
         metadata_signature=b"",  # only travel rule metadata requires signature
     )
     seq_num = client.get_account_sequence(sender.account_address)
-    txn = create_transaction(sender, seq_num, script, intent.currency_code)
-
-    signed_txn = sender.sign(txn)
+    signed_txn = create_signed_transaction(sender, seq_num, script, intent.currency_code)
     client.submit(signed_txn)
     executed_txn = client.wait_for_transaction(signed_txn)
     assert executed_txn is not None
@@ -89,9 +85,7 @@ def test_custodial_to_non_custodial():
 
     sender = sender_custodial.available_child_vasp()
     seq_num = client.get_account_sequence(sender.account_address)
-    txn = create_transaction(sender, seq_num, script, currency_code)
-
-    signed_txn = sender.sign(txn)
+    signed_txn = create_signed_transaction(sender, seq_num, script, currency_code)
     client.submit(signed_txn)
     executed_txn = client.wait_for_transaction(signed_txn)
     assert executed_txn is not None
@@ -118,9 +112,7 @@ def test_custodial_to_custodial_under_threshold():
 
     sender = sender_custodial.available_child_vasp()
     seq_num = client.get_account_sequence(sender.account_address)
-    txn = create_transaction(sender, seq_num, script, intent.currency_code)
-
-    signed_txn = sender.sign(txn)
+    signed_txn = create_signed_transaction(sender, seq_num, script, intent.currency_code)
     client.submit(signed_txn)
     executed_txn = client.wait_for_transaction(signed_txn)
     assert executed_txn is not None
@@ -156,22 +148,15 @@ def test_custodial_to_custodial_above_threshold():
     )
 
     seq_num = client.get_account_sequence(sender.account_address)
-    txn = create_transaction(sender, seq_num, script, intent.currency_code)
-
-    signed_txn = sender.sign(txn)
+    signed_txn = create_signed_transaction(sender, seq_num, script, intent.currency_code)
     client.submit(signed_txn)
     executed_txn = client.wait_for_transaction(signed_txn)
     assert executed_txn is not None
 
 
-def create_transaction(sender, sender_account_sequence, script, currency):
-    return diem_types.RawTransaction(
-        sender=sender.account_address,
-        sequence_number=sender_account_sequence,
-        payload=diem_types.TransactionPayload__Script(script),
-        max_gas_amount=1_000_000,
-        gas_unit_price=0,
-        gas_currency_code=currency,
-        expiration_timestamp_secs=int(time.time()) + 30,
-        chain_id=testnet.CHAIN_ID,
+def create_signed_transaction(sender, sender_account_sequence, script, currency) -> str:
+    builder = txnbuilder.TransactionBuilder(
+        txnbuilder.TransactionTemplate(sender=sender.account_address, chain_id=testnet.CHAIN_ID, currency=currency)
     )
+    raw_txn = builder.build(sender_account_sequence, script)
+    return builder.sign(sender, raw_txn).hex()
@@ -33,9 +33,7 @@ def test_refund_transaction_of_custodial_to_custodial_under_threshold():
     )
 
     sender = sender_custodial.available_child_vasp()
-    txn = sender_custodial.create_transaction(sender, script, intent.currency_code)
-
-    signed_txn = sender.sign(txn)
+    signed_txn = sender_custodial.create_signed_transaction(sender, script, intent.currency_code)
     client.submit(signed_txn)
     executed_txn = client.wait_for_transaction(signed_txn)
 
@@ -60,6 +58,6 @@ def test_refund_transaction_of_custodial_to_custodial_under_threshold():
 
     # receiver is sender of refund txn
     sender = receiver_custodial.available_child_vasp()
-    txn = receiver_custodial.create_transaction(sender, refund_txn_script, currency_code)
-    refund_executed_txn = receiver_custodial.submit_and_wait(sender.sign(txn))
+    txn = receiver_custodial.create_signed_transaction(sender, refund_txn_script, currency_code)
+    refund_executed_txn = receiver_custodial.submit_and_wait(txn)
     assert refund_executed_txn is not None
@@ -1,7 +1,7 @@
 # Copyright (c) The Diem Core Contributors
 # SPDX-License-Identifier: Apache-2.0
 
-import time, secrets, typing
+import secrets, typing
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 from diem import (
     identifier,
@@ -9,6 +9,7 @@ from diem import (
     diem_types,
     stdlib,
     testnet,
+    txnbuilder,
     utils,
     LocalAccount,
 )
@@ -28,6 +29,7 @@ class CustodialApp:
     _client: jsonrpc.Client
     _children: typing.List[LocalAccount]
     _users: typing.List[bytes]
+    _subaddresses: identifier.SubaddressRegistry
 
     compliance_key: typing.Optional[Ed25519PrivateKey]
 
@@ -41,11 +43,12 @@ class CustodialApp:
         self._chain_id = testnet.CHAIN_ID
         self._children = []
         self._users = []
+        self._subaddresses = identifier.SubaddressRegistry()
 
     def add_child_vasp(self) -> jsonrpc.Transaction:
         child_vasp = LocalAccount.generate()
         self._children.append(child_vasp)
-        txn = self.create_transaction(
+        txn = self.create_signed_transaction(
             self._parent_vasp,
             stdlib.encode_create_child_vasp_account_script(
                 coin_type=utils.currency_code(testnet.TEST_CURRENCY_CODE),
@@ -57,21 +60,21 @@ class CustodialApp:
             testnet.TEST_CURRENCY_CODE,
         )
 
-        return self.submit_and_wait(self._parent_vasp.sign(txn))
+        return self.submit_and_wait(txn)
 
     def init_compliance_keys(self) -> jsonrpc.Transaction:
         self.compliance_key = Ed25519PrivateKey.generate()
-        txn = self.create_transaction(
+        txn = self.create_signed_transaction(
             self._parent_vasp,
             stdlib.encode_rotate_dual_attestation_info_script(
                 new_url=b"http://helloworld.org", new_key=utils.public_key_bytes(self.compliance_key.public_key())
             ),
             testnet.TEST_CURRENCY_CODE,
         )
-        return self.submit_and_wait(self._parent_vasp.sign(txn))
+        return self.submit_and_wait(txn)
 
     def add_user(self):
-        self._users.append(identifier.gen_subaddress())
+        self._users.append(self._subaddresses.allocate(len(self._users)))
 
     def payment(self, user_id: int, amount: int) -> str:
         account_id = identifier.encode_account(
@@ -83,6 +86,9 @@ class CustodialApp:
     def find_user_sub_address_by_id(self, user_id: int) -> bytes:
         return self._users[user_id]
 
+    def find_user_id_by_sub_address(self, sub_address: bytes) -> typing.Optional[int]:
+        return self._subaddresses.find_user_id(sub_address)
+
     def get_sequence_number(self, account: LocalAccount) -> int:
         return self._client.get_account_sequence(account.account_address)
 
@@ -96,15 +102,9 @@ class CustodialApp:
         self._client.submit(txn)
         return self._client.wait_for_transaction(txn)
 
-    def create_transaction(self, sender, script, currency) -> diem_types.RawTransaction:
-        sender_account_sequence = self.get_sequence_number(sender)
-        return diem_types.RawTransaction(
-            sender=sender.account_address,
-            sequence_number=sender_account_sequence,
-            payload=diem_types.TransactionPayload__Script(script),
-            max_gas_amount=1_000_000,
-            gas_unit_price=0,
-            gas_currency_code=currency,
-            expiration_timestamp_secs=int(time.time()) + 30,
-            chain_id=self._chain_id,
+    def create_signed_transaction(self, sender, script, currency) -> str:
+        builder = txnbuilder.TransactionBuilder(
+            txnbuilder.TransactionTemplate(sender=sender.account_address, chain_id=self._chain_id, currency=currency)
         )
+        raw_txn = builder.build(self.get_sequence_number(sender), script)
+        return builder.sign(sender, raw_txn).hex()
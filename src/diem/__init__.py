@@ -1,8 +1,71 @@
 # Copyright (c) The Diem Core Contributors
 # SPDX-License-Identifier: Apache-2.0
 
-"""Python client sdk library for the [Diem](https://libra.org) blockchain network."""
+"""Python client sdk library for the [Diem](https://libra.org) blockchain network.
 
-from .utils import InvalidAccountAddressError, InvalidSubAddressError
-from .auth_key import AuthKey
-from .local_account import LocalAccount
+Submodules and the classes exported below are imported on first access, so that `import diem`
+does not load the generated modules (`stdlib`, `diem_types`), `jsonrpc` (protobuf, requests)
+and numpy until they are used.
+"""
+
+import importlib, typing
+
+if typing.TYPE_CHECKING:
+    from .utils import InvalidAccountAddressError, InvalidSubAddressError
+    from .auth_key import AuthKey
+    from .signer import Signer
+    from .local_account import LocalAccount
+
+
+# exported name => module defines it; submodules are listed in `_SUBMODULES`, which must include all
+# modules and packages of diem
+_EXPORTS: typing.Dict[str, str] = {
+    "InvalidAccountAddressError": "utils",
+    "InvalidSubAddressError": "utils",
+    "AuthKey": "auth_key",
+    "Signer": "signer",
+    "LocalAccount": "local_account",
+}
+
+__all__: typing.List[str] = list(_EXPORTS)
+
+_SUBMODULES: typing.Set[str] = {
+    "auth_key",
+    "chain_ids",
+    "diem_types",
+    "dual_attestation",
+    "hashtable",
+    "identifier",
+    "jsonrpc",
+    "keygen",
+    "lcs",
+    "local_account",
+    "p2p_script",
+    "payment_router",
+    "script_decoder",
+    "serde_binary",
+    "serde_types",
+    "signer",
+    "stdlib",
+    "testing",
+    "testnet",
+    "txnbuilder",
+    "txnmetadata",
+    "utils",
+    "vasp_index",
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> typing.List[str]:
+    return sorted(set(globals()) | set(_EXPORTS) | _SUBMODULES)
@@ -5,15 +5,17 @@
 
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
 from . import utils, diem_types
+import typing
 
 
 class AuthKey:
     """Diem Authentication Key
 
     Wraps authentication key bytes, derives account address and authentication key prefix.
+    Derived values are computed on first call and cached until data is changed.
     """
 
-    data: bytes
+    __slots__ = ("_data", "_account_address", "_prefix", "_hex")
 
     @staticmethod
     def from_public_key(public_key: Ed25519PublicKey) -> "AuthKey":
@@ -23,11 +25,28 @@ class AuthKey:
     def __init__(self, data: bytes) -> None:
         self.data = data
 
+    @property
+    def data(self) -> bytes:
+        return self._data
+
+    @data.setter
+    def data(self, data: bytes) -> None:
+        self._data = data
+        self._account_address: typing.Optional[diem_types.AccountAddress] = None
+        self._prefix: typing.Optional[bytes] = None
+        self._hex: typing.Optional[str] = None
+
     def account_address(self) -> diem_types.AccountAddress:
-        return utils.account_address(self.data[-utils.ACCOUNT_ADDRESS_LEN :])
+        if self._account_address is None:
+            self._account_address = utils.account_address(self.data[-utils.ACCOUNT_ADDRESS_LEN :])
+        return self._account_address
 
     def prefix(self) -> bytes:
-        return self.data[: -utils.ACCOUNT_ADDRESS_LEN]
+        if self._prefix is None:
+            self._prefix = self.data[: -utils.ACCOUNT_ADDRESS_LEN]
+        return self._prefix
 
     def hex(self) -> str:
-        return self.data.hex()
+        if self._hex is None:
+            self._hex = self.data.hex()
+        return self._hex
@@ -0,0 +1,277 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Signs and verifies dual attestation (travel rule) metadata signatures in batch.
+
+For a peer to peer transfer above the travel rule threshold, the receiver VASP signs the
+`txnmetadata.travel_rule` signature message with its compliance key, and the sender VASP submits
+the transaction with the metadata signature. Requests are `(reference_id, sender_address, amount)`
+tuples, signature messages are built from the cached metadata prefix and attest suffix by
+`txnmetadata.travel_rule`, and signatures are signed / verified by chunks in a worker pool: the
+shared thread pool of this module by default (Ed25519 signing and verifying release the GIL), or
+any given `concurrent.futures.Executor`:
+
+```python
+
+from diem import dual_attestation
+
+# receiver VASP
+results = dual_attestation.sign(receiver_vasp.compliance_key, requests)
+
+# sender VASP, receiver compliance key is looked up from the receiver parent VASP account and cached
+keys = dual_attestation.ComplianceKeyCache(client)
+assert all(keys.verify(receiver_address, requests, [signature for _, signature in results]))
+
+# keep cached keys up to date with the rotation events
+for key, start in keys.rotation_events_keys():
+    keys.observe(client.get_events(key, start, 100))
+```
+"""
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+import os, threading, typing
+
+from . import diem_types, txnmetadata, utils
+from .jsonrpc.constants import EVENT_DATA_BASE_URL_ROTATION, EVENT_DATA_COMPLIANCE_KEY_ROTATION
+
+if typing.TYPE_CHECKING:
+    from . import jsonrpc
+
+
+DEFAULT_CHUNK_SIZE: int = 1000
+# number of threads of the shared worker pool, which is created on first use
+DEFAULT_WORKERS: int = min(32, (os.cpu_count() or 1) + 4)
+
+# (off-chain reference id, sender account address, amount)
+Request = typing.Tuple[str, typing.Union[diem_types.AccountAddress, str], int]
+
+
+def signing_msgs(requests: typing.Iterable[Request]) -> typing.List[typing.Tuple[bytes, bytes]]:
+    """returns (metadata, signature message) of travel rule requests"""
+
+    return [txnmetadata.travel_rule(reference_id, sender, amount) for reference_id, sender, amount in requests]
+
+
+def sign(
+    compliance_key: Ed25519PrivateKey,
+    requests: typing.Sequence[Request],
+    executor: typing.Optional[Executor] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> typing.List[typing.Tuple[bytes, bytes]]:
+    """sign travel rule requests with the compliance key, returns (metadata, signature) of the requests
+
+    Chunks of `chunk_size` messages are signed by the given executor, or by the shared thread pool if
+    no executor is given; thread pool workers share the key object.
+    WARN: for other executors, e.g. a `concurrent.futures.ProcessPoolExecutor`, the raw private key
+    bytes are sent to executor workers with every chunk.
+    """
+
+    metadatas, msgs = _unzip(signing_msgs(requests))
+    key: typing.Union[Ed25519PrivateKey, bytes] = compliance_key
+    if executor is not None and not isinstance(executor, ThreadPoolExecutor):
+        key = compliance_key.private_bytes(
+            serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+        )
+    signatures = _map_chunks(_sign_chunk, key, [msgs], executor, chunk_size)
+    return list(zip(metadatas, signatures))
+
+
+def verify(
+    compliance_public_key: Ed25519PublicKey,
+    requests: typing.Sequence[Request],
+    signatures: typing.Sequence[bytes],
+    executor: typing.Optional[Executor] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> typing.List[bool]:
+    """verify travel rule signatures of the requests with the compliance public key, returns result of each
+
+    Chunks of `chunk_size` signatures are verified by the given executor, or by the shared thread pool
+    if no executor is given.
+    """
+
+    if len(requests) != len(signatures):
+        raise ValueError(f"got {len(signatures)} signatures for {len(requests)} requests")
+    _, msgs = _unzip(signing_msgs(requests))
+    key = utils.public_key_bytes(compliance_public_key)
+    return _map_chunks(_verify_chunk, key, [msgs, list(signatures)], executor, chunk_size)
+
+
+class ComplianceKeyCache:
+    """ComplianceKeyCache caches (base_url, compliance public key) of VASP accounts
+
+    Keys are looked up like `Client.get_base_url_and_compliance_key`: child VASP accounts resolve
+    to their parent VASP account, and the child to parent mapping is cached too, as it never changes.
+    Cached keys are not expired by time; instead, they are updated by `observe` from the
+    `compliancekeyrotation` and `baseurlrotation` events of the VASP accounts, which can be polled
+    with the event keys and start sequence numbers returned by `rotation_events_keys`.
+
+    The cache tracks the next sequence number of each event stream: events before it (observed
+    already) are ignored, and so are events of transactions not after the last known ledger version
+    of the client before the account was fetched, as the fetched keys include them. Events between
+    that version and the version the account was fetched at are applied again, which is harmless as
+    they carry the new values.
+    """
+
+    def __init__(self, client: "jsonrpc.Client") -> None:
+        self._client = client
+        self._keys: typing.Dict[str, typing.Tuple[str, Ed25519PublicKey]] = {}
+        self._parents: typing.Dict[str, str] = {}
+        self._events_keys: typing.Dict[str, typing.List[str]] = {}
+        # account address => last known ledger version before the account was fetched
+        self._versions: typing.Dict[str, int] = {}
+        # events key => next event sequence number
+        self._positions: typing.Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, account_address: typing.Union[diem_types.AccountAddress, str]) -> typing.Tuple[str, Ed25519PublicKey]:
+        """returns (base_url, compliance public key) of the account, calls client if it is not cached
+
+        Raises `ValueError` if the account or its parent VASP account has no base_url and compliance key.
+        """
+
+        address = utils.account_address_hex(account_address)
+        vasp_address = self._parents.get(address, address)
+        ret = self._keys.get(vasp_address)
+        if ret is None:
+            # read before the fetch: requests of other threads may advance the state past the fetched version
+            version = self._client.get_last_known_state().version
+            account = self._client.must_get_account(vasp_address)
+            role = account.role
+            if role.compliance_key and role.base_url:
+                ret = (role.base_url, Ed25519PublicKey.from_public_bytes(bytes.fromhex(role.compliance_key)))
+                events_keys = [role.compliance_key_rotation_events_key, role.base_url_rotation_events_key]
+                with self._lock:
+                    # keep the entry cached by another call or updated by `observe` during the fetch
+                    if vasp_address in self._keys:
+                        return self._keys[vasp_address]
+                    self._keys[vasp_address] = ret
+                    self._events_keys[vasp_address] = [key for key in events_keys if key]
+                    self._versions[vasp_address] = version
+            elif role.parent_vasp_address:
+                with self._lock:
+                    self._parents[vasp_address] = utils.account_address_hex(role.parent_vasp_address)
+                return self.get(role.parent_vasp_address)
+            else:
+                raise ValueError(f"could not find base_url and compliance_key from account: {account}")
+        return ret
+
+    def observe(self, events: typing.Iterable["jsonrpc.Event"]) -> int:
+        """apply compliance key and base url rotation events to the cached keys
+
+        Events of accounts that are not cached, other types of events and events before the next
+        sequence number of their event stream are ignored. Returns the number of rotations applied.
+        """
+
+        count = 0
+        for event in events:
+            data = event.data
+            if data.type not in (EVENT_DATA_COMPLIANCE_KEY_ROTATION, EVENT_DATA_BASE_URL_ROTATION):
+                continue
+            # event key is 8 bytes creation number followed by the account address
+            address = event.key[-utils.ACCOUNT_ADDRESS_LEN * 2 :]
+            with self._lock:
+                cached = self._keys.get(address)
+                if cached is None or event.sequence_number < self._positions.get(event.key, 0):
+                    continue
+                self._positions[event.key] = event.sequence_number + 1
+                if event.transaction_version <= self._versions[address]:
+                    continue
+                base_url, key = cached
+                if data.type == EVENT_DATA_COMPLIANCE_KEY_ROTATION:
+                    key = Ed25519PublicKey.from_public_bytes(bytes.fromhex(data.new_compliance_public_key))
+                else:
+                    base_url = data.new_base_url
+                self._keys[address] = (base_url, key)
+            count += 1
+        return count
+
+    def rotation_events_keys(self) -> typing.List[typing.Tuple[str, int]]:
+        """returns (event key, next sequence number) of the rotation event streams of the cached VASP accounts"""
+
+        with self._lock:
+            return [(key, self._positions.get(key, 0)) for keys in self._events_keys.values() for key in keys]
+
+    def invalidate(self, account_address: typing.Union[diem_types.AccountAddress, str, None] = None) -> None:
+        """remove cached key of the account, or all cached keys if no account address is given"""
+
+        with self._lock:
+            if account_address is None:
+                self._keys.clear()
+                self._events_keys.clear()
+                self._versions.clear()
+                self._positions.clear()
+            else:
+                address = utils.account_address_hex(account_address)
+                address = self._parents.get(address, address)
+                self._keys.pop(address, None)
+                self._versions.pop(address, None)
+                for key in self._events_keys.pop(address, []):
+                    self._positions.pop(key, None)
+
+    def verify(
+        self,
+        receiver_address: typing.Union[diem_types.AccountAddress, str],
+        requests: typing.Sequence[Request],
+        signatures: typing.Sequence[bytes],
+        executor: typing.Optional[Executor] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> typing.List[bool]:
+        """verify travel rule signatures signed by the receiver compliance key"""
+
+        _, public_key = self.get(receiver_address)
+        return verify(public_key, requests, signatures, executor, chunk_size)
+
+
+_executor: typing.Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _default_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(DEFAULT_WORKERS, thread_name_prefix="dual_attestation")
+        return _executor
+
+
+def _map_chunks(
+    func: typing.Callable[..., typing.List[typing.Any]],
+    key: typing.Any,  # pyre-ignore
+    columns: typing.List[typing.List[typing.Any]],
+    executor: typing.Optional[Executor],
+    chunk_size: int,
+) -> typing.List[typing.Any]:
+    starts = range(0, len(columns[0]), chunk_size)
+    chunks = [[column[s : s + chunk_size] for column in columns] for s in starts]
+    if executor is None and len(chunks) > 1:
+        executor = _default_executor()
+    if executor is None:
+        results = [func(key, *chunk) for chunk in chunks]
+    else:
+        results = executor.map(func, [key] * len(chunks), *zip(*chunks)) if chunks else []
+    return [item for result in results for item in result]
+
+
+def _sign_chunk(private_key: typing.Union[Ed25519PrivateKey, bytes], msgs: typing.List[bytes]) -> typing.List[bytes]:
+    if isinstance(private_key, bytes):
+        private_key = Ed25519PrivateKey.from_private_bytes(private_key)
+    return [private_key.sign(msg) for msg in msgs]
+
+
+def _verify_chunk(public_key: bytes, msgs: typing.List[bytes], signatures: typing.List[bytes]) -> typing.List[bool]:
+    key = Ed25519PublicKey.from_public_bytes(public_key)
+    ret = []
+    for msg, signature in zip(msgs, signatures):
+        try:
+            key.verify(signature, msg)
+            ret.append(True)
+        except InvalidSignature:
+            ret.append(False)
+    return ret
+
+
+def _unzip(pairs: typing.List[typing.Tuple[bytes, bytes]]) -> typing.Tuple[typing.List[bytes], typing.List[bytes]]:
+    return ([first for first, _ in pairs], [second for _, second in pairs])
@@ -0,0 +1,231 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides Uint64HashTable, a compact hash table of fixed width uint64 keys and values.
+
+The table is an uint64 numpy array: a header (magic number, number of keys) followed by the slots,
+each slot is a key of `key_width` uint64 words followed by a value of `value_width` uint64 words,
+all little-endian. Slots are addressed by Fibonacci hashing of the key words xor-ed together and
+probed linearly; the table is kept at most half full and doubled when needed. The all zero key
+marks empty slots, hence it can't be inserted.
+
+It is the storage of `identifier.SubaddressRegistry` (sub-address => user id) and
+`vasp_index.VaspIndex` (account address => parent VASP account address).
+"""
+
+import os, threading, typing
+
+import numpy as np
+
+DEFAULT_CAPACITY: int = 1024
+
+_DTYPE: np.dtype = np.dtype("<u8")
+_HEADER_SIZE: int = 2
+_MAX_LOAD_FACTOR: float = 0.5
+_FIBONACCI_HASH_MULTIPLIER: int = 0x9E3779B97F4A7C15
+_UINT64_MASK: int = (1 << 64) - 1
+
+Words = typing.Tuple[int, ...]
+
+
+class _State(typing.NamedTuple):
+    data: np.ndarray
+    table: np.ndarray
+    keys: typing.Tuple[np.ndarray, ...]
+    values: typing.Tuple[np.ndarray, ...]
+    mask: int
+    shift: int
+
+
+class Uint64HashTable:
+    """Uint64HashTable maps keys of `key_width` uint64 words to values of `value_width` uint64 words
+
+    Writes are serialized by a lock. Lookups are lock-free: the table is published as one immutable
+    state tuple, which a lookup reads once; growing the table rehashes into a new array and then
+    replaces the state, so lookups running on the old array still find the keys. A slot is written
+    value first, and the key words in one row assignment, so that a lookup never matches a key
+    before its value is written.
+
+    The table is in memory by default; given a file path, the table is a memory-mapped file, which
+    is created if it does not exist, and changes are written to the file (call `flush` to make sure
+    they are on disk). `name` is used in the error message of invalid table files.
+    """
+
+    def __init__(
+        self,
+        magic: int,
+        key_width: int,
+        value_width: int,
+        name: str,
+        capacity: int = DEFAULT_CAPACITY,
+        path: typing.Optional[str] = None,
+    ) -> None:
+        self._magic = magic
+        self._key_width = key_width
+        self._slot_width: int = key_width + value_width
+        self._name = name
+        self._path: typing.Optional[str] = path
+        self._lock: threading.Lock = threading.Lock()
+        if path and os.path.exists(path):
+            data = self._validate(np.memmap(path, dtype=_DTYPE, mode="r+"), path)
+        else:
+            data = self._new_data(table_capacity(capacity), path)
+        self._state: _State = self._new_state(data)
+
+    def load(self, path: str) -> None:
+        """replace the table with a copy of the given table file in memory"""
+
+        data = self._validate(np.fromfile(path, dtype=_DTYPE), path)
+        with self._lock:
+            self._path = None
+            self._state = self._new_state(data)
+
+    def save(self, path: str) -> None:
+        """write the table into the given file path atomically"""
+
+        tmp = f"{path}.tmp"
+        with self._lock:
+            self._state.data.tofile(tmp)
+        os.replace(tmp, path)
+
+    def flush(self) -> None:
+        """flush changes of memory-mapped table to disk, no-op for in memory table"""
+
+        data = self._state.data
+        if isinstance(data, np.memmap):
+            data.flush()
+
+    @property
+    def capacity(self) -> int:
+        """max number of keys the table holds before growing"""
+
+        return int(len(self._state.table) * _MAX_LOAD_FACTOR)
+
+    def find(self, key: Words) -> typing.Optional[Words]:
+        """returns value of the key, or None if not found"""
+
+        state = self._state
+        slot, found = _find_slot(state, key)
+        if not found:
+            return None
+        values = state.values
+        if len(values) == 1:
+            return (values[0].item(slot),)
+        return tuple([column.item(slot) for column in values])
+
+    def insert(self, key: Words, value: Words, replace: bool = True) -> typing.Optional[Words]:
+        """insert the key, returns the previous value of the key, or None if it is new
+
+        The value of an existing key is replaced only if `replace` is True.
+        """
+
+        if not any(key):
+            raise ValueError("zero key can't be inserted")
+        with self._lock:
+            self._reserve(1)
+            state = self._state
+            slot, found = _find_slot(state, key)
+            row = state.table[slot]
+            if found:
+                previous = tuple([column.item(slot) for column in state.values])
+                if replace:
+                    row[self._key_width :] = value
+                return previous
+            row[self._key_width :] = value
+            row[: self._key_width] = key
+            state.data[1] = state.data.item(1) + 1
+            return None
+
+    def items(self) -> typing.Iterator[typing.Tuple[Words, Words]]:
+        """iterate (key, value) of all keys in the table"""
+
+        state = self._state
+        rows = state.table[np.flatnonzero(np.any(state.table[:, : self._key_width], axis=1))].tolist()
+        for row in rows:
+            yield (tuple(row[: self._key_width]), tuple(row[self._key_width :]))
+
+    def __len__(self) -> int:
+        return self._state.data.item(1)
+
+    def _reserve(self, n: int) -> None:
+        size = len(self) + n
+        if size <= self.capacity:
+            return
+
+        table = self._state.table
+        rows = table[np.flatnonzero(np.any(table[:, : self._key_width], axis=1))]
+        # rehash into a new table, written to a tmp file and replaces the table file if memory-mapped
+        tmp = f"{self._path}.tmp" if self._path else None
+        state = self._new_state(self._new_data(table_capacity(size), tmp))
+        for row in rows:
+            slot, _ = _find_slot(state, tuple(row[: self._key_width].tolist()))
+            state.table[slot] = row
+        state.data[1] = len(rows)
+        if self._path and tmp:
+            state.data.flush()
+            os.replace(tmp, self._path)
+        self._state = state
+
+    def _new_state(self, data: np.ndarray) -> _State:
+        table = data[_HEADER_SIZE:].reshape(-1, self._slot_width)
+        keys = tuple(table[:, i] for i in range(self._key_width))
+        values = tuple(table[:, i] for i in range(self._key_width, self._slot_width))
+        return _State(data, table, keys, values, len(table) - 1, 64 - (len(table).bit_length() - 1))
+
+    def _new_data(self, capacity: int, path: typing.Optional[str]) -> np.ndarray:
+        shape = (_HEADER_SIZE + capacity * self._slot_width,)
+        if path:
+            data = np.memmap(path, dtype=_DTYPE, mode="w+", shape=shape)
+        else:
+            data = np.zeros(shape, dtype=_DTYPE)
+        data[0] = self._magic
+        return data
+
+    def _validate(self, data: np.ndarray, path: str) -> np.ndarray:
+        capacity = (len(data) - _HEADER_SIZE) // self._slot_width
+        if (
+            len(data) < _HEADER_SIZE
+            or data.item(0) != self._magic
+            or capacity < 2
+            or capacity & (capacity - 1)
+            or len(data) != _HEADER_SIZE + capacity * self._slot_width
+        ):
+            raise ValueError(f"invalid {self._name} file: {path}")
+        return data
+
+
+def table_capacity(size: int) -> int:
+    """returns the power of two number of slots for holding the given number of keys"""
+
+    capacity = 2
+    while size > capacity * _MAX_LOAD_FACTOR:
+        capacity *= 2
+    return capacity
+
+
+def _find_slot(state: _State, key: Words) -> typing.Tuple[int, bool]:
+    """returns (slot, True) of the given key, or (empty slot for inserting it, False) if not found"""
+
+    _, _, keys, _, mask, shift = state
+    if len(keys) == 1:
+        column, word = keys[0], key[0]
+        slot = ((word * _FIBONACCI_HASH_MULTIPLIER) & _UINT64_MASK) >> shift
+        while True:
+            slot_word = column.item(slot)
+            if slot_word == word:
+                return (slot, True)
+            if slot_word == 0:
+                return (slot, False)
+            slot = (slot + 1) & mask
+
+    h = 0
+    for word in key:
+        h ^= word
+    slot = ((h * _FIBONACCI_HASH_MULTIPLIER) & _UINT64_MASK) >> shift
+    while True:
+        slot_key = tuple([column.item(slot) for column in keys])
+        if slot_key == key:
+            return (slot, True)
+        if not any(slot_key):
+            return (slot, False)
+        slot = (slot + 1) & mask
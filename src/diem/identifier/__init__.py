@@ -13,23 +13,45 @@ from diem import chain_ids, identifier
 print(identifier.HRPS[chain_ids.PREMAINNET.to_int()])
 ```
 
+`encode_account` and `decode_account` results are memoized in bounded LRU caches keyed by the raw
+address bytes, sub-address bytes and hrp (`DEFAULT_ACCOUNT_CACHE_SIZE` entries each), call
+`set_account_cache_size(0)` to disable caching, and `account_cache_info()` for cache metrics.
+
 """
 
 
-import typing
+import functools, re, threading, typing
+from dataclasses import dataclass
 from urllib import parse
 from typing import List
 
+import numpy as np
+
 from . import bech32
 from .. import diem_types, utils, chain_ids
 
-from .bech32 import bech32_address_encode, bech32_address_decode, Bech32Error
-from .subaddress import DIEM_SUBADDRESS_SIZE, DIEM_ZERO_SUBADDRESS, gen_subaddress
+from .bech32 import (
+    bech32_address_encode,
+    bech32_address_decode,
+    bech32_address_encode_many,
+    bech32_address_decode_many,
+    Bech32Error,
+)
+from .subaddress import DIEM_SUBADDRESS_SIZE, DIEM_ZERO_SUBADDRESS, gen_subaddress, SubaddressRegistry
 
 LBR = "lbr"  # lbr for mainnet
 TLB = "tlb"  # tlb for testnet
 PLB = "plb"  # plb for premainnet
 
+DEFAULT_ACCOUNT_CACHE_SIZE: int = 10_000
+
+_DecodedAccount = typing.Tuple[diem_types.AccountAddress, typing.Optional[bytes]]
+
+# `diem://<account>?c=<currency>&am=<amount>` (or `am` first) intent identifiers encoded by `encode_intent`
+_INTENT_RE: typing.Pattern[str] = re.compile(
+    r"diem://([0-9A-Za-z]+)\?(?:c=([0-9A-Za-z_]+)&am=([0-9]+)|am=([0-9]+)&c=([0-9A-Za-z_]+))"
+)
+
 HRPS: typing.Dict[int, str] = {
     chain_ids.MAINNET.to_int(): LBR,
     chain_ids.TESTNET.to_int(): TLB,
@@ -43,8 +65,22 @@ class InvalidIntentIdentifierError(Exception):
     pass
 
 
+@dataclass(frozen=True)
+class CacheInfo:
+    """CacheInfo is the metrics of an account identifier LRU cache"""
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
 class Intent:
-    """Intent is a struct hold data decoded from Diem Intent Identifier string"""
+    """Intent is a struct hold data decoded from Diem Intent Identifier string
+
+    `account_id` is encoded on first access and cached.
+    """
 
     account_address: diem_types.AccountAddress
     sub_address: typing.Optional[bytes]
@@ -64,6 +100,7 @@ class Intent:
         self.currency_code = currency_code
         self.amount = amount
         self.hrp = hrp
+        self._account_id: typing.Optional[str] = None
 
     @property
     def account_address_bytes(self) -> bytes:
@@ -71,7 +108,9 @@ class Intent:
 
     @property
     def account_id(self) -> str:
-        return encode_account(self.account_address, self.sub_address, self.hrp)
+        if self._account_id is None:
+            self._account_id = encode_account(self.account_address, self.sub_address, self.hrp)
+        return self._account_id
 
 
 def encode_intent(encoded_account_identifier: str, currency_code: str, amount: int) -> str:
@@ -93,6 +132,39 @@ def decode_intent(encoded_intent_identifier: str, hrp: str) -> Intent:
     InvalidIntentIdentifierError is raised if given identifier is invalid
     """
 
+    # fast path for identifiers in `encode_intent` format; anything else, including invalid
+    # identifiers, is decoded by the general url parser, so that validation and errors are same
+    match = _INTENT_RE.fullmatch(encoded_intent_identifier)
+    if match:
+        account_identifier, currency_code, amount, amount2, currency_code2 = match.groups()
+        try:
+            account_address, sub_address = decode_account(account_identifier, hrp)
+        except ValueError:
+            return _decode_intent_url(encoded_intent_identifier, hrp)
+        currency_code = currency_code or currency_code2
+        return _new_intent(account_identifier, account_address, sub_address, currency_code, int(amount or amount2), hrp)
+
+    return _decode_intent_url(encoded_intent_identifier, hrp)
+
+
+def decode_intents(
+    encoded_intent_identifiers: typing.Iterable[str], hrp: str
+) -> typing.List[typing.Union[Intent, InvalidIntentIdentifierError]]:
+    """Decode Diem intent identifiers in batch for bulk validation
+
+    Returns decoded `Intent` or the `InvalidIntentIdentifierError` raised by `decode_intent` for each identifier.
+    """
+
+    ret: typing.List[typing.Union[Intent, InvalidIntentIdentifierError]] = []
+    for encoded_intent_identifier in encoded_intent_identifiers:
+        try:
+            ret.append(decode_intent(encoded_intent_identifier, hrp))
+        except InvalidIntentIdentifierError as e:
+            ret.append(e)
+    return ret
+
+
+def _decode_intent_url(encoded_intent_identifier: str, hrp: str) -> Intent:
     result = parse.urlparse(encoded_intent_identifier)
     if result.scheme != "diem":
         raise InvalidIntentIdentifierError(
@@ -110,13 +182,27 @@ def decode_intent(encoded_intent_identifier: str, hrp: str) -> Intent:
     except ValueError as e:
         raise InvalidIntentIdentifierError(f"decode account identifier failed: {e}:")
 
-    return Intent(
-        account_address=utils.account_address(account_address),
+    return _new_intent(account_identifier, account_address, sub_address, currency_code, amount, hrp)
+
+
+def _new_intent(
+    account_identifier: str,
+    account_address: diem_types.AccountAddress,
+    sub_address: typing.Optional[bytes],
+    currency_code: str,
+    amount: int,
+    hrp: str,
+) -> Intent:
+    intent = Intent(
+        account_address=account_address,
         sub_address=sub_address,
         currency_code=currency_code,
         amount=amount,
         hrp=hrp,
     )
+    # bech32 encoding is canonical, a valid encoded account identifier is the lower case of the encoded result
+    intent._account_id = account_identifier.lower()
+    return intent
 
 
 def _decode_param(name, params, field, convert):  # pyre-ignore
@@ -144,10 +230,10 @@ def encode_account(
     """Encode onchain address and (optional) subaddress with human readable prefix(hrp) into bech32 format"""
 
     onchain_address_bytes = utils.account_address_bytes(onchain_addr)
-    subaddress_bytes = utils.sub_address(subaddr) if subaddr else None
+    subaddress_bytes = bytes(utils.sub_address(subaddr)) if subaddr else DIEM_ZERO_SUBADDRESS
 
     try:
-        encoded_address = bech32_address_encode(hrp, onchain_address_bytes, subaddress_bytes)
+        return _encode_account(onchain_address_bytes, subaddress_bytes, hrp)
     except Bech32Error as e:
         raise ValueError(
             f"Can't encode from "
@@ -155,18 +241,125 @@ def encode_account(
             f"subaddr: {subaddr}, "
             f"hrp: {hrp}, got error: {e}"
         )
-    return encoded_address
 
 
 def decode_account(encoded_address: str, hrp: str) -> typing.Tuple[diem_types.AccountAddress, typing.Optional[bytes]]:
     """Return (addrees_str, subaddress_str) given a bech32 encoded str & human readable prefix(hrp)"""
     try:
-        (_version, onchain_address_bytes, subaddress_bytes) = bech32.bech32_address_decode(hrp, encoded_address)
+        return _decode_account(encoded_address, hrp)
     except Bech32Error as e:
         raise ValueError(f"Can't decode from encoded str {encoded_address}, " f"got error: {e}")
 
+
+def set_account_cache_size(maxsize: int = DEFAULT_ACCOUNT_CACHE_SIZE) -> None:
+    """Set max number of entries of `encode_account` and `decode_account` LRU caches
+
+    Caches are cleared, and caching is disabled when maxsize is 0.
+    """
+
+    global _encode_account, _decode_account
+
+    if maxsize < 0:
+        raise ValueError(f"cache maxsize should be >= 0, but got: {maxsize}")
+    with _account_cache_lock:
+        _account_cache_failures.update(encode_account=0, decode_account=0)
+    if maxsize == 0:
+        _encode_account, _decode_account = _encode_account_bytes, _decode_account_str
+    else:
+        _encode_account = functools.lru_cache(maxsize)(_count_failures("encode_account", _encode_account_bytes))
+        _decode_account = functools.lru_cache(maxsize)(_count_failures("decode_account", _decode_account_str))
+
+
+def account_cache_info() -> typing.Dict[str, CacheInfo]:
+    """Return metrics of `encode_account` and `decode_account` LRU caches, empty if caching is disabled"""
+
+    ret = {}
+    for name, func in [("encode_account", _encode_account), ("decode_account", _decode_account)]:
+        if hasattr(func, "cache_info"):
+            info = func.cache_info()  # pyre-ignore
+            # a miss either fails or adds an entry, and nothing is removed from the cache except evictions
+            # (clearing resets the counters too)
+            evictions = info.misses - _account_cache_failures[name] - info.currsize
+            ret[name] = CacheInfo(info.hits, info.misses, evictions, info.maxsize, info.currsize)
+    return ret
+
+
+def _count_failures(name: str, func: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+    """counts calls raising error, which are cache misses that add no entry to the cache"""
+
+    @functools.wraps(func)
+    def wrapper(*args: typing.Any) -> typing.Any:
+        try:
+            return func(*args)
+        except Exception:
+            with _account_cache_lock:
+                _account_cache_failures[name] += 1
+            raise
+
+    return wrapper
+
+
+def _encode_account_bytes(onchain_address_bytes: bytes, subaddress_bytes: bytes, hrp: str) -> str:
+    return bech32_address_encode(hrp, onchain_address_bytes, subaddress_bytes)
+
+
+def _decode_account_str(encoded_address: str, hrp: str) -> _DecodedAccount:
+    (_version, onchain_address_bytes, subaddress_bytes) = bech32.bech32_address_decode(hrp, encoded_address)
+
+    # `diem_types.AccountAddress` is immutable, it is safe to be shared by cached results
     address = utils.account_address(onchain_address_bytes)
     # If subaddress is absent, subaddress_bytes is a list of 0
     if subaddress_bytes != DIEM_ZERO_SUBADDRESS:
         return (address, subaddress_bytes)
     return (address, None)
+
+
+def encode_accounts(
+    onchain_addrs: typing.Union[np.ndarray, typing.Sequence[typing.Union[diem_types.AccountAddress, str]]],
+    subaddrs: typing.Union[np.ndarray, typing.Sequence[typing.Union[str, bytes, None]], None],
+    hrp: str,
+) -> typing.List[str]:
+    """Encode onchain addresses and (optional) subaddresses with hrp into bech32 format in batch
+
+    Addresses and subaddresses can be uint8 numpy arrays shaped (N, 16) and (N, 8), which is the fastest
+    way for encoding millions of account identifiers. Subaddresses is None for encoding all without
+    subaddress, and zero subaddress is same with no subaddress like `encode_account`.
+    """
+
+    if not isinstance(onchain_addrs, np.ndarray):
+        onchain_addrs = _bytes_array(map(utils.account_address_bytes, onchain_addrs), utils.ACCOUNT_ADDRESS_LEN)
+    if subaddrs is None:
+        subaddrs = np.zeros((len(onchain_addrs), DIEM_SUBADDRESS_SIZE), dtype=np.uint8)
+    elif not isinstance(subaddrs, np.ndarray):
+        subaddrs = _bytes_array(
+            (utils.sub_address(s) if s else DIEM_ZERO_SUBADDRESS for s in subaddrs), DIEM_SUBADDRESS_SIZE
+        )
+
+    try:
+        return bech32_address_encode_many(hrp, onchain_addrs, subaddrs)
+    except Bech32Error as e:
+        raise ValueError(f"Can't encode from onchain_addrs and subaddrs, hrp: {hrp}, got error: {e}")
+
+
+def decode_accounts(encoded_addresses: typing.Sequence[str], hrp: str) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Return (addresses, subaddresses) uint8 numpy arrays shaped (N, 16) and (N, 8) given bech32 encoded strs
+
+    Subaddress row is zero bytes if the subaddress is absent. ValueError is raised for the first invalid
+    encoded address.
+    """
+
+    try:
+        return bech32_address_decode_many(hrp, encoded_addresses)
+    except Bech32Error as e:
+        raise ValueError(f"Can't decode from encoded strs, got error: {e}")
+
+
+def _bytes_array(values: typing.Iterable[bytes], size: int) -> np.ndarray:
+    return np.frombuffer(b"".join(values), dtype=np.uint8).reshape(-1, size)
+
+
+_account_cache_lock: threading.Lock = threading.Lock()
+_account_cache_failures: typing.Dict[str, int] = {}
+_encode_account: typing.Callable[[bytes, bytes, str], str] = _encode_account_bytes
+_decode_account: typing.Callable[[str, str], _DecodedAccount] = _decode_account_str
+set_account_cache_size()
@@ -6,8 +6,18 @@
 # Bech32 implementation for Diem human readable addresses based on
 # Bitcoin's segwit python lib https://github.com/fiatjaf/bech32 modified to support the
 # requirements of Diem (sub)address and versioning specs.
+#
+# The checksum is computed with a precomputed generator table, characters are decoded by
+# a reverse charset lookup table, and the (sub)address is always 24 bytes, thus it is
+# converted from / to 39 5-bit characters with a fixed width integer conversion instead of
+# the general power-of-2 base conversion.
+#
+# `bech32_address_encode_many` and `bech32_address_decode_many` are NumPy vectorized versions
+# for encoding / decoding a batch of addresses.
 
-import typing
+import functools, typing
+
+import numpy as np
 
 from .subaddress import DIEM_SUBADDRESS_SIZE, DIEM_ZERO_SUBADDRESS
 
@@ -15,11 +25,29 @@ from .subaddress import DIEM_SUBADDRESS_SIZE, DIEM_ZERO_SUBADDRESS
 _BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
 _BECH32_SEPARATOR = "1"
 _BECH32_CHECKSUM_CHAR_SIZE = 6
+_BECH32_GENERATOR = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
+
+# checksum generator xor-ed value for every possible top 5 bits of the checksum
+_BECH32_POLYMOD_TABLE: typing.List[int] = [
+    functools.reduce(lambda x, i: x ^ (_BECH32_GENERATOR[i] if (top >> i) & 1 else 0), range(5), 0) for top in range(32)
+]
+_BECH32_INVALID_CHAR = 0xFF
+# ascii code => index of the char in charset, `_BECH32_INVALID_CHAR` for chars not in the charset
+_BECH32_CHARSET_REV: bytes = bytes(
+    _BECH32_CHARSET.index(chr(c)) if chr(c) in _BECH32_CHARSET else _BECH32_INVALID_CHAR for c in range(256)
+)
 
 # DIEM constants
 _DIEM_ADDRESS_SIZE = 16  # in bytes
 _DIEM_BECH32_VERSION = 1
 _DIEM_BECH32_SIZE = 50  # in characters
+_DIEM_HRP_SIZE = 3  # in characters
+
+# (sub)address 24 bytes are 192 bits, padded with 3 zero bits into 39 5-bit characters
+_DIEM_ADDRESS_DATA_BYTES = _DIEM_ADDRESS_SIZE + DIEM_SUBADDRESS_SIZE
+_DIEM_ADDRESS_DATA_CHARS = 39
+_DIEM_ADDRESS_DATA_PAD_BITS = _DIEM_ADDRESS_DATA_CHARS * 5 - _DIEM_ADDRESS_DATA_BYTES * 8
+_DIEM_ADDRESS_DATA_SHIFTS: typing.List[int] = list(range((_DIEM_ADDRESS_DATA_CHARS - 1) * 5, -1, -5))
 
 
 class Bech32Error(Exception):
@@ -50,12 +78,9 @@ def bech32_address_encode(hrp: str, address_bytes: bytes, subaddress_bytes: typi
 
     # if subaddress has not been provided it's set to 8 zero bytes.
     subaddress_final_bytes = subaddress_bytes if subaddress_bytes is not None else DIEM_ZERO_SUBADDRESS
-    total_bytes = address_bytes + subaddress_final_bytes
+    total = int.from_bytes(address_bytes + subaddress_final_bytes, "big") << _DIEM_ADDRESS_DATA_PAD_BITS
 
-    five_bit_data = _convertbits(total_bytes, 8, 5, True)
-    # check base conversion
-    if five_bit_data is None:
-        raise Bech32Error("Error converting bytes to base32")
+    five_bit_data = [(total >> shift) & 31 for shift in _DIEM_ADDRESS_DATA_SHIFTS]
     return _bech32_encode(hrp, [encoding_version] + five_bit_data)
 
 
@@ -87,56 +112,171 @@ def bech32_address_decode(expected_hrp: str, bech32: str) -> typing.Tuple[int, b
     if bech32[3] != _BECH32_SEPARATOR:
         raise Bech32Error(f"Non-expected Bech32 separator: {bech32[3]}")
 
-    # check characters after separator in Bech32 alphabet
-    if not all(x in _BECH32_CHARSET for x in bech32[4:]):
+    # check characters after separator in Bech32 alphabet; non-ascii chars are not in the alphabet
+    data = bech32[4:].encode("ascii", "replace").translate(_BECH32_CHARSET_REV)
+    if _BECH32_INVALID_CHAR in data:
         raise Bech32Error(f"Invalid Bech32 characters detected: {bech32}")
     hrp = bech32[:3]
 
     # version is defined by the index of the Bech32 character after separator
-    address_version = _BECH32_CHARSET.find(bech32[4])
+    address_version = data[0]
     # check valid version
     if address_version != _DIEM_BECH32_VERSION:
         raise Bech32Error(f"Version mismatch. Expected {_DIEM_BECH32_VERSION}, " f"but received {address_version}")
 
-    # we've already checked that all characters are in the correct alphabet,
-    # thus, this will always succeed
-    data = [_BECH32_CHARSET.find(x) for x in bech32[5:]]
-
     # check Bech32 checksum
-    if not _bech32_verify_checksum(hrp, [address_version] + data):
+    if not _bech32_verify_checksum(hrp, data):
         raise Bech32Error(f"Bech32 checksum validation failed: {bech32}")
 
-    decoded_data = _convertbits(data[:-_BECH32_CHECKSUM_CHAR_SIZE], 5, 8, False)
-    # check base conversion
-    if decoded_data is None:
+    # length is checked above, thus there are always 39 5-bit characters between version and checksum
+    total = 0
+    for value in data[1:-_BECH32_CHECKSUM_CHAR_SIZE]:
+        total = (total << 5) | value
+    # check base conversion: padding bits must be zero
+    if total & ((1 << _DIEM_ADDRESS_DATA_PAD_BITS) - 1):
         raise Bech32Error("Error converting bytes from base32")
 
-    length_data = len(decoded_data)
-    # extra check about the expected output (sub)address size in bytes
-    if length_data != _DIEM_ADDRESS_SIZE + DIEM_SUBADDRESS_SIZE:
-        raise Bech32Error(
-            f"Expected {_DIEM_ADDRESS_SIZE + DIEM_SUBADDRESS_SIZE} bytes after decoding, but got: {length_data}"
-        )
-
+    decoded_data = (total >> _DIEM_ADDRESS_DATA_PAD_BITS).to_bytes(_DIEM_ADDRESS_DATA_BYTES, "big")
     return (
         address_version,
-        bytes(decoded_data[:_DIEM_ADDRESS_SIZE]),
-        bytes(decoded_data[-DIEM_SUBADDRESS_SIZE:]),
+        decoded_data[:_DIEM_ADDRESS_SIZE],
+        decoded_data[-DIEM_SUBADDRESS_SIZE:],
     )
 
 
-def _bech32_polymod(values: typing.Iterable[int]) -> int:
-    """Internal function that computes the Bech32 checksum."""
-    generator = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
-    chk = 1
+def bech32_address_encode_many(hrp: str, addresses: np.ndarray, subaddresses: np.ndarray) -> typing.List[str]:
+    """Encode a batch of Diem addresses and sub-addresses.
+    Args:
+        hrp: Bech32 human readable part
+        addresses: on-chain account addresses, uint8 array shaped (N, 16)
+        subaddresses: subaddresses, uint8 array shaped (N, 8); zero rows for no sub-address
+    Returns:
+        Bech32 encoded addresses
+    """
+
+    if addresses.ndim != 2 or addresses.shape[1] != _DIEM_ADDRESS_SIZE:
+        raise Bech32Error(f"Addresses shape should be (N, {_DIEM_ADDRESS_SIZE}), but got: {addresses.shape}")
+    if subaddresses.shape != (len(addresses), DIEM_SUBADDRESS_SIZE):
+        raise Bech32Error(
+            f"Subaddresses shape should be ({len(addresses)}, {DIEM_SUBADDRESS_SIZE}), but got: {subaddresses.shape}"
+        )
+
+    count = len(addresses)
+    if count == 0:
+        return []
+
+    bits = np.unpackbits(np.hstack([addresses, subaddresses]).astype(np.uint8), axis=1)
+    bits = np.pad(bits, ((0, 0), (0, _DIEM_ADDRESS_DATA_PAD_BITS)))
+    five_bit_data = np.packbits(bits.reshape(count, _DIEM_ADDRESS_DATA_CHARS, 5), axis=2)[:, :, 0] >> 3
+
+    data = np.empty((count, 1 + _DIEM_ADDRESS_DATA_CHARS + _BECH32_CHECKSUM_CHAR_SIZE), dtype=np.uint8)
+    data[:, 0] = _DIEM_BECH32_VERSION
+    data[:, 1 : 1 + _DIEM_ADDRESS_DATA_CHARS] = five_bit_data
+    data[:, -_BECH32_CHECKSUM_CHAR_SIZE:] = 0
+    polymod = _bech32_polymod_many(_bech32_hrp_polymod(hrp), data) ^ 1
+    for i in range(_BECH32_CHECKSUM_CHAR_SIZE):
+        data[:, -_BECH32_CHECKSUM_CHAR_SIZE + i] = (polymod >> 5 * (5 - i)) & 31
+
+    prefix = np.frombuffer((hrp + _BECH32_SEPARATOR).encode(), dtype=np.uint8)
+    chars = np.hstack([np.broadcast_to(prefix, (count, len(prefix))), _bech32_charset_array()[data]])
+    width = chars.shape[1]
+    text = chars.tobytes().decode("ascii")
+    return [text[i : i + width] for i in range(0, len(text), width)]
+
+
+def bech32_address_decode_many(
+    expected_hrp: str, bech32s: typing.Sequence[str]
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Validate and decode a batch of Bech32 Diem addresses.
+
+    Validation is same with `bech32_address_decode`, `Bech32Error` is raised for the first invalid
+    address with the error of `bech32_address_decode`.
+
+    Args:
+        expected_hrp: expected Bech32 human readable part (lbr or tlb)
+        bech32s: Bech32 encoded addresses
+    Returns:
+        A tuple consisiting of addresses (uint8 array shaped (N, 16)) and subaddresses (uint8 array shaped (N, 8))
+    """
+
+    count = len(bech32s)
+    lengths = np.fromiter(map(len, bech32s), dtype=np.int64, count=count)
+    if count == 0 or (lengths != _DIEM_BECH32_SIZE).any():
+        if count:
+            _raise_first_invalid(expected_hrp, bech32s, np.flatnonzero(lengths != _DIEM_BECH32_SIZE))
+        return (np.zeros((0, _DIEM_ADDRESS_SIZE), dtype=np.uint8), np.zeros((0, DIEM_SUBADDRESS_SIZE), dtype=np.uint8))
+
+    text = "".join(bech32s)
+    if not text.isascii():
+        _raise_first_invalid(expected_hrp, bech32s, [i for i, s in enumerate(bech32s) if not s.isascii()])
+    chars = np.frombuffer(text.encode("ascii"), dtype=np.uint8).reshape(count, _DIEM_BECH32_SIZE)
+
+    upper = (chars >= ord("A")) & (chars <= ord("Z"))
+    lower = (chars >= ord("a")) & (chars <= ord("z"))
+    invalid = upper.any(axis=1) & lower.any(axis=1)
+    chars = chars | (upper.astype(np.uint8) << 5)
+
+    hrp = np.frombuffer(expected_hrp.encode("ascii", "replace"), dtype=np.uint8)
+    if len(hrp) != _DIEM_HRP_SIZE:
+        _raise_first_invalid(expected_hrp, bech32s, range(count))
+    invalid |= (chars[:, :_DIEM_HRP_SIZE] != hrp).any(axis=1)
+    invalid |= chars[:, _DIEM_HRP_SIZE] != ord(_BECH32_SEPARATOR)
+
+    data = np.frombuffer(_BECH32_CHARSET_REV, dtype=np.uint8)[chars[:, _DIEM_HRP_SIZE + 1 :]]
+    invalid |= (data == _BECH32_INVALID_CHAR).any(axis=1)
+    invalid |= data[:, 0] != _DIEM_BECH32_VERSION
+    invalid |= _bech32_polymod_many(_bech32_hrp_polymod(expected_hrp), data & 31) != 1
+
+    five_bit_data = data[:, 1 : 1 + _DIEM_ADDRESS_DATA_CHARS, np.newaxis]
+    bits = np.unpackbits(five_bit_data, axis=2)[:, :, 3:].reshape(count, -1)
+    invalid |= bits[:, -_DIEM_ADDRESS_DATA_PAD_BITS:].any(axis=1)
+    if invalid.any():
+        _raise_first_invalid(expected_hrp, bech32s, np.flatnonzero(invalid))
+
+    decoded_data = np.packbits(bits[:, : _DIEM_ADDRESS_DATA_BYTES * 8], axis=1)
+    return (decoded_data[:, :_DIEM_ADDRESS_SIZE], decoded_data[:, _DIEM_ADDRESS_SIZE:])
+
+
+def _raise_first_invalid(
+    expected_hrp: str, bech32s: typing.Sequence[str], invalid_indexes: typing.Iterable[int]
+) -> None:
+    """Raise the `bech32_address_decode` error of the first invalid address."""
+
+    for i in invalid_indexes:
+        try:
+            bech32_address_decode(expected_hrp, bech32s[i])
+        except Bech32Error as e:
+            raise Bech32Error(f"{e} (index: {i})")
+    raise Bech32Error(f"Invalid Bech32 addresses detected for human readable part {expected_hrp}")
+
+
+def _bech32_polymod(values: typing.Iterable[int], chk: int = 1) -> int:
+    """Internal function that computes the Bech32 checksum, continues from `chk` if given."""
     for value in values:
-        top = chk >> 25
-        chk = (chk & 0x1FFFFFF) << 5 ^ value
-        for i in range(5):
-            chk ^= generator[i] if ((top >> i) & 1) else 0
+        chk = ((chk & 0x1FFFFFF) << 5) ^ value ^ _BECH32_POLYMOD_TABLE[chk >> 25]
     return chk
 
 
+def _bech32_polymod_many(chk: int, values: np.ndarray) -> np.ndarray:
+    """Internal function that computes the Bech32 checksum of each row of the given 5-bit values."""
+    table = np.array(_BECH32_POLYMOD_TABLE, dtype=np.uint32)
+    chks = np.full(len(values), chk, dtype=np.uint32)
+    for column in values.T:
+        chks = ((chks & 0x1FFFFFF) << 5) ^ column ^ table[chks >> 25]
+    return chks
+
+
+@functools.lru_cache(maxsize=None)
+def _bech32_hrp_polymod(hrp: str) -> int:
+    """Internal function that computes the Bech32 checksum of the expanded HRP."""
+    return _bech32_polymod(_bech32_hrp_expand(hrp))
+
+
+@functools.lru_cache(maxsize=None)
+def _bech32_charset_array() -> np.ndarray:
+    return np.frombuffer(_BECH32_CHARSET.encode(), dtype=np.uint8)
+
+
 def _bech32_hrp_expand(hrp: str) -> typing.List[int]:
     """Expand the HRP into values for checksum computation."""
     return [ord(x) >> 5 for x in hrp] + [0] + [ord(x) & 31 for x in hrp]
@@ -144,42 +284,16 @@ def _bech32_hrp_expand(hrp: str) -> typing.List[int]:
 
 def _bech32_verify_checksum(hrp: str, data: typing.Iterable[int]) -> bool:
     """Verify a checksum given HRP and converted data characters."""
-    return _bech32_polymod(_bech32_hrp_expand(hrp) + list(data)) == 1
+    return _bech32_polymod(data, _bech32_hrp_polymod(hrp)) == 1
 
 
 def _bech32_create_checksum(hrp: str, data: typing.Iterable[int]) -> typing.List[int]:
     """Compute the checksum values given HRP and data."""
-    values = _bech32_hrp_expand(hrp) + list(data)
-    polymod = _bech32_polymod(values + [0, 0, 0, 0, 0, 0]) ^ 1
+    polymod = _bech32_polymod([0, 0, 0, 0, 0, 0], _bech32_polymod(data, _bech32_hrp_polymod(hrp))) ^ 1
     return [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
 
 
-def _bech32_encode(hrp: str, data: typing.Iterable[int]) -> str:
+def _bech32_encode(hrp: str, data: typing.List[int]) -> str:
     """Compute a Bech32 string given HRP and data values."""
-    combined = list(data) + _bech32_create_checksum(hrp, data)
+    combined = data + _bech32_create_checksum(hrp, data)
     return hrp + _BECH32_SEPARATOR + "".join([_BECH32_CHARSET[d] for d in combined])
-
-
-def _convertbits(
-    data: typing.Iterable[int], from_bits: int, to_bits: int, pad: bool
-) -> typing.Optional[typing.List[int]]:
-    """General power-of-2 base conversion."""
-    acc = 0
-    bits = 0
-    ret = []
-    maxv = (1 << to_bits) - 1
-    max_acc = (1 << (from_bits + to_bits - 1)) - 1
-    for value in data:
-        if value < 0 or (value >> from_bits):
-            return None
-        acc = ((acc << from_bits) | value) & max_acc
-        bits += from_bits
-        while bits >= to_bits:
-            bits -= to_bits
-            ret.append((acc >> bits) & maxv)
-    if pad:
-        if bits:
-            ret.append((acc << (to_bits - bits)) & maxv)
-    elif bits >= from_bits or ((acc << (to_bits - bits)) & maxv):
-        return None
-    return ret
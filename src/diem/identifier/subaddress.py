@@ -1,11 +1,120 @@
 # Copyright (c) The Diem Core Contributors
 # SPDX-License-Identifier: Apache-2.0
 
-import secrets
+import secrets, typing
+
+from .. import hashtable, utils
 
 DIEM_SUBADDRESS_SIZE: int = 8  # in bytes (for V1)
 DIEM_ZERO_SUBADDRESS: bytes = b"\0" * DIEM_SUBADDRESS_SIZE
 
+DEFAULT_REGISTRY_CAPACITY: int = hashtable.DEFAULT_CAPACITY
+
+# registry file is a `hashtable.Uint64HashTable` of (sub-address, user id) slots
+_REGISTRY_MAGIC: int = int.from_bytes(b"DIEMSUB1", "little")
+_UINT64_MASK: int = (1 << 64) - 1
+
 
 def gen_subaddress() -> bytes:
     return secrets.token_bytes(DIEM_SUBADDRESS_SIZE)
+
+
+class SubaddressRegistry:
+    """SubaddressRegistry allocates unique sub-addresses for users and finds user id by sub-address
+
+    Sub-addresses and user ids are stored in a compact hash table (`hashtable.Uint64HashTable`) of
+    (sub-address, user id) slots, kept at most half full and doubled when needed. The zero
+    sub-address means no sub-address, it is never allocated and marks empty slots. User ids are
+    non-negative integers less than 2^64. Lookups are lock-free and safe while other threads
+    allocate sub-addresses.
+
+    The registry is in memory by default; given a file path, the table is a memory-mapped file,
+    which is created if it does not exist, and changes are written to the file (call `flush` to
+    make sure they are on disk). `save` writes a registry file, `load` reads it into memory;
+    neither rebuilds the index.
+
+    ```python
+    registry = SubaddressRegistry(path="subaddresses.bin")
+    subaddress = registry.allocate(user_id)
+    assert registry.find_user_id(subaddress) == user_id
+    ```
+    """
+
+    def __init__(self, capacity: int = DEFAULT_REGISTRY_CAPACITY, path: typing.Optional[str] = None) -> None:
+        self._table: hashtable.Uint64HashTable = hashtable.Uint64HashTable(
+            _REGISTRY_MAGIC, 1, 1, "sub-address registry", capacity, path
+        )
+
+    @staticmethod
+    def load(path: str) -> "SubaddressRegistry":
+        """load registry file into memory"""
+
+        registry = SubaddressRegistry(capacity=1)
+        registry._table.load(path)
+        return registry
+
+    def save(self, path: str) -> None:
+        """write registry into the given file path atomically"""
+
+        self._table.save(path)
+
+    def flush(self) -> None:
+        """flush changes of memory-mapped registry to disk, no-op for in memory registry"""
+
+        self._table.flush()
+
+    @property
+    def capacity(self) -> int:
+        """max number of sub-addresses the registry holds before growing the hash table"""
+
+        return self._table.capacity
+
+    def allocate(self, user_id: int) -> bytes:
+        """allocate a new unique random sub-address for the given user id"""
+
+        _validate_user_id(user_id)
+        while True:
+            subaddress = gen_subaddress()
+            key = int.from_bytes(subaddress, "big")
+            if key != 0 and self._table.insert((key,), (user_id,), replace=False) is None:
+                return subaddress
+
+    def register(self, subaddress: typing.Union[bytes, str], user_id: int) -> None:
+        """register an existing sub-address (bytes or hex-encoded) for the given user id
+
+        Raises `ValueError` if the sub-address is zero or registered already.
+        """
+
+        key = int.from_bytes(utils.sub_address(subaddress), "big")
+        if key == 0:
+            raise ValueError("zero sub-address can't be registered")
+        _validate_user_id(user_id)
+        registered = self._table.insert((key,), (user_id,), replace=False)
+        if registered is not None:
+            raise ValueError(f"sub-address {subaddress!r} is registered for user {registered[0]}")
+
+    def find_user_id(self, subaddress: typing.Union[bytes, str]) -> typing.Optional[int]:
+        """find user id by sub-address (bytes or hex-encoded), returns None if not found"""
+
+        key = int.from_bytes(utils.sub_address(subaddress), "big")
+        if key == 0:
+            return None
+        value = self._table.find((key,))
+        return None if value is None else value[0]
+
+    def items(self) -> typing.Iterator[typing.Tuple[bytes, int]]:
+        """iterate (sub-address, user id) of all registered sub-addresses"""
+
+        for (key,), (user_id,) in self._table.items():
+            yield (key.to_bytes(DIEM_SUBADDRESS_SIZE, "big"), user_id)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __contains__(self, subaddress: typing.Union[bytes, str]) -> bool:
+        return self.find_user_id(subaddress) is not None
+
+
+def _validate_user_id(user_id: int) -> None:
+    if not 0 <= user_id <= _UINT64_MASK:
+        raise ValueError(f"user id should be in range [0, 2^64), but got: {user_id}")
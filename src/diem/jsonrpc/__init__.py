@@ -20,39 +20,130 @@ See [Diem JSON-RPC API SPEC](https://github.com/libra/libra/blob/master/json-rpc
 
 """
 
-from .client import (
-    Client,
-    State,
-    Retry,
-    RequestStrategy,
-    RequestWithBackups,
+import importlib, typing
+
+if typing.TYPE_CHECKING:
+    from .client import (
+        Client,
+        State,
+        Retry,
+        RequestStrategy,
+        RequestWithBackups,
+        RequestWithLoadBalancing,
+        EndpointHealth,
+        RequestWithHedging,
+        # Exceptions
+        JsonRpcError,
+        NetworkError,
+        InvalidServerResponse,
+        StaleResponseError,
+        TransactionHashMismatchError,
+        TransactionExecutionFailed,
+        TransactionExpired,
+        WaitForTransactionTimeout,
+        AccountNotFoundError,
+    )
+    from .metrics import (
+        Observer,
+        MetricsObserver,
+        MetricsRegistry,
+        LatencyHistogram,
+    )
+    from .rate_limit import (
+        RateLimiter,
+        Limit,
+        Governor,
+        READ,
+        SUBMIT,
+    )
+    from .jsonrpc_pb2 import (
+        Amount,
+        Metadata,
+        CurrencyInfo,
+        Account,
+        AccountRole,
+        Transaction,
+        TransactionData,
+        Script,
+        Event,
+        EventData,
+        VMStatus,
+        StateProof,
+        AccountStateWithProof,
+        AccountStateProof,
+    )
+
+
+# exported name => module defines it, modules are imported on first access of the exported names,
+# so that importing `diem.jsonrpc.constants` or the package does not load protobuf and requests
+_EXPORTS: typing.Dict[str, str] = {
+    "Client": "client",
+    "State": "client",
+    "Retry": "client",
+    "RequestStrategy": "client",
+    "RequestWithBackups": "client",
+    "RequestWithLoadBalancing": "client",
+    "EndpointHealth": "client",
+    "RequestWithHedging": "client",
     # Exceptions
-    JsonRpcError,
-    NetworkError,
-    InvalidServerResponse,
-    StaleResponseError,
-    TransactionHashMismatchError,
-    TransactionExecutionFailed,
-    TransactionExpired,
-    WaitForTransactionTimeout,
-    AccountNotFoundError,
-)
-from .jsonrpc_pb2 import (
-    Amount,
-    Metadata,
-    CurrencyInfo,
-    Account,
-    AccountRole,
-    Transaction,
-    TransactionData,
-    Script,
-    Event,
-    EventData,
-    VMStatus,
-    StateProof,
-    AccountStateWithProof,
-    AccountStateProof,
-)
+    "JsonRpcError": "client",
+    "NetworkError": "client",
+    "InvalidServerResponse": "client",
+    "StaleResponseError": "client",
+    "TransactionHashMismatchError": "client",
+    "TransactionExecutionFailed": "client",
+    "TransactionExpired": "client",
+    "WaitForTransactionTimeout": "client",
+    "AccountNotFoundError": "client",
+    "Observer": "metrics",
+    "MetricsObserver": "metrics",
+    "MetricsRegistry": "metrics",
+    "LatencyHistogram": "metrics",
+    "RateLimiter": "rate_limit",
+    "Limit": "rate_limit",
+    "Governor": "rate_limit",
+    "READ": "rate_limit",
+    "SUBMIT": "rate_limit",
+    "Amount": "jsonrpc_pb2",
+    "Metadata": "jsonrpc_pb2",
+    "CurrencyInfo": "jsonrpc_pb2",
+    "Account": "jsonrpc_pb2",
+    "AccountRole": "jsonrpc_pb2",
+    "Transaction": "jsonrpc_pb2",
+    "TransactionData": "jsonrpc_pb2",
+    "Script": "jsonrpc_pb2",
+    "Event": "jsonrpc_pb2",
+    "EventData": "jsonrpc_pb2",
+    "VMStatus": "jsonrpc_pb2",
+    "StateProof": "jsonrpc_pb2",
+    "AccountStateWithProof": "jsonrpc_pb2",
+    "AccountStateProof": "jsonrpc_pb2",
+}
+
+_SUBMODULES: typing.Set[str] = {
+    "client",
+    "constants",
+    "jsonrpc_pb2",
+    "metrics",
+    "rate_limit",
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> typing.List[str]:
+    return sorted(set(globals()) | set(_EXPORTS) | _SUBMODULES)
+
+
 from .constants import (
     # AccountRole#type field values
     ACCOUNT_ROLE_UNKNOWN,
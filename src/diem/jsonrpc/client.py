@@ -3,19 +3,21 @@
 
 
 import time
-import copy
+import contextlib
 import dataclasses
 import google.protobuf.json_format as parser
 import requests
 import threading
 import typing
-import random, queue
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import random, queue, collections
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
 
 from .. import diem_types, utils
 from . import jsonrpc_pb2 as rpc
 from . import constants
+from .metrics import LatencyHistogram, Observer
+from .rate_limit import RateLimiter
 
 
 DEFAULT_CONNECT_TIMEOUT_SECS: float = 5.0
@@ -60,7 +62,7 @@ class AccountNotFoundError(ValueError):
     pass
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class State:
     chain_id: int
     version: int
@@ -96,7 +98,9 @@ class RequestStrategy:
     def send_request(
         self, client: "Client", request: typing.Dict[str, typing.Any], ignore_stale_response: bool
     ) -> typing.Dict[str, typing.Any]:
-        return client._send_http_request(client._url, request, ignore_stale_response)
+        json = client._send_http_request(client._url, request, ignore_stale_response)
+        client._observe_endpoint_selected(client._url, request)
+        return json
 
 
 class RequestWithBackups(RequestStrategy):
@@ -145,28 +149,395 @@ class RequestWithBackups(RequestStrategy):
     def send_request(
         self, client: "Client", request: typing.Dict[str, typing.Any], ignore_stale_response: bool
     ) -> typing.Dict[str, typing.Any]:
+        backup_url = random.choice(self._backups)
         primary = self._executor.submit(client._send_http_request, client._url, request, ignore_stale_response)
-        backup = self._executor.submit(
-            client._send_http_request, random.choice(self._backups), request, ignore_stale_response
-        )
+        backup = self._executor.submit(client._send_http_request, backup_url, request, ignore_stale_response)
 
         if self._fallback:
-            return self._fallback_to_backup(primary, backup)
-        return self._first_success(primary, backup)
+            winner = self._fallback_to_backup(primary, backup)
+        else:
+            winner = self._first_success(primary, backup)
+        json = winner.result()
+        client._observe_endpoint_selected(client._url if winner is primary else backup_url, request)
+        return json
 
-    def _fallback_to_backup(self, primary: Future, backup: Future) -> typing.Dict[str, typing.Any]:
+    def _fallback_to_backup(self, primary: Future, backup: Future) -> Future:
         try:
-            return primary.result()
+            primary.result()
+            return primary
         except Exception as e:
-            return backup.result()
+            backup.result()
+            return backup
 
-    def _first_success(self, primary: Future, backup: Future) -> typing.Dict[str, typing.Any]:
+    def _first_success(self, primary: Future, backup: Future) -> Future:
         futures = as_completed({primary, backup})
         first = next(futures)
         try:
-            return first.result()
+            first.result()
+            return first
         except Exception:
-            return next(futures).result()
+            second = next(futures)
+            second.result()
+            return second
+
+
+class EndpointHealth:
+    """EndpointHealth tracks the health of one JSON-RPC server endpoint.
+
+    It keeps an exponentially weighted moving average (EWMA) of response latency and error rate,
+    the last ledger version seen in responses, and recent latency samples for percentile queries.
+
+    A circuit breaker ejects the endpoint after `failure_threshold` consecutive failures. Once
+    `reset_timeout_secs` has passed, one trial request is allowed through (half-open); the endpoint
+    is reinstated if it succeeds, otherwise the breaker opens again.
+
+    EndpointHealth is not thread-safe, callers should synchronize access.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ewma_alpha: float = 0.2,
+        failure_threshold: int = 3,
+        reset_timeout_secs: float = 10.0,
+        max_latency_samples: int = 100,
+    ) -> None:
+        self.url: str = url
+        self.latency_ewma_secs: typing.Optional[float] = None
+        self.error_rate: float = 0.0
+        self.ledger_version: int = -1
+        self.consecutive_failures: int = 0
+        self.opened_at: typing.Optional[float] = None
+        self._half_open_trial: bool = False
+        self._ewma_alpha = ewma_alpha
+        self._failure_threshold = failure_threshold
+        self._reset_timeout_secs = reset_timeout_secs
+        self._latencies: typing.Deque[float] = collections.deque(maxlen=max_latency_samples)
+
+    def record_success(self, latency_secs: float, ledger_version: typing.Optional[int]) -> None:
+        self._record_latency(latency_secs)
+        self.error_rate = self._ewma(self.error_rate, 0.0)
+        if ledger_version is not None and ledger_version > self.ledger_version:
+            self.ledger_version = ledger_version
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._half_open_trial = False
+
+    def record_failure(self, latency_secs: float) -> None:
+        self._record_latency(latency_secs)
+        self.error_rate = self._ewma(self.error_rate, 1.0)
+        self.consecutive_failures += 1
+        if self._half_open_trial or self.consecutive_failures >= self._failure_threshold:
+            self.opened_at = time.time()
+        self._half_open_trial = False
+
+    def is_available(self) -> bool:
+        """returns True if circuit breaker is closed, or it is half-open and no trial request is in flight"""
+
+        if self.opened_at is None:
+            return True
+        return not self._half_open_trial and time.time() - self.opened_at >= self._reset_timeout_secs
+
+    def acquire(self) -> None:
+        """mark a request is sent to the endpoint; the first request after the breaker opened is the trial"""
+
+        if self.opened_at is not None:
+            self._half_open_trial = True
+
+    def release(self) -> None:
+        """end a request without recording its result, e.g. the request failed because of a client error
+
+        A half-open endpoint allows the next request as the trial.
+        """
+
+        self._half_open_trial = False
+
+    def latency_percentile(self, percentile: float) -> typing.Optional[float]:
+        if not self._latencies:
+            return None
+        samples = sorted(self._latencies)
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+    def num_latency_samples(self) -> int:
+        return len(self._latencies)
+
+    def score(self, max_ledger_version: int, lag_penalty_secs: float) -> float:
+        """lower is better; endpoints without any samples score 0 so that they get probed first"""
+
+        latency = self.latency_ewma_secs or 0.0
+        lag = max(0, max_ledger_version - self.ledger_version) if self.ledger_version >= 0 else 0
+        return latency * (1 + self.error_rate * 10) + lag * lag_penalty_secs
+
+    def _record_latency(self, latency_secs: float) -> None:
+        self._latencies.append(latency_secs)
+        if self.latency_ewma_secs is None:
+            self.latency_ewma_secs = latency_secs
+        else:
+            self.latency_ewma_secs = self._ewma(self.latency_ewma_secs, latency_secs)
+
+    def _ewma(self, current: float, value: float) -> float:
+        return current + self._ewma_alpha * (value - current)
+
+
+class RequestWithLoadBalancing(RequestStrategy):
+    """RequestWithLoadBalancing routes each request to the healthiest endpoint among primary and backups.
+
+    Every endpoint is tracked by an `EndpointHealth`: latency EWMA, error rate EWMA and ledger version
+    lag (the ledger version in responses compared with the most recent version seen from any endpoint).
+    Requests go to the endpoint with the lowest score; unlike `RequestWithBackups`, no duplicate request
+    is sent unless the selected endpoint fails or is slow:
+
+    1. if the selected endpoint fails, the request is retried on the next best endpoint.
+    2. if the selected endpoint has not responded after its `hedge_percentile` latency (computed once it
+       has `min_hedge_samples` samples), a hedged request is sent to the next best endpoint and the first
+       success response is returned.
+
+    Endpoints with `failure_threshold` consecutive failures are ejected until `reset_timeout_secs` passed,
+    then one trial request decides whether they are reinstated. When all endpoints are ejected, requests
+    are still sent to the best scored endpoint instead of failing immediately; retried or hedged requests
+    are only sent to endpoints that pass the circuit breaker when they are sent.
+
+    Only transport errors, 5xx responses, invalid (non-json) responses and stale responses are counted as
+    endpoint failures; other errors, e.g. 4xx responses for bad requests, don't change endpoint health.
+
+    ```python
+    from concurrent.futures import ThreadPoolExecutor
+    from diem import jsonrpc
+
+    executor = ThreadPoolExecutor(5)
+    jsonrpc.Client(
+        <primary-json-rpc-server-url>
+        rs=jsonrpc.RequestWithLoadBalancing(backups=[<backup-json-rpc-server-url>...], executor=executor),
+    )
+    ```
+    """
+
+    def __init__(
+        self,
+        backups: typing.List[str],
+        executor: ThreadPoolExecutor,
+        hedge_percentile: float = 95,
+        min_hedge_samples: int = 20,
+        failure_threshold: int = 3,
+        reset_timeout_secs: float = 10.0,
+        ewma_alpha: float = 0.2,
+        lag_penalty_secs: float = 0.01,
+    ) -> None:
+        self._executor = executor
+        self._hedge_percentile = hedge_percentile
+        self._min_hedge_samples = min_hedge_samples
+        self._lag_penalty_secs = lag_penalty_secs
+        self._health_args: typing.Dict[str, typing.Any] = {
+            "ewma_alpha": ewma_alpha,
+            "failure_threshold": failure_threshold,
+            "reset_timeout_secs": reset_timeout_secs,
+        }
+        self._lock = threading.Lock()
+        self._endpoints: typing.Dict[str, EndpointHealth] = {}
+        for url in backups:
+            self._endpoint(url)
+
+    def endpoints(self) -> typing.List[EndpointHealth]:
+        """returns health of all known endpoints"""
+
+        with self._lock:
+            return list(self._endpoints.values())
+
+    def send_request(
+        self, client: "Client", request: typing.Dict[str, typing.Any], ignore_stale_response: bool
+    ) -> typing.Dict[str, typing.Any]:
+        first, second, hedge_delay = self._select(client._url)
+        primary = (first, lambda: self._send_http_request(client, first, request, ignore_stale_response))
+        backup = None
+        if second:
+            backup = (second, lambda: self._send_backup_request(client, second, request, ignore_stale_response))
+        url, json = _send_with_hedging(self._executor, primary, backup, hedge_delay, self._release_cancelled(first))
+        client._observe_endpoint_selected(url, request)
+        return json
+
+    def _release_cancelled(self, first: str) -> typing.Callable[[str], None]:
+        """the first endpoint is acquired when selected, it is released if its request is cancelled before sent
+
+        The backup endpoint is acquired when its request is sent, hence there is nothing to release for it.
+        """
+
+        def release(url: str) -> None:
+            if url == first:
+                with self._lock:
+                    self._endpoints[url].release()
+
+        return release
+
+    def _select(self, primary: str) -> typing.Tuple[str, typing.Optional[str], typing.Optional[float]]:
+        with self._lock:
+            self._endpoint(primary)
+            endpoints = list(self._endpoints.values())
+            max_version = max(e.ledger_version for e in endpoints)
+            # sort is stable, primary is preferred when scores are the same
+            ranked = sorted(endpoints, key=lambda e: e.score(max_version, self._lag_penalty_secs))
+            available = [e for e in ranked if e.is_available()] or ranked
+            first = available[0]
+            first.acquire()
+            second = available[1] if len(available) > 1 else None
+            hedge_delay = None
+            if first.num_latency_samples() >= self._min_hedge_samples:
+                hedge_delay = first.latency_percentile(self._hedge_percentile)
+            return (first.url, second.url if second else None, hedge_delay)
+
+    def _endpoint(self, url: str) -> EndpointHealth:
+        if url not in self._endpoints:
+            self._endpoints[url] = EndpointHealth(url, **self._health_args)
+        return self._endpoints[url]
+
+    def _send_backup_request(
+        self, client: "Client", url: str, request: typing.Dict[str, typing.Any], ignore_stale_response: bool
+    ) -> typing.Dict[str, typing.Any]:
+        with self._lock:
+            endpoint = self._endpoints[url]
+            if not endpoint.is_available():
+                raise NetworkError(f"circuit breaker of endpoint {url} is open")
+            endpoint.acquire()
+        return self._send_http_request(client, url, request, ignore_stale_response)
+
+    def _send_http_request(
+        self, client: "Client", url: str, request: typing.Dict[str, typing.Any], ignore_stale_response: bool
+    ) -> typing.Dict[str, typing.Any]:
+        start = time.time()
+        try:
+            json = client._send_http_request(url, request, ignore_stale_response)
+        except Exception as e:
+            with self._lock:
+                if _is_endpoint_failure(e):
+                    self._endpoints[url].record_failure(time.time() - start)
+                else:
+                    self._endpoints[url].release()
+            raise
+        with self._lock:
+            self._endpoints[url].record_success(time.time() - start, json.get("libra_ledger_version"))
+        return json
+
+
+class RequestWithHedging(RequestStrategy):
+    """RequestWithHedging sends request to primary, and hedges to a backup only when primary is slow.
+
+    Request is sent to the primary url first. If the primary has not responded after the observed
+    `percentile` latency of primary, the same request is sent to one of random picked backup urls,
+    and the first success response is returned; the other request is cancelled if it is still queued
+    in the executor (a running http request can't be interrupted, its response is ignored).
+    If the primary request fails before the hedge delay, the request is sent to backup immediately.
+
+    `initial_hedge_delay_secs` is used as hedge delay until the primary latency histogram has
+    `min_samples` observations. Only latencies of success primary responses are observed. The
+    histogram is exposed by the `histogram` property.
+
+    ```python
+    from concurrent.futures import ThreadPoolExecutor
+    from diem import jsonrpc
+
+    executor = ThreadPoolExecutor(5)
+    rs = jsonrpc.RequestWithHedging(backups=[<backup-json-rpc-server-url>...], executor=executor)
+    client = jsonrpc.Client(<primary-json-rpc-server-url>, rs=rs)
+    client.get_metadata()
+    print(rs.histogram.percentile(95))
+    ```
+    """
+
+    def __init__(
+        self,
+        backups: typing.List[str],
+        executor: ThreadPoolExecutor,
+        percentile: float = 95,
+        min_samples: int = 20,
+        initial_hedge_delay_secs: float = 1.0,
+        histogram: typing.Optional[LatencyHistogram] = None,
+    ) -> None:
+        self._backups = backups
+        self._executor = executor
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._initial_hedge_delay_secs = initial_hedge_delay_secs
+        self._histogram: LatencyHistogram = histogram or LatencyHistogram()
+
+    @property
+    def histogram(self) -> LatencyHistogram:
+        """latency histogram of primary responses, it is used for calculating hedge delay"""
+
+        return self._histogram
+
+    def hedge_delay_secs(self) -> float:
+        if self._histogram.count < self._min_samples:
+            return self._initial_hedge_delay_secs
+        return typing.cast(float, self._histogram.percentile(self._percentile))
+
+    def send_request(
+        self, client: "Client", request: typing.Dict[str, typing.Any], ignore_stale_response: bool
+    ) -> typing.Dict[str, typing.Any]:
+        backup = random.choice(self._backups)
+        url, json = _send_with_hedging(
+            self._executor,
+            (client._url, lambda: self._send_primary_request(client, request, ignore_stale_response)),
+            (backup, lambda: client._send_http_request(backup, request, ignore_stale_response)),
+            self.hedge_delay_secs(),
+        )
+        client._observe_endpoint_selected(url, request)
+        return json
+
+    def _send_primary_request(
+        self, client: "Client", request: typing.Dict[str, typing.Any], ignore_stale_response: bool
+    ) -> typing.Dict[str, typing.Any]:
+        start = time.time()
+        json = client._send_http_request(client._url, request, ignore_stale_response)
+        # failures are not observed: fast failures would lower the hedge delay and cause excessive hedging
+        self._histogram.observe(time.time() - start)
+        return json
+
+
+def _is_endpoint_failure(e: Exception) -> bool:
+    """returns True if the error is caused by the endpoint: transport error, 5xx, invalid or stale response"""
+
+    if isinstance(e, requests.HTTPError):
+        return e.response is None or e.response.status_code >= 500
+    return isinstance(e, (requests.RequestException, NetworkError, InvalidServerResponse, StaleResponseError))
+
+
+def _send_with_hedging(
+    executor: ThreadPoolExecutor,
+    primary: typing.Tuple[str, typing.Callable[[], typing.Dict[str, typing.Any]]],
+    backup: typing.Optional[typing.Tuple[str, typing.Callable[[], typing.Dict[str, typing.Any]]]],
+    hedge_delay: typing.Optional[float],
+    on_cancelled: typing.Optional[typing.Callable[[str], None]] = None,
+) -> typing.Tuple[str, typing.Dict[str, typing.Any]]:
+    """send by primary (url, fn), call backup fn if primary failed or did not complete in hedge_delay secs
+
+    Returns url and response of the first success request, the loser is cancelled if it is not started yet,
+    and `on_cancelled` is called with the url of the cancelled request.
+    """
+
+    primary_future = executor.submit(primary[1])
+    if backup is None:
+        return (primary[0], primary_future.result())
+
+    done, _ = wait([primary_future], timeout=hedge_delay)
+    if primary_future in done and primary_future.exception() is None:
+        return (primary[0], primary_future.result())
+
+    backup_future = executor.submit(backup[1])
+    urls = {primary_future: primary[0], backup_future: backup[0]}
+    futures = as_completed(urls.keys())
+    first = next(futures)
+    try:
+        ret = first.result()
+    except Exception:
+        second = next(futures)
+        if second is backup_future and second.exception() is not None:
+            # both failed, raise the primary error
+            primary_future.result()
+        return (urls[second], second.result())
+    loser = backup_future if first is primary_future else primary_future
+    if loser.cancel() and on_cancelled:
+        on_cancelled(urls[loser])
+    return (urls[first], ret)
 
 
 class Client:
@@ -182,6 +553,8 @@ class Client:
         timeout: typing.Optional[typing.Tuple[float, float]] = None,
         retry: typing.Optional[Retry] = None,
         rs: typing.Optional[RequestStrategy] = None,
+        observer: typing.Optional[Observer] = None,
+        rate_limiter: typing.Optional[RateLimiter] = None,
     ) -> None:
         self._url: str = server_url
         self._session: requests.Session = session or requests.Session()
@@ -190,6 +563,8 @@ class Client:
         self._lock = threading.Lock()
         self._retry: Retry = retry or Retry(5, 0.2, StaleResponseError)
         self._rs: RequestStrategy = rs or RequestStrategy()
+        self._observer: typing.Optional[Observer] = observer
+        self._rate_limiter: typing.Optional[RateLimiter] = rate_limiter
 
     # high level functions
 
@@ -269,8 +644,8 @@ class Client:
         server.
         """
 
-        with self._lock:
-            return copy.copy(self._last_known_server_state)
+        # State is immutable, reading the reference is atomic
+        return self._last_known_server_state
 
     def update_last_known_state(self, chain_id: int, version: int, timestamp_usecs: int) -> None:
         """update last known server state
@@ -280,6 +655,11 @@ class Client:
         Raises StaleResponseError if version or timestamp_usecs is less than previous values
         """
 
+        curr = self._last_known_server_state
+        if curr.chain_id == chain_id and curr.version == version and curr.timestamp_usecs == timestamp_usecs:
+            # responses of the same ledger state are common, no need to take the lock
+            return
+
         with self._lock:
             curr = self._last_known_server_state
             if curr.chain_id != -1 and curr.chain_id != chain_id:
@@ -288,12 +668,7 @@ class Client:
                 raise StaleResponseError(f"last known version {curr.version} > {version}")
             if curr.timestamp_usecs > timestamp_usecs:
                 raise StaleResponseError(f"last known timestamp_usecs {curr.timestamp_usecs} > {timestamp_usecs}")
-
-            self._last_known_server_state = State(
-                chain_id=chain_id,
-                version=version,
-                timestamp_usecs=timestamp_usecs,
-            )
+            self._last_known_server_state = State(chain_id=chain_id, version=version, timestamp_usecs=timestamp_usecs)
 
     def get_metadata(
         self,
@@ -513,9 +888,22 @@ class Client:
         Should only be called by get methods.
         """
 
-        return self._retry.execute(
-            lambda: self.execute_without_retry(method, params, result_parser, ignore_stale_response)
-        )
+        observer = self._observer
+        if observer is None:
+            return self._retry.execute(
+                lambda: self.execute_without_retry(method, params, result_parser, ignore_stale_response)
+            )
+
+        tries = 0
+
+        def execute_and_observe_retry():  # pyre-ignore
+            nonlocal tries
+            if tries > 0:
+                observer.on_retry(method, tries)
+            tries += 1
+            return self.execute_without_retry(method, params, result_parser, ignore_stale_response)
+
+        return self._retry.execute(execute_and_observe_retry)
 
     # pyre-ignore
     def execute_without_retry(
@@ -538,6 +926,27 @@ class Client:
         Raises NetworkError if send http request failed, or received server response status is not 200.
         """
 
+        observer = self._observer
+        if observer is None:
+            return self._execute_without_retry(method, params, result_parser, ignore_stale_response)
+
+        start = time.time()
+        try:
+            ret = self._execute_without_retry(method, params, result_parser, ignore_stale_response)
+        except Exception as e:
+            observer.on_call(method, time.time() - start, e)
+            raise
+        observer.on_call(method, time.time() - start, None)
+        return ret
+
+    # pyre-ignore
+    def _execute_without_retry(
+        self,
+        method: str,
+        params: typing.List[typing.Any],  # pyre-ignore
+        result_parser: typing.Optional[typing.Callable] = None,  # pyre-ignore
+        ignore_stale_response: typing.Optional[bool] = None,
+    ):
         request = {
             "jsonrpc": "2.0",
             "id": 1,
@@ -552,7 +961,7 @@ class Client:
 
             if "result" in json:
                 if result_parser:
-                    return result_parser(json["result"])
+                    return self._parse_result(method, result_parser, json["result"])
                 return
 
             raise InvalidServerResponse(f"No error or result in response: {json}")
@@ -567,12 +976,22 @@ class Client:
         request: typing.Dict[str, typing.Any],
         ignore_stale_response: bool,
     ) -> typing.Dict[str, typing.Any]:
-        response = self._session.post(url, json=request, timeout=self._timeout)
-        response.raise_for_status()
-        try:
-            json = response.json()
-        except ValueError as e:
-            raise InvalidServerResponse(f"Parse response as json failed: {e}, response: {response.text}")
+        with self._rate_limiter.acquire(url, request["method"]) if self._rate_limiter else contextlib.nullcontext():
+            start = time.time() if self._observer else 0.0
+            response = None
+            try:
+                response = self._session.post(url, json=request, timeout=self._timeout)
+                response.raise_for_status()
+                try:
+                    json = response.json()
+                except ValueError as e:
+                    raise InvalidServerResponse(f"Parse response as json failed: {e}, response: {response.text}")
+            except Exception as e:
+                if self._observer:
+                    self._observe_http_request(url, request, start, response, e)
+                raise
+            if self._observer:
+                self._observe_http_request(url, request, start, response, None)
 
         # check stable response before check jsonrpc error
         try:
@@ -584,9 +1003,41 @@ class Client:
         except StaleResponseError as e:
             if not ignore_stale_response:
                 raise e
+            if self._observer:
+                self._observer.on_stale_response_ignored(url, request["method"])
 
         return json
 
+    # pyre-ignore
+    def _parse_result(self, method: str, result_parser: typing.Callable, result: typing.Any):
+        if self._observer is None:
+            return result_parser(result)
+
+        start = time.time()
+        ret = result_parser(result)
+        self._observer.on_result_parsed(method, time.time() - start)
+        return ret
+
+    def _observe_http_request(
+        self,
+        url: str,
+        request: typing.Dict[str, typing.Any],
+        start: float,
+        response: typing.Optional[requests.Response],
+        error: typing.Optional[Exception],
+    ) -> None:
+        bytes_sent = bytes_received = 0
+        if response is not None:
+            bytes_sent = len(response.request.body or b"") if response.request else 0
+            bytes_received = len(response.content or b"")
+        typing.cast(Observer, self._observer).on_http_request(
+            url, request["method"], time.time() - start, bytes_sent, bytes_received, error
+        )
+
+    def _observe_endpoint_selected(self, url: str, request: typing.Dict[str, typing.Any]) -> None:
+        if self._observer:
+            self._observer.on_endpoint_selected(url, request["method"])
+
 
 def _parse_obj(factory):  # pyre-ignore
     return lambda result: parser.ParseDict(result, factory(), ignore_unknown_fields=True) if result else None
@@ -0,0 +1,357 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides instrumentation hooks and an in-process metrics registry for jsonrpc.Client
+
+`Observer` defines callbacks invoked by `jsonrpc.Client` for every JSON-RPC call; the default
+is no observer, and client skips all measurements.
+`MetricsObserver` records the events into a Prometheus-style `MetricsRegistry`:
+
+```python3
+
+>>> from diem import jsonrpc, testnet
+>>> registry = jsonrpc.MetricsRegistry()
+>>> client = jsonrpc.Client(testnet.JSON_RPC_URL, observer=jsonrpc.MetricsObserver(registry))
+>>> client.get_metadata()
+>>> print(registry.expose())
+# HELP diem_jsonrpc_call_duration_seconds JSON-RPC call latency, including parsing result
+# TYPE diem_jsonrpc_call_duration_seconds histogram
+diem_jsonrpc_call_duration_seconds_bucket{method="get_metadata",le="0.001"} 0
+...
+
+```
+
+"""
+
+import bisect
+import threading
+import typing
+
+
+class LatencyHistogram:
+    """LatencyHistogram is a thread-safe histogram of latencies in seconds.
+
+    Observed values are counted into buckets by upper bounds, like Prometheus histogram.
+    Percentiles are estimated by linear interpolation within the bucket.
+    """
+
+    DEFAULT_BUCKETS: typing.Tuple[float, ...] = (
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+    )
+
+    def __init__(self, buckets: typing.Optional[typing.Sequence[float]] = None) -> None:
+        self._bounds: typing.List[float] = sorted(buckets or self.DEFAULT_BUCKETS)
+        self._counts: typing.List[int] = [0] * (len(self._bounds) + 1)
+        self._count: int = 0
+        self._sum: float = 0.0
+        self._max: float = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, secs: float) -> None:
+        index = bisect.bisect_left(self._bounds, secs)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += secs
+            self._max = max(self._max, secs)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def buckets(self) -> typing.List[typing.Tuple[float, int]]:
+        """returns cumulative counts by bucket upper bound, the last bucket upper bound is `inf`"""
+
+        with self._lock:
+            counts = list(self._counts)
+        ret = []
+        total = 0
+        for bound, count in zip(self._bounds + [float("inf")], counts):
+            total += count
+            ret.append((bound, total))
+        return ret
+
+    def percentile(self, percentile: float) -> typing.Optional[float]:
+        """estimates latency percentile (0-100), returns None if there is no observation"""
+
+        with self._lock:
+            counts = list(self._counts)
+            count = self._count
+            max_value = self._max
+        if count == 0:
+            return None
+
+        rank = count * percentile / 100
+        total = 0
+        for i, bucket_count in enumerate(counts):
+            if bucket_count and total + bucket_count >= rank:
+                lower = self._bounds[i - 1] if i > 0 else 0.0
+                upper = self._bounds[i] if i < len(self._bounds) else max_value
+                return min(max_value, lower + (upper - lower) * (rank - total) / bucket_count)
+            total += bucket_count
+        return max_value
+
+
+class Observer:
+    """Observer base class receives events of jsonrpc.Client calls
+
+    All methods do nothing by default, subclass overrides methods it is interested in.
+    Methods are called from threads sending requests, hence implementation should be thread-safe
+    and fast.
+    """
+
+    def on_call(self, method: str, duration_secs: float, error: typing.Optional[Exception]) -> None:
+        """called when a JSON-RPC method call (one try, including parsing result) completed"""
+
+    def on_retry(self, method: str, retries: int) -> None:
+        """called before `Retry` retries a JSON-RPC method call, retries starts from 1"""
+
+    def on_http_request(
+        self,
+        url: str,
+        method: str,
+        duration_secs: float,
+        bytes_sent: int,
+        bytes_received: int,
+        error: typing.Optional[Exception],
+    ) -> None:
+        """called when a http request completed; `RequestStrategy` may send multiple http requests for one call"""
+
+    def on_result_parsed(self, method: str, duration_secs: float) -> None:
+        """called after JSON-RPC response result is parsed"""
+
+    def on_stale_response_ignored(self, url: str, method: str) -> None:
+        """called when StaleResponseError is swallowed because stale response is ignored for the call"""
+
+    def on_endpoint_selected(self, url: str, method: str) -> None:
+        """called with the url of server whose response is returned by `RequestStrategy`"""
+
+
+Labels = typing.Tuple[typing.Tuple[str, str], ...]
+
+
+class Counter:
+    """Counter is a thread-safe monotonically increasing value by labels"""
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self._values: typing.Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_labels(labels), 0)
+
+    def collect(self) -> typing.List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in values]
+
+
+class Gauge:
+    """Gauge is a thread-safe value by labels that can go up and down"""
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self._values: typing.Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_labels(labels), 0)
+
+    def collect(self) -> typing.List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in values]
+
+
+class Histogram:
+    """Histogram holds a `LatencyHistogram` by labels"""
+
+    def __init__(self, name: str, help: str, buckets: typing.Optional[typing.Sequence[float]] = None) -> None:
+        self.name = name
+        self.help = help
+        self._buckets = buckets
+        self._histograms: typing.Dict[Labels, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        self.labels(**labels).observe(value)
+
+    def labels(self, **labels: str) -> LatencyHistogram:
+        key = _labels(labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram(self._buckets))
+        return histogram
+
+    def collect(self) -> typing.List[str]:
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+        lines = []
+        for labels, histogram in histograms:
+            for bound, count in histogram.buckets():
+                le = labels + (("le", "+Inf" if bound == float("inf") else _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {histogram.count}")
+        return lines
+
+
+Metric = typing.Union[Counter, Gauge, Histogram]
+
+_METRIC_TYPES: typing.Dict[type, str] = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}
+
+
+class MetricsRegistry:
+    """MetricsRegistry is an in-process registry of counters, gauges and histograms
+
+    `expose` renders all metrics in Prometheus text exposition format, which can be served by
+    your application metrics endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: typing.Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return typing.cast(Counter, self._register(name, lambda: Counter(name, help)))
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return typing.cast(Gauge, self._register(name, lambda: Gauge(name, help)))
+
+    def histogram(
+        self, name: str, help: str = "", buckets: typing.Optional[typing.Sequence[float]] = None
+    ) -> Histogram:
+        return typing.cast(Histogram, self._register(name, lambda: Histogram(name, help, buckets)))
+
+    def get(self, name: str) -> typing.Optional[Metric]:
+        return self._metrics.get(name)
+
+    def expose(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {_METRIC_TYPES[type(metric)]}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, name: str, factory: typing.Callable[[], Metric]) -> Metric:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+
+class MetricsObserver(Observer):
+    """MetricsObserver records jsonrpc.Client events into a MetricsRegistry
+
+    Metrics:
+
+    * diem_jsonrpc_call_duration_seconds{method}: histogram of call latency.
+    * diem_jsonrpc_calls_total{method,result}: count of calls, result is "success" or "error".
+    * diem_jsonrpc_retries_total{method}: count of retries taken by `Retry`.
+    * diem_jsonrpc_http_request_duration_seconds{url}: histogram of http request latency.
+    * diem_jsonrpc_http_requests_total{url,result}: count of http requests.
+    * diem_jsonrpc_request_bytes_total{method}: bytes sent in http request body.
+    * diem_jsonrpc_response_bytes_total{method}: bytes received in http response body.
+    * diem_jsonrpc_parse_duration_seconds{method}: histogram of parsing result time.
+    * diem_jsonrpc_stale_responses_ignored_total{url,method}: count of swallowed stale responses.
+    * diem_jsonrpc_endpoint_selected_total{url}: count of responses returned by `RequestStrategy` per server.
+    """
+
+    def __init__(self, registry: typing.Optional[MetricsRegistry] = None) -> None:
+        self.registry: MetricsRegistry = registry or MetricsRegistry()
+        r = self.registry
+        self._call_duration = r.histogram(
+            "diem_jsonrpc_call_duration_seconds", "JSON-RPC call latency, including parsing result"
+        )
+        self._calls = r.counter("diem_jsonrpc_calls_total", "JSON-RPC calls")
+        self._retries = r.counter("diem_jsonrpc_retries_total", "JSON-RPC call retries")
+        self._http_duration = r.histogram("diem_jsonrpc_http_request_duration_seconds", "HTTP request latency")
+        self._http_requests = r.counter("diem_jsonrpc_http_requests_total", "HTTP requests")
+        self._bytes_sent = r.counter("diem_jsonrpc_request_bytes_total", "HTTP request body bytes")
+        self._bytes_received = r.counter("diem_jsonrpc_response_bytes_total", "HTTP response body bytes")
+        self._parse_duration = r.histogram("diem_jsonrpc_parse_duration_seconds", "JSON-RPC result parsing time")
+        self._stale = r.counter("diem_jsonrpc_stale_responses_ignored_total", "Ignored stale responses")
+        self._endpoint = r.counter("diem_jsonrpc_endpoint_selected_total", "Responses returned by server")
+
+    def on_call(self, method: str, duration_secs: float, error: typing.Optional[Exception]) -> None:
+        self._call_duration.observe(duration_secs, method=method)
+        self._calls.inc(method=method, result=_result(error))
+
+    def on_retry(self, method: str, retries: int) -> None:
+        self._retries.inc(method=method)
+
+    def on_http_request(
+        self,
+        url: str,
+        method: str,
+        duration_secs: float,
+        bytes_sent: int,
+        bytes_received: int,
+        error: typing.Optional[Exception],
+    ) -> None:
+        self._http_duration.observe(duration_secs, url=url)
+        self._http_requests.inc(url=url, result=_result(error))
+        self._bytes_sent.inc(bytes_sent, method=method)
+        self._bytes_received.inc(bytes_received, method=method)
+
+    def on_result_parsed(self, method: str, duration_secs: float) -> None:
+        self._parse_duration.observe(duration_secs, method=method)
+
+    def on_stale_response_ignored(self, url: str, method: str) -> None:
+        self._stale.inc(url=url, method=method)
+
+    def on_endpoint_selected(self, url: str, method: str) -> None:
+        self._endpoint.inc(url=url)
+
+
+def _result(error: typing.Optional[Exception]) -> str:
+    return "success" if error is None else "error"
+
+
+def _labels(labels: typing.Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    values = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels)
+    return "{%s}" % values
+
+
+def _format_value(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(value)
@@ -0,0 +1,204 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides client side rate limiting for jsonrpc.Client
+
+`RateLimiter` applies a token bucket rate limit and a max in-flight requests limit per server
+endpoint and per method class (`READ` for all get methods, `SUBMIT` for submitting transactions).
+Requests exceeding the limits wait in queue until they can be sent, instead of failing.
+
+```python3
+
+>>> from diem import jsonrpc, testnet
+>>> limiter = jsonrpc.RateLimiter(
+...     read=jsonrpc.Limit(requests_per_sec=50, burst=10, max_in_flight=8),
+...     submit=jsonrpc.Limit(requests_per_sec=5, burst=5, max_in_flight=2),
+... )
+>>> client = jsonrpc.Client(testnet.JSON_RPC_URL, rate_limiter=limiter)
+
+```
+
+One RateLimiter can be shared by multiple clients and threads, limits are applied to the total
+requests sent to the same endpoint. Waiting requests are served in FIFO order.
+"""
+
+from dataclasses import dataclass
+import collections, contextlib, threading, time, typing
+
+from .metrics import Gauge, MetricsRegistry
+
+READ: str = "read"
+SUBMIT: str = "submit"
+
+
+def method_class(method: str) -> str:
+    """returns method class of JSON-RPC method name: SUBMIT for "submit", otherwise READ"""
+
+    return SUBMIT if method == "submit" else READ
+
+
+@dataclass(frozen=True)
+class Limit:
+    """Limit defines token bucket rate (requests per second), bucket size and max in-flight requests"""
+
+    requests_per_sec: float
+    burst: int
+    max_in_flight: int
+
+
+class Governor:
+    """Governor is a thread-safe token bucket rate limiter with max in-flight requests limit
+
+    Waiting requests are served in FIFO order: only the request at the head of the queue takes
+    the next permit, and new requests queue up behind waiting requests.
+    The queue depth is recorded into the `queue_depth_gauge` with the given labels if it is provided.
+    """
+
+    def __init__(
+        self,
+        limit: Limit,
+        queue_depth_gauge: typing.Optional[Gauge] = None,
+        labels: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> None:
+        if limit.requests_per_sec <= 0 or limit.burst < 1 or limit.max_in_flight < 1:
+            raise ValueError(f"invalid limit: {limit}")
+        self.limit: Limit = limit
+        self._tokens: float = float(limit.burst)
+        self._updated_at: float = time.time()
+        self._in_flight: int = 0
+        self._lock = threading.Lock()
+        self._waiters: typing.Deque[threading.Condition] = collections.deque()
+        self._queue_depth_gauge = queue_depth_gauge
+        self._labels: typing.Dict[str, str] = labels or {}
+
+    @property
+    def queue_depth(self) -> int:
+        """number of requests waiting for sending"""
+
+        return len(self._waiters)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> None:
+        """blocks until a token is available, in-flight requests is under the limit and no earlier request is waiting"""
+
+        with self._lock:
+            if not self._waiters and self._take():
+                return
+
+            waiter = threading.Condition(self._lock)
+            self._waiters.append(waiter)
+            self._record_queue_depth()
+            try:
+                while True:
+                    if self._waiters[0] is not waiter:
+                        waiter.wait()
+                    elif self._in_flight >= self.limit.max_in_flight:
+                        waiter.wait()
+                    elif self._take():
+                        return
+                    else:
+                        waiter.wait((1 - self._tokens) / self.limit.requests_per_sec)
+            finally:
+                self._waiters.remove(waiter)
+                self._record_queue_depth()
+                if self._waiters:
+                    self._waiters[0].notify()
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if self._waiters:
+                self._waiters[0].notify()
+
+    @contextlib.contextmanager
+    def acquired(self) -> typing.Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _take(self) -> bool:
+        """takes a permit if a token is available and in-flight requests is under the limit"""
+
+        if self._in_flight >= self.limit.max_in_flight:
+            return False
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self._in_flight += 1
+        return True
+
+    def _refill(self) -> None:
+        now = time.time()
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(float(self.limit.burst), self._tokens + elapsed * self.limit.requests_per_sec)
+        self._updated_at = now
+
+    def _record_queue_depth(self) -> None:
+        if self._queue_depth_gauge is not None:
+            self._queue_depth_gauge.set(len(self._waiters), **self._labels)
+
+
+class RateLimiter:
+    """RateLimiter holds a Governor per (endpoint url, method class)
+
+    Method class without a limit is not limited.
+    Queue depth of every governor is exported to the given `MetricsRegistry` as gauge
+    diem_jsonrpc_rate_limit_queue_depth{url,method_class}.
+    """
+
+    def __init__(
+        self,
+        read: typing.Optional[Limit] = None,
+        submit: typing.Optional[Limit] = None,
+        metrics: typing.Optional[MetricsRegistry] = None,
+    ) -> None:
+        self._limits: typing.Dict[str, typing.Optional[Limit]] = {READ: read, SUBMIT: submit}
+        self._governors: typing.Dict[typing.Tuple[str, str], Governor] = {}
+        self._lock = threading.Lock()
+        self._queue_depth_gauge: typing.Optional[Gauge] = None
+        if metrics is not None:
+            self._queue_depth_gauge = metrics.gauge(
+                "diem_jsonrpc_rate_limit_queue_depth", "Requests waiting for rate limit permits"
+            )
+
+    def acquire(self, url: str, method: str) -> typing.ContextManager[None]:
+        """returns a context manager holding the permit for sending a request of the method to the url"""
+
+        governor = self.governor(url, method_class(method))
+        if governor is None:
+            return contextlib.nullcontext()
+        return governor.acquired()
+
+    def governor(self, url: str, method_class: str) -> typing.Optional[Governor]:
+        limit = self._limits.get(method_class)
+        if limit is None:
+            return None
+        key = (url, method_class)
+        governor = self._governors.get(key)
+        if governor is None:
+            with self._lock:
+                if key not in self._governors:
+                    labels = {"url": url, "method_class": method_class}
+                    self._governors[key] = Governor(limit, self._queue_depth_gauge, labels)
+                governor = self._governors[key]
+        return governor
+
+    def queue_depth(self, url: typing.Optional[str] = None, method_class: typing.Optional[str] = None) -> int:
+        """returns number of requests waiting, filtered by url and method class if given"""
+
+        return sum(
+            g.queue_depth
+            for (u, c), g in list(self._governors.items())
+            if (url is None or u == url) and (method_class is None or c == method_class)
+        )
+
+    def stats(self) -> typing.Dict[typing.Tuple[str, str], typing.Tuple[int, int]]:
+        """returns (queue depth, in-flight requests) by (url, method class)"""
+
+        return {key: (g.queue_depth, g.in_flight) for key, g in list(self._governors.items())}
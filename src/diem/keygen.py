@@ -0,0 +1,162 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides bulk account key generation for provisioning many accounts at once.
+
+Keys are generated by chunks in worker processes (any `concurrent.futures.Executor`), results
+are compact numpy arrays instead of `LocalAccount` objects:
+
+```python
+
+from concurrent.futures import ProcessPoolExecutor
+from diem import keygen, stdlib, utils
+
+with ProcessPoolExecutor() as executor:
+    keys = keygen.generate(50_000, executor=executor)
+
+scripts = keys.create_child_vasp_account_scripts("Coin1", child_initial_balance=1_000_000)
+```
+
+When a seed is given, private keys are derived from the seed by HKDF-SHA3-256 (RFC 5869) with
+the account index as info, hence keys can be regenerated from the seed instead of stored:
+
+```python
+keys = keygen.derive(seed, 50_000, start=0)
+assert keygen.derive(seed, 1, start=42).account(0).account_address == keys.account(42).account_address
+```
+"""
+
+from concurrent.futures import Executor
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from dataclasses import dataclass
+from . import diem_types, stdlib, utils, LocalAccount
+import hashlib, hmac, os, typing
+import numpy as np
+
+KEY_LEN: int = 32
+DEFAULT_SALT: bytes = b"DIEM::keygen"
+
+# private key, public key and authentication key bytes of an account
+_RECORD_LEN: int = KEY_LEN * 3
+
+
+@dataclass(frozen=True)
+class AccountKeys:
+    """AccountKeys holds keys of accounts as numpy uint8 arrays with one row per account
+
+    `private_keys`, `public_keys` and `auth_keys` are shaped (N, 32); `auth_key_prefixes` and
+    `account_addresses` are views of `auth_keys`, shaped (N, 16).
+    """
+
+    private_keys: np.ndarray
+    public_keys: np.ndarray
+    auth_keys: np.ndarray
+
+    @staticmethod
+    def from_records(records: bytes) -> "AccountKeys":
+        arr = np.frombuffer(records, dtype=np.uint8).reshape(-1, _RECORD_LEN)
+        return AccountKeys(
+            private_keys=arr[:, :KEY_LEN],
+            public_keys=arr[:, KEY_LEN : KEY_LEN * 2],
+            auth_keys=arr[:, KEY_LEN * 2 :],
+        )
+
+    @property
+    def auth_key_prefixes(self) -> np.ndarray:
+        return self.auth_keys[:, : -utils.ACCOUNT_ADDRESS_LEN]
+
+    @property
+    def account_addresses(self) -> np.ndarray:
+        return self.auth_keys[:, -utils.ACCOUNT_ADDRESS_LEN :]
+
+    def __len__(self) -> int:
+        return len(self.private_keys)
+
+    def account(self, index: int) -> LocalAccount:
+        return LocalAccount(Ed25519PrivateKey.from_private_bytes(self.private_keys[index].tobytes()))
+
+    def account_address(self, index: int) -> diem_types.AccountAddress:
+        return utils.account_address(self.account_addresses[index].tobytes())
+
+    def auth_key_prefix(self, index: int) -> bytes:
+        return self.auth_key_prefixes[index].tobytes()
+
+    def create_child_vasp_account_scripts(
+        self, currency: str, child_initial_balance: int, add_all_currencies: bool = False
+    ) -> typing.List[diem_types.Script]:
+        """returns `stdlib.encode_create_child_vasp_account_script` scripts for all accounts"""
+
+        coin_type = utils.currency_code(currency)
+        addresses = self.account_addresses.tobytes()
+        prefixes = self.auth_key_prefixes.tobytes()
+        size = utils.ACCOUNT_ADDRESS_LEN
+        return [
+            stdlib.encode_create_child_vasp_account_script(
+                coin_type=coin_type,
+                child_address=diem_types.AccountAddress.from_bytes(addresses[i : i + size]),
+                auth_key_prefix=prefixes[i : i + size],
+                add_all_currencies=add_all_currencies,
+                child_initial_balance=child_initial_balance,  # pyre-ignore
+            )
+            for i in range(0, len(addresses), size)
+        ]
+
+
+def generate(n: int, executor: typing.Optional[Executor] = None, chunk_size: int = 1000) -> AccountKeys:
+    """generates keys of `n` accounts from random private keys
+
+    Chunks of `chunk_size` accounts are generated by the given executor if it is provided.
+    """
+
+    return _generate(None, 0, n, executor, chunk_size)
+
+
+def derive(
+    seed: bytes,
+    n: int,
+    start: int = 0,
+    salt: bytes = DEFAULT_SALT,
+    executor: typing.Optional[Executor] = None,
+    chunk_size: int = 1000,
+) -> AccountKeys:
+    """derives keys of accounts indexed from `start` to `start + n` from the given seed
+
+    The private key of account index `i` is `HKDF-SHA3-256(seed, salt, info=i as 8 bytes big endian)`.
+    The same seed, salt and index always derive the same key.
+    """
+
+    return _generate(hkdf_extract(salt, seed), start, n, executor, chunk_size)
+
+
+def hkdf_extract(salt: bytes, seed: bytes) -> bytes:
+    return hmac.new(salt, seed, hashlib.sha3_256).digest()
+
+
+def hkdf_expand(prk: bytes, info: bytes) -> bytes:
+    # output length equals to hash length, hence only one block T(1) = HMAC(PRK, info | 0x01)
+    return hmac.new(prk, info + b"\x01", hashlib.sha3_256).digest()
+
+
+def _generate(
+    prk: typing.Optional[bytes], start: int, n: int, executor: typing.Optional[Executor], chunk_size: int
+) -> AccountKeys:
+    if n < 0 or start < 0:
+        raise ValueError(f"invalid number of accounts {n} or start index {start}")
+    starts = list(range(start, start + n, chunk_size))
+    counts = [min(chunk_size, start + n - s) for s in starts]
+    if executor is None:
+        chunks = map(_gen_records, [prk] * len(starts), starts, counts)
+    else:
+        chunks = executor.map(_gen_records, [prk] * len(starts), starts, counts)
+    return AccountKeys.from_records(b"".join(chunks))
+
+
+def _gen_records(prk: typing.Optional[bytes], start: int, count: int) -> bytes:
+    records = bytearray()
+    for i in range(start, start + count):
+        private_key_bytes = os.urandom(KEY_LEN) if prk is None else hkdf_expand(prk, i.to_bytes(8, "big"))
+        public_key_bytes = utils.public_key_bytes(Ed25519PrivateKey.from_private_bytes(private_key_bytes).public_key())
+        records += private_key_bytes
+        records += public_key_bytes
+        records += utils.hash(public_key_bytes, b"\x00")
+    return bytes(records)
@@ -13,10 +13,14 @@ from . import (
 )
 
 from .auth_key import AuthKey
+from .signer import Signer
+from concurrent.futures import Executor
+from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+import typing
 
 
-class LocalAccount:
+class LocalAccount(Signer):
     """LocalAccount is like a wallet account
 
     WARN: This is handy class for creating tests for your application, but may not ideal for your
@@ -34,16 +38,31 @@ class LocalAccount:
         private_key = Ed25519PrivateKey.generate()
         return LocalAccount(private_key)
 
-    private_key: Ed25519PrivateKey
+    # derived values are computed on first access and cached until private_key is changed
+    __slots__ = ("_private_key", "compliance_key", "_public_key", "_public_key_bytes", "_auth_key")
+
     compliance_key: Ed25519PrivateKey
 
     def __init__(self, private_key: Ed25519PrivateKey) -> None:
         self.private_key = private_key
         self.compliance_key = Ed25519PrivateKey.generate()
 
+    @property
+    def private_key(self) -> Ed25519PrivateKey:
+        return self._private_key
+
+    @private_key.setter
+    def private_key(self, private_key: Ed25519PrivateKey) -> None:
+        self._private_key = private_key
+        self._public_key: typing.Optional[Ed25519PublicKey] = None
+        self._public_key_bytes: typing.Optional[bytes] = None
+        self._auth_key: typing.Optional[AuthKey] = None
+
     @property
     def auth_key(self) -> AuthKey:
-        return AuthKey.from_public_key(self.public_key)
+        if self._auth_key is None:
+            self._auth_key = AuthKey.from_public_key(self.public_key)
+        return self._auth_key
 
     @property
     def account_address(self) -> diem_types.AccountAddress:
@@ -51,18 +70,63 @@ class LocalAccount:
 
     @property
     def public_key_bytes(self) -> bytes:
-        return utils.public_key_bytes(self.public_key)
+        if self._public_key_bytes is None:
+            self._public_key_bytes = utils.public_key_bytes(self.public_key)
+        return self._public_key_bytes
 
     @property
     def public_key(self) -> Ed25519PublicKey:
-        return self.private_key.public_key()
+        if self._public_key is None:
+            self._public_key = self.private_key.public_key()
+        return self._public_key
 
     @property
     def compliance_public_key_bytes(self) -> bytes:
         return utils.public_key_bytes(self.compliance_key.public_key())
 
+    def sign_message(self, msg: bytes) -> bytes:
+        return self.private_key.sign(msg)
+
     def sign(self, txn: diem_types.RawTransaction) -> diem_types.SignedTransaction:
         """Create signed transaction for given raw transaction"""
 
         signature = self.private_key.sign(utils.raw_transaction_signing_msg(txn))
         return utils.create_signed_transaction(txn, self.public_key_bytes, signature)
+
+    def sign_many(
+        self,
+        txns: typing.Sequence[diem_types.RawTransaction],
+        executor: typing.Optional[Executor] = None,
+        chunk_size: int = 1000,
+    ) -> typing.List[diem_types.SignedTransaction]:
+        """Create signed transactions for given raw transactions, returned in the same order
+
+        Public key bytes and signing message seed are computed once, and raw transactions are serialized
+        by one reused buffer.
+
+        Signing is fanned out to the given executor by chunks of `chunk_size` transactions, e.g. a
+        `concurrent.futures.ProcessPoolExecutor`.
+        WARN: the raw private key bytes are sent to executor workers for signing.
+        """
+
+        public_key_bytes = self.public_key_bytes
+        msgs = utils.raw_transaction_signing_msgs(txns)
+        if executor is None:
+            signatures = list(map(self.private_key.sign, msgs))
+        else:
+            private_key_bytes = self.private_key.private_bytes(
+                encoding=serialization.Encoding.Raw,
+                format=serialization.PrivateFormat.Raw,
+                encryption_algorithm=serialization.NoEncryption(),
+            )
+            chunks = [msgs[i : i + chunk_size] for i in range(0, len(msgs), chunk_size)]
+            signatures = []
+            for chunk_signatures in executor.map(_sign_msgs, [private_key_bytes] * len(chunks), chunks):
+                signatures.extend(chunk_signatures)
+
+        return [utils.create_signed_transaction(txn, public_key_bytes, sig) for txn, sig in zip(txns, signatures)]
+
+
+def _sign_msgs(private_key_bytes: bytes, msgs: typing.List[bytes]) -> typing.List[bytes]:
+    private_key = Ed25519PrivateKey.from_private_bytes(private_key_bytes)
+    return [private_key.sign(msg) for msg in msgs]
@@ -0,0 +1,128 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides fast encoder of peer_to_peer_with_metadata script LCS bytes.
+
+`stdlib.encode_peer_to_peer_with_metadata_script` creates a `diem_types.Script` object, which is then
+serialized reflectively. The functions in this module write the script LCS bytes directly, the
+constant part (code bytes with length prefix, currency `TypeTag` and number of arguments) is
+serialized once per currency code and cached.
+
+Encoded bytes are bit-for-bit same with:
+
+```python
+stdlib.encode_peer_to_peer_with_metadata_script(
+    currency=utils.currency_code(currency),
+    payee=payee,
+    amount=amount,
+    metadata=metadata,
+    metadata_signature=metadata_signature,
+).lcs_serialize()
+```
+"""
+
+from . import diem_types, stdlib, utils
+import functools, typing
+
+# TransactionArgument variant index bytes
+_ADDRESS: bytes = utils.uleb128(diem_types.TransactionArgument__Address.INDEX)
+_U64: bytes = utils.uleb128(diem_types.TransactionArgument__U64.INDEX)
+_U8_VECTOR: bytes = utils.uleb128(diem_types.TransactionArgument__U8Vector.INDEX)
+
+_NUM_ARGS: int = 4
+
+Address = typing.Union[diem_types.AccountAddress, bytes]
+
+
+@functools.lru_cache(maxsize=None)
+def script_prefix(currency: str) -> bytes:
+    """returns LCS bytes of the script code, type arguments and the number of arguments"""
+
+    code = stdlib.PEER_TO_PEER_WITH_METADATA_CODE
+    return b"".join(
+        [
+            utils.uleb128(len(code)),
+            code,
+            utils.uleb128(1),
+            utils.currency_code(currency).lcs_serialize(),
+            utils.uleb128(_NUM_ARGS),
+        ]
+    )
+
+
+def encode_peer_to_peer_with_metadata_script_bytes(
+    currency: str,
+    payee: Address,
+    amount: int,
+    metadata: bytes = b"",
+    metadata_signature: bytes = b"",
+) -> bytes:
+    """returns peer_to_peer_with_metadata script LCS bytes
+
+    The `payee` can be `diem_types.AccountAddress` or account address bytes.
+    Raises `ValueError` if the amount is not an unsigned 64 bits integer.
+    """
+
+    return b"".join(
+        [
+            script_prefix(currency),
+            _ADDRESS,
+            _address_bytes(payee),
+            _U64,
+            utils.u64_bytes(amount, "amount"),
+            _U8_VECTOR,
+            utils.uleb128(len(metadata)),
+            metadata,
+            _U8_VECTOR,
+            utils.uleb128(len(metadata_signature)),
+            metadata_signature,
+        ]
+    )
+
+
+def encode_peer_to_peer_with_metadata_scripts_bytes(
+    currency: str,
+    payees: typing.Sequence[Address],
+    amounts: typing.Sequence[int],
+    metadatas: typing.Optional[typing.Sequence[bytes]] = None,
+    metadata_signatures: typing.Optional[typing.Sequence[bytes]] = None,
+) -> typing.List[bytes]:
+    """bulk version of `encode_peer_to_peer_with_metadata_script_bytes`
+
+    Returns script LCS bytes in the same order of payees; metadatas and metadata_signatures default
+    to empty bytes for all payees.
+    """
+
+    if len(payees) != len(amounts):
+        raise ValueError(f"payees length {len(payees)} does not match amounts length {len(amounts)}")
+    for name, values in [("metadatas", metadatas), ("metadata_signatures", metadata_signatures)]:
+        if values is not None and len(values) != len(payees):
+            raise ValueError(f"{name} length {len(values)} does not match payees length {len(payees)}")
+
+    prefix = script_prefix(currency) + _ADDRESS
+    empty = _U8_VECTOR + utils.uleb128(0)
+    ret = []
+    for i, payee in enumerate(payees):
+        metadata = b"" if metadatas is None else metadatas[i]
+        signature = b"" if metadata_signatures is None else metadata_signatures[i]
+        ret.append(
+            b"".join(
+                [
+                    prefix,
+                    _address_bytes(payee),
+                    _U64,
+                    utils.u64_bytes(amounts[i], "amount"),
+                    _U8_VECTOR + utils.uleb128(len(metadata)) + metadata if metadata else empty,
+                    _U8_VECTOR + utils.uleb128(len(signature)) + signature if signature else empty,
+                ]
+            )
+        )
+    return ret
+
+
+def _address_bytes(address: Address) -> bytes:
+    if isinstance(address, diem_types.AccountAddress):
+        return address.to_bytes()
+    if len(address) != utils.ACCOUNT_ADDRESS_LEN:
+        raise utils.InvalidAccountAddressError(f"Incorrect length for an account address: {len(address)}")
+    return bytes(address)
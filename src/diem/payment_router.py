@@ -0,0 +1,195 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Routes incoming payments to the users of a custodial application
+
+`PaymentRouter` takes batches of `jsonrpc.Event`, for example events polled from the `receivedpayment`
+event stream of a child VASP account, or events of transactions returned by `get_transactions`.
+For every `receivedpayment` event it decodes the metadata (`txnmetadata.decode_metadata`), classifies
+the payment, finds the receiving user and dispatches the `IncomingPayment` to the user's handler.
+
+Payment types:
+
+* `PAYMENT_TYPE_GENERAL`: general metadata without referenced event, user is found by `to_subaddress`.
+* `PAYMENT_TYPE_REFUND`: general metadata with referenced event, user is found by `to_subaddress`, which
+  is the sub-address of the original payment sender.
+* `PAYMENT_TYPE_TRAVEL_RULE`: travel rule metadata, user is found by the off-chain reference id if a
+  `find_travel_rule_user_id` function is given.
+* `PAYMENT_TYPE_UNKNOWN`: no metadata, invalid metadata or other metadata types.
+
+```python
+
+from diem import identifier, payment_router
+
+registry = identifier.SubaddressRegistry()
+router = payment_router.PaymentRouter(registry.find_user_id, receiver=child_vasp.account_address)
+router.add_handler(user_id, lambda payment: print(payment.amount, payment.currency))
+router.route(client.get_events(received_events_key, start, 100))
+print(router.throughput())
+```
+
+Metrics recorded in the `jsonrpc.MetricsRegistry`:
+
+* diem_payment_router_payments_total{type}: count of routed payments by payment type.
+* diem_payment_router_dispatched_total{result}: count of payments "handled" by a handler or "unhandled".
+* diem_payment_router_skipped_events_total: count of events that are not payments to the receiver.
+* diem_payment_router_batch_duration_seconds: histogram of routing batch time, including handlers time.
+"""
+
+from dataclasses import dataclass
+import time, typing
+
+from . import diem_types, txnmetadata, utils
+from .jsonrpc.metrics import MetricsRegistry
+
+if typing.TYPE_CHECKING:
+    from . import jsonrpc
+
+
+PAYMENT_TYPE_GENERAL = "general"
+PAYMENT_TYPE_REFUND = "refund"
+PAYMENT_TYPE_TRAVEL_RULE = "travel_rule"
+PAYMENT_TYPE_UNKNOWN = "unknown"
+
+RECEIVED_PAYMENT_EVENT_TYPE = "receivedpayment"
+
+
+@dataclass(frozen=True)
+class IncomingPayment:
+    """IncomingPayment is a classified `receivedpayment` event
+
+    `metadata` is None if the event has no metadata or the metadata is invalid.
+    `user_id` is None if the receiving user is not found.
+    """
+
+    event: "jsonrpc.Event"
+    payment_type: str
+    metadata: typing.Optional[diem_types.Metadata]
+    to_subaddress: typing.Optional[bytes]
+    user_id: typing.Optional[int]
+
+    @property
+    def sender(self) -> str:
+        return self.event.data.sender
+
+    @property
+    def amount(self) -> int:
+        return self.event.data.amount.amount
+
+    @property
+    def currency(self) -> str:
+        return self.event.data.amount.currency
+
+
+Handler = typing.Callable[[IncomingPayment], None]
+
+
+class PaymentRouter:
+    """PaymentRouter classifies incoming payment events and dispatches them to per-user handlers
+
+    `find_user_id` finds user id by the 8 bytes `to_subaddress`, e.g. `identifier.SubaddressRegistry.find_user_id`.
+    Events received by other accounts than `receiver` are skipped if `receiver` is given.
+    Payments of users without handler, and payments that user is not found, are dispatched to `default_handler`.
+    Errors raised by handlers are not caught.
+    """
+
+    def __init__(
+        self,
+        find_user_id: typing.Callable[[bytes], typing.Optional[int]],
+        receiver: typing.Union[diem_types.AccountAddress, str, None] = None,
+        default_handler: typing.Optional[Handler] = None,
+        find_travel_rule_user_id: typing.Optional[typing.Callable[[str], typing.Optional[int]]] = None,
+        metrics: typing.Optional[MetricsRegistry] = None,
+    ) -> None:
+        self._find_user_id = find_user_id
+        self._find_travel_rule_user_id = find_travel_rule_user_id
+        self._receiver: typing.Optional[str] = utils.account_address_hex(receiver) if receiver else None
+        self._default_handler = default_handler
+        self._handlers: typing.Dict[int, Handler] = {}
+
+        self.metrics: MetricsRegistry = metrics or MetricsRegistry()
+        self._payments = self.metrics.counter("diem_payment_router_payments_total", "Routed payments")
+        self._dispatched = self.metrics.counter("diem_payment_router_dispatched_total", "Dispatched payments")
+        self._skipped = self.metrics.counter("diem_payment_router_skipped_events_total", "Skipped events")
+        self._batch_duration = self.metrics.histogram(
+            "diem_payment_router_batch_duration_seconds", "Routing batch time, including handlers time"
+        )
+        self._events_count: int = 0
+
+    def add_handler(self, user_id: int, handler: Handler) -> None:
+        self._handlers[user_id] = handler
+
+    def remove_handler(self, user_id: int) -> None:
+        self._handlers.pop(user_id, None)
+
+    def route(self, events: typing.Iterable["jsonrpc.Event"]) -> typing.List[IncomingPayment]:
+        """classify and dispatch a batch of events, returns the payments of the batch in the order of events"""
+
+        start = time.perf_counter()
+        payments = []
+        skipped = 0
+        handled = 0
+        for event in events:
+            data = event.data
+            if data.type != RECEIVED_PAYMENT_EVENT_TYPE or (self._receiver and data.receiver != self._receiver):
+                skipped += 1
+                continue
+
+            payment = self.classify(event)
+            payments.append(payment)
+            handler = self._handlers.get(payment.user_id) if payment.user_id is not None else None
+            handler = handler or self._default_handler
+            if handler:
+                handler(payment)
+                handled += 1
+
+        types: typing.Dict[str, int] = {}
+        for payment in payments:
+            types[payment.payment_type] = types.get(payment.payment_type, 0) + 1
+        for payment_type, count in types.items():
+            self._payments.inc(count, type=payment_type)
+        self._dispatched.inc(handled, result="handled")
+        self._dispatched.inc(len(payments) - handled, result="unhandled")
+        self._skipped.inc(skipped)
+        self._events_count += len(payments) + skipped
+        self._batch_duration.observe(time.perf_counter() - start)
+        return payments
+
+    def classify(self, event: "jsonrpc.Event") -> IncomingPayment:
+        """decode metadata of the `receivedpayment` event, classify the payment and find the receiving user"""
+
+        metadata = None
+        if event.data.metadata:
+            try:
+                metadata = txnmetadata.decode_metadata(bytes.fromhex(event.data.metadata))
+            except ValueError:
+                pass
+
+        payment_type = PAYMENT_TYPE_UNKNOWN
+        to_subaddress = None
+        user_id = None
+        if isinstance(metadata, diem_types.Metadata__GeneralMetadata) and isinstance(
+            metadata.value, diem_types.GeneralMetadata__GeneralMetadataVersion0
+        ):
+            gmv0 = metadata.value.value
+            payment_type = PAYMENT_TYPE_GENERAL if gmv0.referenced_event is None else PAYMENT_TYPE_REFUND
+            to_subaddress = gmv0.to_subaddress
+            if to_subaddress and len(to_subaddress) == utils.SUB_ADDRESS_LEN:
+                user_id = self._find_user_id(to_subaddress)
+        elif isinstance(metadata, diem_types.Metadata__TravelRuleMetadata) and isinstance(
+            metadata.value, diem_types.TravelRuleMetadata__TravelRuleMetadataVersion0
+        ):
+            payment_type = PAYMENT_TYPE_TRAVEL_RULE
+            reference_id = metadata.value.value.off_chain_reference_id
+            if reference_id is not None and self._find_travel_rule_user_id:
+                user_id = self._find_travel_rule_user_id(reference_id)
+
+        return IncomingPayment(
+            event=event, payment_type=payment_type, metadata=metadata, to_subaddress=to_subaddress, user_id=user_id
+        )
+
+    def throughput(self) -> float:
+        """returns the number of events routed per second of routing time, 0 if nothing is routed"""
+
+        secs = self._batch_duration.labels().sum
+        return self._events_count / secs if secs else 0.0
@@ -0,0 +1,188 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides ScriptRegistry for classifying and decoding transaction scripts without full deserialization.
+
+`stdlib.decode_script` requires a deserialized `diem_types.Script` and looks up the decoder by the
+full script code bytes. ScriptRegistry indexes known script code by length and by SHA3-256 hash,
+so that a script type can be found by:
+
+1. peeking the code bytes in the script LCS bytes (length prefix selects the candidates, then code
+   bytes are compared in place); or
+2. the `script_hash` returned by JSON-RPC `jsonrpc.TransactionData`, without touching script bytes.
+
+Script arguments are only decoded for script types the caller asks for:
+
+```python
+
+from diem import script_decoder, stdlib
+
+registry = script_decoder.default_registry()
+p2p = [stdlib.ScriptCall__PeerToPeerWithMetadata]
+for txn in txns:
+    script_call = registry.decode_transaction(txn, types=p2p)
+    if script_call:  # None for other script types and unknown scripts
+        ...
+```
+
+Script type is identified by the `stdlib.ScriptCall` subclass, e.g. `stdlib.ScriptCall__PeerToPeerWithMetadata`.
+"""
+
+from dataclasses import dataclass
+from . import diem_types, jsonrpc, stdlib
+import hashlib, threading, typing
+
+ScriptType = typing.Type[stdlib.ScriptCall]
+Decoder = typing.Callable[[diem_types.Script], stdlib.ScriptCall]
+
+
+@dataclass(frozen=True)
+class KnownScript:
+    type: ScriptType
+    code: bytes
+    hash: str
+    decoder: Decoder
+
+
+class ScriptRegistry:
+    """ScriptRegistry indexes known scripts, index is built on first use
+
+    Default known scripts are `stdlib.SCRIPT_DECODER_MAP`.
+    """
+
+    def __init__(self, decoders: typing.Optional[typing.Dict[bytes, Decoder]] = None) -> None:
+        self._decoders: typing.Dict[bytes, Decoder] = stdlib.SCRIPT_DECODER_MAP if decoders is None else decoders
+        self._lock = threading.Lock()
+        self._by_len: typing.Optional[typing.Dict[int, typing.List[KnownScript]]] = None
+        self._by_hash: typing.Dict[str, KnownScript] = {}
+
+    def known_scripts(self) -> typing.List[KnownScript]:
+        return list(self._index_by_hash().values())
+
+    def classify(self, script: typing.Union[bytes, str]) -> typing.Optional[ScriptType]:
+        """returns script type of the given script LCS bytes or hex-encoded string, None for unknown script"""
+
+        known = self._find(_script_bytes(script))
+        return known.type if known else None
+
+    def classify_hash(self, script_hash: str) -> typing.Optional[ScriptType]:
+        """returns script type by script code SHA3-256 hash hex, None for unknown script"""
+
+        known = self._index_by_hash().get(script_hash)
+        return known.type if known else None
+
+    def classify_transaction(
+        self, txn: typing.Union[jsonrpc.Transaction, jsonrpc.TransactionData]
+    ) -> typing.Optional[ScriptType]:
+        """returns script type of the user transaction, uses `script_hash` if it is provided"""
+
+        data = txn.transaction if isinstance(txn, jsonrpc.Transaction) else txn
+        if data.script_hash:
+            return self.classify_hash(data.script_hash)
+        if data.script_bytes:
+            return self.classify(data.script_bytes)
+        return None
+
+    def decode(
+        self, script: typing.Union[bytes, str], types: typing.Optional[typing.Collection[ScriptType]] = None
+    ) -> typing.Optional[stdlib.ScriptCall]:
+        """decodes the script LCS bytes or hex-encoded string
+
+        Returns None if script is unknown or it's type is not in given `types`; all known scripts are
+        decoded when `types` is None.
+        """
+
+        script_bytes = _script_bytes(script)
+        known = self._find(script_bytes)
+        if known is None or (types is not None and known.type not in types):
+            return None
+        return known.decoder(diem_types.Script.lcs_deserialize(script_bytes))
+
+    def decode_transaction(
+        self,
+        txn: typing.Union[jsonrpc.Transaction, jsonrpc.TransactionData],
+        types: typing.Optional[typing.Collection[ScriptType]] = None,
+    ) -> typing.Optional[stdlib.ScriptCall]:
+        """decodes user transaction script, classifies by `script_hash` first if it is provided"""
+
+        data = txn.transaction if isinstance(txn, jsonrpc.Transaction) else txn
+        if not data.script_bytes:
+            return None
+        if types is not None and data.script_hash and self.classify_hash(data.script_hash) not in types:
+            return None
+        return self.decode(data.script_bytes, types)
+
+    def _find(self, script_bytes: bytes) -> typing.Optional[KnownScript]:
+        code_len, offset = _peek_uleb128(script_bytes)
+        candidates = self._index_by_len().get(code_len)
+        if not candidates:
+            return None
+        view = memoryview(script_bytes)[offset : offset + code_len]
+        for known in candidates:
+            if view == known.code:
+                return known
+        return None
+
+    def _index_by_len(self) -> typing.Dict[int, typing.List[KnownScript]]:
+        by_len = self._by_len
+        if by_len is None:
+            by_len = self._build_index()
+        return by_len
+
+    def _index_by_hash(self) -> typing.Dict[str, KnownScript]:
+        if self._by_len is None:
+            self._build_index()
+        return self._by_hash
+
+    def _build_index(self) -> typing.Dict[int, typing.List[KnownScript]]:
+        with self._lock:
+            if self._by_len is not None:
+                return self._by_len
+            by_len: typing.Dict[int, typing.List[KnownScript]] = {}
+            for code, decoder in self._decoders.items():
+                known = KnownScript(
+                    type=script_type(decoder), code=code, hash=hashlib.sha3_256(code).hexdigest(), decoder=decoder
+                )
+                by_len.setdefault(len(code), []).append(known)
+                self._by_hash[known.hash] = known
+            self._by_len = by_len
+            return by_len
+
+
+def script_type(decoder: Decoder) -> ScriptType:
+    """returns `stdlib.ScriptCall` subclass of the given stdlib decoder function by it's name
+
+    For example: `stdlib.decode_peer_to_peer_with_metadata_script` => `stdlib.ScriptCall__PeerToPeerWithMetadata`
+    """
+
+    name = decoder.__name__
+    if not (name.startswith("decode_") and name.endswith("_script")):
+        raise ValueError(f"unknown decoder function name: {name}")
+    words = name[len("decode_") : -len("_script")].split("_")
+    return getattr(stdlib, "ScriptCall__" + "".join(w.capitalize() for w in words))
+
+
+_default_registry: typing.Optional[ScriptRegistry] = None
+
+
+def default_registry() -> ScriptRegistry:
+    """returns the shared registry of `stdlib.SCRIPT_DECODER_MAP`"""
+
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ScriptRegistry()
+    return _default_registry
+
+
+def _script_bytes(script: typing.Union[bytes, str]) -> bytes:
+    return bytes.fromhex(script) if isinstance(script, str) else script
+
+
+def _peek_uleb128(data: bytes) -> typing.Tuple[int, int]:
+    value = 0
+    for i in range(min(len(data), 5)):
+        byte = data[i]
+        value |= (byte & 0x7F) << (7 * i)
+        if byte < 0x80:
+            return (value, i + 1)
+    return (-1, 0)
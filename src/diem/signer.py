@@ -0,0 +1,283 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides Signer interface for signing transactions, and signers for remote key service.
+
+`Signer` is the interface transaction building code depends on; `diem.LocalAccount` is a `Signer`
+holding the private key in memory. For production, the private key should be held by a key
+service (e.g. backed by https://en.wikipedia.org/wiki/Hardware_security_module), and
+`RemoteSigner` calls the key service over a socket. `BatchingSigner` groups concurrent signing
+requests into batches, so that many transactions share one round-trip to the key service:
+
+```python
+
+from diem import signer
+
+remote = signer.RemoteSigner(("localhost", 8000))
+batching = signer.BatchingSigner(remote, max_batch_size=100, max_delay_secs=0.005)
+
+# called from many threads, or `await batching.sign_async(raw_txn)` from asyncio tasks
+signed_txn = batching.sign(raw_txn)
+```
+
+`SignerServer` is a stand-in key service serving a `Signer` over the same protocol: newline
+delimited JSON, request `{"messages": [<hex>...]}`, response
+`{"public_key": <hex>, "signatures": [<hex>...]}` or `{"error": <message>}`.
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from . import diem_types, utils
+import json, queue, socket, socketserver, threading, typing
+
+
+class SignerError(Exception):
+    pass
+
+
+class Signer(ABC):
+    """Signer abstract base class
+
+    Subclass implements `public_key_bytes` and `sign_message`, may override `sign_messages` for
+    signing multiple messages efficiently, and the async methods if it can sign without blocking.
+    """
+
+    __slots__ = ()
+
+    @property
+    @abstractmethod
+    def public_key_bytes(self) -> bytes:
+        """returns Ed25519 public key bytes of the signer"""
+
+    @abstractmethod
+    def sign_message(self, msg: bytes) -> bytes:
+        """returns Ed25519 signature of the given message"""
+
+    def sign_messages(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        """returns signatures of the given messages in the same order"""
+
+        return [self.sign_message(msg) for msg in msgs]
+
+    async def sign_message_async(self, msg: bytes) -> bytes:
+        """async version of `sign_message`, runs `sign_message` in the event loop default executor"""
+
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(None, self.sign_message, msg)
+
+    def sign(self, txn: diem_types.RawTransaction) -> diem_types.SignedTransaction:
+        """Create signed transaction for given raw transaction"""
+
+        signature = self.sign_message(utils.raw_transaction_signing_msg(txn))
+        return utils.create_signed_transaction(txn, self.public_key_bytes, signature)
+
+    def sign_many(self, txns: typing.Sequence[diem_types.RawTransaction]) -> typing.List[diem_types.SignedTransaction]:
+        """Create signed transactions for given raw transactions, returned in the same order"""
+
+        signatures = self.sign_messages(utils.raw_transaction_signing_msgs(txns))
+        public_key_bytes = self.public_key_bytes
+        return [utils.create_signed_transaction(txn, public_key_bytes, sig) for txn, sig in zip(txns, signatures)]
+
+    async def sign_async(self, txn: diem_types.RawTransaction) -> diem_types.SignedTransaction:
+        """async version of `sign`"""
+
+        signature = await self.sign_message_async(utils.raw_transaction_signing_msg(txn))
+        return utils.create_signed_transaction(txn, self.public_key_bytes, signature)
+
+
+class RemoteSigner(Signer):
+    """RemoteSigner signs messages by calling a key service (e.g. `SignerServer`) over a TCP socket
+
+    One connection is opened lazily and shared by all threads, requests are sent one by one.
+    The public key is fetched from the key service once and cached.
+    """
+
+    __slots__ = ("_address", "_timeout_secs", "_lock", "_file", "_public_key_bytes")
+
+    def __init__(self, address: typing.Tuple[str, int], timeout_secs: float = 30.0) -> None:
+        self._address = address
+        self._timeout_secs = timeout_secs
+        self._lock = threading.Lock()
+        self._file: typing.Optional[typing.BinaryIO] = None
+        self._public_key_bytes: typing.Optional[bytes] = None
+
+    @property
+    def public_key_bytes(self) -> bytes:
+        if self._public_key_bytes is None:
+            self._call([])
+        return typing.cast(bytes, self._public_key_bytes)
+
+    def sign_message(self, msg: bytes) -> bytes:
+        return self.sign_messages([msg])[0]
+
+    def sign_messages(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        signatures = self._call(msgs)
+        if len(signatures) != len(msgs):
+            raise SignerError(f"expected {len(msgs)} signatures, but got {len(signatures)}")
+        return signatures
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _call(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        request = json.dumps({"messages": [msg.hex() for msg in msgs]}).encode() + b"\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    conn = socket.create_connection(self._address, timeout=self._timeout_secs)
+                    self._file = typing.cast(typing.BinaryIO, conn.makefile("rwb"))
+                    conn.close()  # the file holds a reference of the socket
+                self._file.write(request)
+                self._file.flush()
+                line = self._file.readline()
+            except OSError as e:
+                self._close()
+                raise SignerError(f"call key service {self._address} failed: {e}")
+            if not line:
+                self._close()
+                raise SignerError(f"key service {self._address} closed connection")
+
+        response = json.loads(line)
+        if "error" in response:
+            raise SignerError(response["error"])
+        self._public_key_bytes = bytes.fromhex(response["public_key"])
+        return [bytes.fromhex(sig) for sig in response["signatures"]]
+
+    def _close(self) -> None:
+        """closes the connection, the lock must be held by caller"""
+
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass  # e.g. flushing buffered request to a broken connection
+            self._file = None
+
+
+class BatchingSigner(Signer):
+    """BatchingSigner groups signing requests from concurrent callers into batches
+
+    A background thread takes queued messages, waits up to `max_delay_secs` for more messages
+    until `max_batch_size` is reached, then signs the batch by one `sign_messages` call to the
+    wrapped signer (e.g. a `RemoteSigner`).
+
+    Raises SignerError for messages submitted after `close` is called.
+    """
+
+    __slots__ = ("_signer", "_max_batch_size", "_max_delay_secs", "_queue", "_thread", "_lock", "_closed")
+
+    def __init__(self, signer: Signer, max_batch_size: int = 100, max_delay_secs: float = 0.005) -> None:
+        self._signer = signer
+        self._max_batch_size = max_batch_size
+        self._max_delay_secs = max_delay_secs
+        self._queue: "queue.Queue[typing.Optional[typing.Tuple[bytes, Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def public_key_bytes(self) -> bytes:
+        return self._signer.public_key_bytes
+
+    def submit(self, msg: bytes) -> Future:
+        """queues message for signing, returns a future of the signature"""
+
+        future: Future = Future()
+        with self._lock:
+            # checked under the lock, so that no message is queued after the stop sentinel
+            if self._closed:
+                raise SignerError("signer is closed")
+            self._queue.put((msg, future))
+        return future
+
+    def sign_message(self, msg: bytes) -> bytes:
+        return self.submit(msg).result()
+
+    def sign_messages(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        return [f.result() for f in list(map(self.submit, msgs))]
+
+    async def sign_message_async(self, msg: bytes) -> bytes:
+        import asyncio
+
+        return await asyncio.wrap_future(self.submit(msg))
+
+    def close(self) -> None:
+        """stops the background thread after signing all queued messages, no-op if it is closed"""
+
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            closed = False
+            try:
+                while len(batch) < self._max_batch_size:
+                    item = self._queue.get(timeout=self._max_delay_secs)
+                    if item is None:
+                        closed = True
+                        break
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            self._sign_batch(batch)
+            if closed:
+                return
+
+    def _sign_batch(self, batch: typing.List[typing.Tuple[bytes, Future]]) -> None:
+        try:
+            signatures = self._signer.sign_messages([msg for msg, _ in batch])
+            if len(signatures) != len(batch):
+                raise SignerError(f"expected {len(batch)} signatures, but got {len(signatures)}")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), signature in zip(batch, signatures):
+            future.set_result(signature)
+
+
+class SignerServer(socketserver.ThreadingTCPServer):
+    """SignerServer is a stand-in key service signs messages by the given signer
+
+    ```python
+    server = SignerServer(("localhost", 0), LocalAccount.generate())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    remote = RemoteSigner(server.server_address)
+    ```
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: typing.Tuple[str, int], signer: Signer) -> None:
+        super().__init__(address, _SignerRequestHandler)
+        self.signer: Signer = signer
+        # number of sign_messages calls, for tests to verify batching
+        self.num_requests: int = 0
+
+
+class _SignerRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server = typing.cast(SignerServer, self.server)
+        for line in self.rfile:
+            try:
+                msgs = [bytes.fromhex(msg) for msg in json.loads(line)["messages"]]
+                server.num_requests += 1
+                response = {
+                    "public_key": server.signer.public_key_bytes.hex(),
+                    "signatures": [sig.hex() for sig in server.signer.sign_messages(msgs)],
+                }
+            except Exception as e:
+                response = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
@@ -0,0 +1,423 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides MockServer, a local in-process stand-in of Diem JSON-RPC service for load and latency testing.
+
+This module is for testing applications and the SDK only, it is not imported by the other modules.
+
+MockServer serves JSON-RPC over HTTP from a thread, with a simulated ledger: ledger version grows
+by time (`versions_per_sec`) or by `Ledger#advance`, submitted transactions are executed after
+`commit_delay_versions` versions, and recorded transactions (e.g. a `get_transactions` response
+fixture) can be loaded as ledger history.
+
+Latency, stale responses and errors can be injected for testing `jsonrpc.Client` under realistic
+concurrency without network:
+
+```python
+
+from diem import jsonrpc
+from diem.testing import MockServer
+
+with MockServer(latency_secs=0.01, stale_rate=0.05, error_rate=0.01) as server:
+    client = jsonrpc.Client(server.url)
+    client.submit(signed_txn)
+    client.wait_for_transaction(signed_txn)
+```
+
+Supported methods: get_metadata, get_currencies, get_account, get_account_transaction,
+get_account_transactions, get_transactions, get_events and submit. Use `handlers` for
+serving other methods or overriding the default behavior.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from . import diem_types, utils
+from .jsonrpc import constants
+import bisect, collections, json, random, threading, time, typing
+
+Handler = typing.Callable[[typing.List[typing.Any]], typing.Any]  # pyre-ignore
+
+TESTING_CHAIN_ID: int = 4
+INJECTED_ERROR_CODE: int = -32000
+METHOD_NOT_FOUND_CODE: int = -32601
+INVALID_PARAMS_CODE: int = -32602
+VM_VALIDATION_ERROR_CODE: int = -32001
+
+# number of (version, timestamp) states kept by Ledger for serving stale responses
+LEDGER_HISTORY_SIZE: int = 10_000
+
+
+class Ledger:
+    """Ledger holds simulated ledger state and transactions, all methods are thread-safe
+
+    Transactions and events are stored as JSON-RPC response dicts.
+    """
+
+    def __init__(
+        self,
+        chain_id: int = TESTING_CHAIN_ID,
+        version: int = 1,
+        versions_per_sec: float = 10,
+        commit_delay_versions: int = 1,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        self.chain_id = chain_id
+        self._versions_per_sec = versions_per_sec
+        self._commit_delay_versions = commit_delay_versions
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._base_version: int = version
+        self._start_time: float = clock()
+        self._advanced: int = 0
+        self._version: int = version
+        self._timestamp_usecs: int = int(self._start_time * 1_000_000)
+        self._transactions: typing.Dict[int, typing.Dict[str, typing.Any]] = {}
+        self._account_transactions: typing.Dict[typing.Tuple[str, int], typing.Dict[str, typing.Any]] = {}
+        self._events: typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]] = collections.defaultdict(list)
+        self._accounts: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        self._pending: typing.List[typing.Tuple[int, diem_types.SignedTransaction]] = []
+        # versions and timestamps of past ledger states, in ascending order
+        self._history_versions: typing.List[int] = [self._version]
+        self._history_timestamps: typing.List[int] = [self._timestamp_usecs]
+
+    def advance(self, versions: int = 1) -> None:
+        """advances ledger version, and executes submitted transactions that are ready"""
+
+        with self._lock:
+            self._advanced += versions
+            self._update()
+
+    def state(self, versions_behind: int = 0) -> typing.Tuple[int, int]:
+        """returns current (version, timestamp_usecs), or the state `versions_behind` versions ago
+
+        Timestamp of a past version is the ledger timestamp when the version was reached, or the
+        oldest one kept if the version is older than the ledger history.
+        """
+
+        with self._lock:
+            self._update()
+            if versions_behind <= 0:
+                return (self._version, self._timestamp_usecs)
+            version = max(0, self._version - versions_behind)
+            index = max(0, bisect.bisect_right(self._history_versions, version) - 1)
+            return (version, self._history_timestamps[index])
+
+    def add_account(self, account: typing.Dict[str, typing.Any]) -> None:
+        """adds `get_account` response of an account, `address` and `sequence_number` are required"""
+
+        with self._lock:
+            self._accounts[account["address"]] = dict(account)
+
+    def add_transactions(self, txns: typing.Iterable[typing.Dict[str, typing.Any]]) -> None:
+        """adds recorded transactions (e.g. `get_transactions` response result) as ledger history
+
+        Ledger version is moved to the max transaction version if it is behind.
+        """
+
+        with self._lock:
+            for txn in txns:
+                self._add_transaction(txn)
+                if txn["version"] > self._version:
+                    self._base_version += txn["version"] - self._version
+                    self._version = txn["version"]
+            self._record_state()
+
+    def submit(self, txn: diem_types.SignedTransaction) -> None:
+        """queues the transaction, it is executed after `commit_delay_versions` versions
+
+        Raises ValueError if the sequence number is too old or the transaction is expired
+        """
+
+        with self._lock:
+            self._update()
+            account = self._get_or_create_account(utils.account_address_hex(txn.raw_txn.sender))
+            if txn.raw_txn.sequence_number < account["sequence_number"]:
+                raise ValueError("SEQUENCE_NUMBER_TOO_OLD")
+            if txn.raw_txn.expiration_timestamp_secs * 1_000_000 <= self._timestamp_usecs:
+                raise ValueError("TRANSACTION_EXPIRED")
+            self._pending.append((self._version + self._commit_delay_versions, txn))
+
+    def get_account(self, address: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        with self._lock:
+            self._update()
+            return self._accounts.get(address)
+
+    def get_account_transaction(self, address: str, seq: int) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        with self._lock:
+            self._update()
+            return self._account_transactions.get((address, seq))
+
+    def get_account_transactions(
+        self, address: str, start: int, limit: int
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
+        with self._lock:
+            self._update()
+            ret = []
+            for seq in range(start, start + limit):
+                txn = self._account_transactions.get((address, seq))
+                if txn is None:
+                    break
+                ret.append(txn)
+            return ret
+
+    def get_transactions(self, start_version: int, limit: int) -> typing.List[typing.Dict[str, typing.Any]]:
+        with self._lock:
+            self._update()
+            versions = range(start_version, min(start_version + limit, self._version + 1))
+            return [self._transactions[v] for v in versions if v in self._transactions]
+
+    def get_events(self, key: str, start: int, limit: int) -> typing.List[typing.Dict[str, typing.Any]]:
+        with self._lock:
+            self._update()
+            return [e for e in self._events.get(key, []) if start <= e["sequence_number"] < start + limit]
+
+    def _update(self) -> None:
+        elapsed = max(0.0, self._clock() - self._start_time)
+        version = self._base_version + self._advanced + int(elapsed * self._versions_per_sec)
+        self._version = max(self._version, version)
+        self._timestamp_usecs = max(self._timestamp_usecs, int(self._clock() * 1_000_000))
+
+        if self._pending:
+            ready = [(v, txn) for v, txn in self._pending if v <= self._version]
+            self._pending = [(v, txn) for v, txn in self._pending if v > self._version]
+            for v, txn in sorted(ready, key=lambda item: int(item[1].raw_txn.sequence_number)):
+                if not self._execute(txn):
+                    self._pending.append((v, txn))
+        self._record_state()
+
+    def _record_state(self) -> None:
+        if self._version <= self._history_versions[-1]:
+            return
+        self._history_versions.append(self._version)
+        self._history_timestamps.append(self._timestamp_usecs)
+        if len(self._history_versions) > LEDGER_HISTORY_SIZE:
+            del self._history_versions[: LEDGER_HISTORY_SIZE // 2]
+            del self._history_timestamps[: LEDGER_HISTORY_SIZE // 2]
+
+    def _execute(self, txn: diem_types.SignedTransaction) -> bool:
+        """returns False if the transaction is waiting for a previous sequence number"""
+
+        sender = utils.account_address_hex(txn.raw_txn.sender)
+        seq = int(txn.raw_txn.sequence_number)
+        account = self._get_or_create_account(sender)
+        if seq > account["sequence_number"]:
+            return False
+        if seq < account["sequence_number"]:
+            # replaced by another transaction with the same sequence number, discard it like mempool does
+            return True
+        account["sequence_number"] = seq + 1
+        self._version += 1
+        self._base_version += 1
+        script = txn.raw_txn.payload.value
+        data = {
+            "type": constants.TRANSACTION_DATA_USER,
+            "timestamp_usecs": self._timestamp_usecs,
+            "sender": sender,
+            "signature_scheme": "Scheme::Ed25519",
+            "public_key": txn.authenticator.public_key.value.hex(),
+            "signature": txn.authenticator.signature.value.hex(),
+            "sequence_number": seq,
+            "chain_id": int(txn.raw_txn.chain_id.value),
+            "max_gas_amount": int(txn.raw_txn.max_gas_amount),
+            "gas_unit_price": int(txn.raw_txn.gas_unit_price),
+            "gas_currency": txn.raw_txn.gas_currency_code,
+            "expiration_timestamp_secs": int(txn.raw_txn.expiration_timestamp_secs),
+        }
+        if isinstance(script, diem_types.Script):
+            data["script_bytes"] = script.lcs_serialize().hex()
+        self._add_transaction(
+            {
+                "version": self._version,
+                "transaction": data,
+                "hash": utils.transaction_hash(txn),
+                "bytes": diem_types.Transaction__UserTransaction(value=txn).lcs_serialize().hex(),
+                "events": [],
+                "vm_status": {"type": constants.VM_STATUS_EXECUTED},
+                "gas_used": 0,
+            }
+        )
+        return True
+
+    def _add_transaction(self, txn: typing.Dict[str, typing.Any]) -> None:
+        self._transactions[txn["version"]] = txn
+        data = txn.get("transaction", {})
+        if data.get("type") == constants.TRANSACTION_DATA_USER:
+            self._account_transactions[(data["sender"], data["sequence_number"])] = txn
+        for event in txn.get("events", []):
+            self._events[event["key"]].append(event)
+
+    def _get_or_create_account(self, address: str) -> typing.Dict[str, typing.Any]:
+        if address not in self._accounts:
+            self._accounts[address] = {
+                "address": address,
+                "sequence_number": 0,
+                "balances": [],
+                "role": {"type": constants.ACCOUNT_ROLE_UNKNOWN},
+            }
+        return self._accounts[address]
+
+
+class MockServer(ThreadingHTTPServer):
+    """MockServer serves JSON-RPC requests with the simulated `Ledger`
+
+    Injections are applied to every request, and can be changed while server is running:
+
+    - `latency_secs` + random `[0, latency_jitter_secs)` delay before responding.
+    - `stale_rate` of responses report ledger version `stale_versions` behind, with the ledger timestamp of the version.
+    - `error_rate` of requests respond with JSON-RPC error, or http status `error_http_status` if it is set.
+
+    `num_requests` counts requests received by method name.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        ledger: typing.Optional[Ledger] = None,
+        handlers: typing.Optional[typing.Dict[str, Handler]] = None,
+        latency_secs: float = 0,
+        latency_jitter_secs: float = 0,
+        stale_rate: float = 0,
+        stale_versions: int = 10,
+        error_rate: float = 0,
+        error_http_status: typing.Optional[int] = None,
+        seed: typing.Optional[int] = None,
+        address: typing.Tuple[str, int] = ("localhost", 0),
+    ) -> None:
+        super().__init__(address, _RequestHandler)
+        self.ledger: Ledger = ledger or Ledger()
+        self.handlers: typing.Dict[str, Handler] = handlers or {}
+        self.latency_secs = latency_secs
+        self.latency_jitter_secs = latency_jitter_secs
+        self.stale_rate = stale_rate
+        self.stale_versions = stale_versions
+        self.error_rate = error_rate
+        self.error_http_status = error_http_status
+        self.num_requests: typing.Counter[str] = collections.Counter()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *args: typing.Any) -> None:  # pyre-ignore
+        self.stop()
+
+    def handle_jsonrpc(self, request: typing.Dict[str, typing.Any]) -> typing.Tuple[int, typing.Dict[str, typing.Any]]:
+        """handles one JSON-RPC request, returns http status and response body"""
+
+        method = request.get("method", "")
+        self.num_requests[method] += 1
+        delay = self.latency_secs + (self._rand() * self.latency_jitter_secs if self.latency_jitter_secs else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        stale = self.stale_rate and self._rand() < self.stale_rate
+        version, timestamp_usecs = self.ledger.state(self.stale_versions if stale else 0)
+        response: typing.Dict[str, typing.Any] = {
+            "jsonrpc": "2.0",
+            "id": request.get("id"),
+            "libra_chain_id": self.ledger.chain_id,
+            "libra_ledger_version": version,
+            "libra_ledger_timestampusec": timestamp_usecs,
+        }
+
+        if self.error_rate and self._rand() < self.error_rate:
+            if self.error_http_status:
+                return (self.error_http_status, {"error": "injected error"})
+            response["error"] = {"code": INJECTED_ERROR_CODE, "message": "injected error", "data": None}
+            return (200, response)
+
+        try:
+            response["result"] = self._call(method, request.get("params", []))
+        except _JsonRpcError as e:
+            response["error"] = {"code": e.code, "message": e.message, "data": None}
+        return (200, response)
+
+    def _call(self, method: str, params: typing.List[typing.Any]) -> typing.Any:  # pyre-ignore
+        if method in self.handlers:
+            return self.handlers[method](params)
+        try:
+            if method == "get_metadata":
+                version, timestamp_usecs = self.ledger.state()
+                return {"version": version, "timestamp": timestamp_usecs, "chain_id": self.ledger.chain_id}
+            if method == "get_currencies":
+                return []
+            if method == "get_account":
+                return self.ledger.get_account(params[0])
+            if method == "get_account_transaction":
+                return self.ledger.get_account_transaction(params[0], int(params[1]))
+            if method == "get_account_transactions":
+                return self.ledger.get_account_transactions(params[0], int(params[1]), int(params[2]))
+            if method == "get_transactions":
+                return self.ledger.get_transactions(int(params[0]), int(params[1]))
+            if method == "get_events":
+                return self.ledger.get_events(params[0], int(params[1]), int(params[2]))
+            if method == "submit":
+                txn = diem_types.SignedTransaction.lcs_deserialize(bytes.fromhex(params[0]))
+                try:
+                    self.ledger.submit(txn)
+                except ValueError as e:
+                    raise _JsonRpcError(VM_VALIDATION_ERROR_CODE, f"Server error: VM Validation error: {e}")
+                return None
+        except (IndexError, ValueError, TypeError) as e:
+            raise _JsonRpcError(INVALID_PARAMS_CODE, f"Invalid params: {e}")
+        raise _JsonRpcError(METHOD_NOT_FOUND_CODE, f"Method not found: {method}")
+
+    def _rand(self) -> float:
+        with self._random_lock:
+            return self._random.random()
+
+
+class _JsonRpcError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    # keep-alive, so that clients reuse connections like they do with a real server
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        server = typing.cast(MockServer, self.server)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return self._respond(400, {"error": "invalid json"})
+
+        if isinstance(request, list):
+            responses = [server.handle_jsonrpc(r) for r in request]
+            status = max(status for status, _ in responses) if responses else 200
+            return self._respond(status, [response for _, response in responses])
+        status, response = server.handle_jsonrpc(request)
+        self._respond(status, response)
+
+    def _respond(self, status: int, body: typing.Any) -> None:  # pyre-ignore
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:  # pyre-ignore
+        pass
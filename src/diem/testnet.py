@@ -21,9 +21,10 @@ account: LocalAccount = faucet.gen_account()
 """
 
 import requests
-import typing, time
+import typing
 
 from . import diem_types, jsonrpc, utils, local_account, serde_types, auth_key, chain_ids, lcs, stdlib, LocalAccount
+from . import txnbuilder
 
 
 JSON_RPC_URL: str = "https://testnet.diem.com/v1"
@@ -78,22 +79,14 @@ def exec_txn(sender: LocalAccount, script: diem_types.Script) -> jsonrpc.Transac
     """create, submit and wait for the transaction"""
 
     client = create_client()
-    sender_account_sequence = client.get_account_sequence(sender.account_address)
-    expire = 30
-    txn = sender.sign(
-        diem_types.RawTransaction(  # pyre-ignore
-            sender=sender.account_address,
-            sequence_number=diem_types.st.uint64(sender_account_sequence),
-            payload=diem_types.TransactionPayload__Script(value=script),
-            max_gas_amount=1_000_000,
-            gas_unit_price=0,
-            gas_currency_code=TEST_CURRENCY_CODE,
-            expiration_timestamp_secs=int(time.time()) + expire,
-            chain_id=CHAIN_ID,
-        )
+    template = txnbuilder.TransactionTemplate(
+        sender=sender.account_address, chain_id=CHAIN_ID, currency=TEST_CURRENCY_CODE
     )
+    builder = txnbuilder.TransactionBuilder(template)
+    raw_txn = builder.build(client.get_account_sequence(sender.account_address), script)
+    txn = builder.sign(sender, raw_txn).hex()
     client.submit(txn)
-    return client.wait_for_transaction(txn, timeout_secs=expire)
+    return client.wait_for_transaction(txn, timeout_secs=template.expiration_secs)
 
 
 class Faucet:
@@ -0,0 +1,192 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides TransactionBuilder for creating raw and signed transaction LCS bytes from a template.
+
+Most fields of transactions submitted by one sender are the same: sender, gas, currency and
+chain id. TransactionBuilder serializes them once, then creating a transaction only encodes
+the variable fields (sequence number, script payload and expiration timestamp) and splices
+bytes together:
+
+```python
+
+from diem import txnbuilder, testnet
+
+builder = txnbuilder.TransactionBuilder(
+    txnbuilder.TransactionTemplate(
+        sender=account.account_address, chain_id=testnet.CHAIN_ID, currency=testnet.TEST_CURRENCY_CODE
+    )
+)
+raw_txn = builder.peer_to_peer_with_metadata(sequence_number=seq, payee=payee, amount=1_000_000)
+signed_txn = builder.sign(account, raw_txn)
+
+client.submit(signed_txn.hex())
+client.wait_for_transaction(signed_txn.hex())
+```
+
+Created bytes are bit-for-bit same with `lcs_serialize` of the `diem_types.RawTransaction` and
+`diem_types.SignedTransaction`, use `diem_types.SignedTransaction.lcs_deserialize` for getting
+the transaction object.
+"""
+
+from dataclasses import dataclass
+from . import diem_types, p2p_script, utils
+from .signer import Signer
+import time, typing
+
+# TransactionPayload__Script variant index
+_SCRIPT_PAYLOAD: bytes = utils.uleb128(diem_types.TransactionPayload__Script.INDEX)
+# TransactionAuthenticator__Ed25519 variant index
+_ED25519_AUTHENTICATOR: bytes = utils.uleb128(diem_types.TransactionAuthenticator__Ed25519.INDEX)
+
+
+@dataclass(frozen=True)
+class TransactionTemplate:
+    """TransactionTemplate holds the constant fields of transactions
+
+    Expiration timestamp of a transaction is `expiration_secs` after it is created.
+    Raises `ValueError` if gas or expiration fields are not unsigned 64 bits integers.
+    """
+
+    sender: diem_types.AccountAddress
+    chain_id: diem_types.ChainId
+    currency: str
+    max_gas_amount: int = 1_000_000
+    gas_unit_price: int = 0
+    expiration_secs: int = 30
+
+    def __post_init__(self) -> None:
+        utils.u64_bytes(self.max_gas_amount, "max_gas_amount")
+        utils.u64_bytes(self.gas_unit_price, "gas_unit_price")
+        utils.u64_bytes(self.expiration_secs, "expiration_secs")
+
+
+class TransactionBuilder:
+    """TransactionBuilder creates transaction bytes with pre-serialized template fields
+
+    RawTransaction LCS layout: sender | sequence_number | payload | max_gas_amount | gas_unit_price |
+    gas_currency_code | expiration_timestamp_secs | chain_id; fields except sequence number, payload and
+    expiration timestamp are serialized once when the builder is created.
+    """
+
+    def __init__(self, template: TransactionTemplate, clock: typing.Callable[[], float] = time.time) -> None:
+        self._template = template
+        self._clock = clock
+        self._prefix: bytes = template.sender.lcs_serialize()
+        self._gas: bytes = (
+            utils.u64_bytes(template.max_gas_amount)
+            + utils.u64_bytes(template.gas_unit_price)
+            + utils.uleb128(len(template.currency.encode()))
+            + template.currency.encode()
+        )
+        self._suffix: bytes = template.chain_id.lcs_serialize()
+
+    @property
+    def template(self) -> TransactionTemplate:
+        return self._template
+
+    def build(
+        self,
+        sequence_number: int,
+        script: diem_types.Script,
+        expiration_timestamp_secs: typing.Optional[int] = None,
+    ) -> bytes:
+        """returns raw transaction LCS bytes for the given script"""
+
+        return self.build_with_script_bytes(sequence_number, script.lcs_serialize(), expiration_timestamp_secs)
+
+    def build_with_script_bytes(
+        self,
+        sequence_number: int,
+        script_bytes: bytes,
+        expiration_timestamp_secs: typing.Optional[int] = None,
+    ) -> bytes:
+        """returns raw transaction LCS bytes for the given script LCS bytes
+
+        Raises `ValueError` if the sequence number or expiration timestamp is not an unsigned 64 bits integer.
+        """
+
+        if expiration_timestamp_secs is None:
+            expiration_timestamp_secs = int(self._clock()) + self._template.expiration_secs
+        return b"".join(
+            [
+                self._prefix,
+                utils.u64_bytes(sequence_number, "sequence_number"),
+                _SCRIPT_PAYLOAD,
+                script_bytes,
+                self._gas,
+                utils.u64_bytes(expiration_timestamp_secs, "expiration_timestamp_secs"),
+                self._suffix,
+            ]
+        )
+
+    def peer_to_peer_with_metadata(
+        self,
+        sequence_number: int,
+        payee: p2p_script.Address,
+        amount: int,
+        metadata: bytes = b"",
+        metadata_signature: bytes = b"",
+        expiration_timestamp_secs: typing.Optional[int] = None,
+    ) -> bytes:
+        """returns raw transaction LCS bytes of the peer to peer transfer in template currency"""
+
+        script_bytes = p2p_script.encode_peer_to_peer_with_metadata_script_bytes(
+            self._template.currency, payee, amount, metadata, metadata_signature
+        )
+        return self.build_with_script_bytes(sequence_number, script_bytes, expiration_timestamp_secs)
+
+    def peer_to_peer_with_metadata_many(
+        self,
+        start_sequence_number: int,
+        payees: typing.Sequence[p2p_script.Address],
+        amounts: typing.Sequence[int],
+        metadatas: typing.Optional[typing.Sequence[bytes]] = None,
+        metadata_signatures: typing.Optional[typing.Sequence[bytes]] = None,
+        expiration_timestamp_secs: typing.Optional[int] = None,
+    ) -> typing.List[bytes]:
+        """returns raw transactions LCS bytes of the peer to peer transfers with consecutive sequence numbers"""
+
+        if expiration_timestamp_secs is None:
+            expiration_timestamp_secs = int(self._clock()) + self._template.expiration_secs
+        scripts = p2p_script.encode_peer_to_peer_with_metadata_scripts_bytes(
+            self._template.currency, payees, amounts, metadatas, metadata_signatures
+        )
+        return [
+            self.build_with_script_bytes(start_sequence_number + i, script, expiration_timestamp_secs)
+            for i, script in enumerate(scripts)
+        ]
+
+    def sign(self, signer: Signer, raw_txn: bytes) -> bytes:
+        """signs the raw transaction bytes, returns signed transaction LCS bytes"""
+
+        signature = signer.sign_message(signing_msg(raw_txn))
+        return signed_transaction_bytes(raw_txn, signer.public_key_bytes, signature)
+
+    def sign_many(self, signer: Signer, raw_txns: typing.Sequence[bytes]) -> typing.List[bytes]:
+        """signs the raw transactions by one `Signer#sign_messages` call, returned in the same order"""
+
+        signatures = signer.sign_messages([signing_msg(raw_txn) for raw_txn in raw_txns])
+        public_key = signer.public_key_bytes
+        return [signed_transaction_bytes(raw_txn, public_key, sig) for raw_txn, sig in zip(raw_txns, signatures)]
+
+
+def signing_msg(raw_txn: bytes) -> bytes:
+    """create signing message from raw transaction LCS bytes"""
+
+    return utils.diem_hash_seed(b"RawTransaction") + raw_txn
+
+
+def signed_transaction_bytes(raw_txn: bytes, public_key: bytes, signature: bytes) -> bytes:
+    """create signed transaction LCS bytes with Ed25519 authenticator"""
+
+    return b"".join(
+        [
+            raw_txn,
+            _ED25519_AUTHENTICATOR,
+            utils.uleb128(len(public_key)),
+            public_key,
+            utils.uleb128(len(signature)),
+            signature,
+        ]
+    )
@@ -6,13 +6,32 @@
 
 This module implements utility functions for application to create transaction metadata and metadata signature.
 See https://lip.libra.org/lip-4 for more details
+
+General metadata and travel rule metadata have fixed LCS layouts: the metadata variant index and the version
+variant index (cached as prefix bytes per variant), followed by optional values, which are 0 for None, or 1
+and the value (uleb128 length prefixed bytes or string, or little-endian u64). They are encoded and decoded
+directly at byte level instead of by the generic serializer, the results are same.
 """
 
 
 from dataclasses import dataclass
 import typing
 
-from . import diem_types, serde_types, lcs, jsonrpc, utils
+from . import diem_types, serde_types, lcs, utils
+
+if typing.TYPE_CHECKING:
+    from . import jsonrpc
+
+
+ATTEST_SUFFIX: bytes = b"@@$$LIBRA_ATTEST$$@@"
+
+# LCS prefix bytes of metadata variants: Metadata variant index + version variant index
+_GENERAL_METADATA_V0_PREFIX: bytes = utils.uleb128(diem_types.Metadata__GeneralMetadata.INDEX) + utils.uleb128(
+    diem_types.GeneralMetadata__GeneralMetadataVersion0.INDEX
+)
+_TRAVEL_RULE_METADATA_V0_PREFIX: bytes = utils.uleb128(diem_types.Metadata__TravelRuleMetadata.INDEX) + utils.uleb128(
+    diem_types.TravelRuleMetadata__TravelRuleMetadataVersion0.INDEX
+)
 
 
 class InvalidEventMetadataForRefundError(Exception):
@@ -38,17 +57,18 @@ def travel_rule(
     This is used for peer to peer transfer between 2 custodial accounts.
     """
 
-    metadata = diem_types.Metadata__TravelRuleMetadata(
-        value=diem_types.TravelRuleMetadata__TravelRuleMetadataVersion0(
-            value=diem_types.TravelRuleMetadataV0(off_chain_reference_id=off_chain_reference_id)
-        )
-    )
+    reference_id = off_chain_reference_id.encode() if off_chain_reference_id is not None else None
+    metadata = _TRAVEL_RULE_METADATA_V0_PREFIX + _encode_optional_bytes(reference_id)
+    return (metadata, travel_rule_signing_msg(metadata, sender_address, amount))
 
-    # receiver_lcs_data = lcs(metadata, sender_address, amount) + "@@$$LIBRA_ATTEST$$@@" /*ASCII-encoded string*/
-    attest = Attest(metadata=metadata, sender_address=sender_address, amount=serde_types.uint64(amount))  # pyre-ignore
-    signing_msg = attest.lcs_serialize() + b"@@$$LIBRA_ATTEST$$@@"
 
-    return (metadata.lcs_serialize(), signing_msg)
+def travel_rule_signing_msg(
+    metadata: bytes, sender_address: typing.Union[diem_types.AccountAddress, str], amount: int
+) -> bytes:
+    """Create travel rule metadata signature message bytes from the LCS serialized metadata bytes"""
+
+    # receiver_lcs_data = lcs(metadata, sender_address, amount) + "@@$$LIBRA_ATTEST$$@@" /*ASCII-encoded string*/
+    return metadata + utils.account_address_bytes(sender_address) + utils.u64_bytes(amount, "amount") + ATTEST_SUFFIX
 
 
 def general_metadata(
@@ -70,21 +90,43 @@ def general_metadata(
     if from_subaddress is None and to_subaddress is None:
         return b""
 
-    metadata = diem_types.Metadata__GeneralMetadata(
-        value=diem_types.GeneralMetadata__GeneralMetadataVersion0(
-            value=diem_types.GeneralMetadataV0(  # pyre-ignore
-                from_subaddress=from_subaddress,
-                to_subaddress=to_subaddress,
-                referenced_event=serde_types.uint64(referenced_event) if referenced_event else None,
-            )
-        )
+    return b"".join(
+        [
+            _GENERAL_METADATA_V0_PREFIX,
+            _encode_optional_bytes(to_subaddress),
+            _encode_optional_bytes(from_subaddress),
+            b"\x01" + utils.u64_bytes(referenced_event, "referenced_event") if referenced_event else b"\x00",
+        ]
     )
-    return metadata.lcs_serialize()
+
+
+def decode_metadata(metadata: bytes) -> diem_types.Metadata:
+    """Decode LCS serialized transaction metadata bytes into `diem_types.Metadata`
+
+    GeneralMetadataV0 and TravelRuleMetadataV0, metadata of most of peer to peer transfers, are decoded by a fast
+    path reads the fixed layout bytes; other metadata is decoded by `diem_types.Metadata.lcs_deserialize`.
+
+    Raises ValueError if metadata bytes are invalid.
+    """
+
+    if metadata.startswith(_GENERAL_METADATA_V0_PREFIX):
+        gmv0 = _decode_general_metadata_v0(metadata)
+        if gmv0 is not None:
+            return diem_types.Metadata__GeneralMetadata(
+                value=diem_types.GeneralMetadata__GeneralMetadataVersion0(value=gmv0)
+            )
+    elif metadata.startswith(_TRAVEL_RULE_METADATA_V0_PREFIX):
+        trmv0 = _decode_travel_rule_metadata_v0(metadata)
+        if trmv0 is not None:
+            return diem_types.Metadata__TravelRuleMetadata(
+                value=diem_types.TravelRuleMetadata__TravelRuleMetadataVersion0(value=trmv0)
+            )
+    return diem_types.Metadata.lcs_deserialize(metadata)
 
 
 def find_refund_reference_event(
-    txn: typing.Optional[jsonrpc.Transaction], receiver: typing.Union[diem_types.AccountAddress, str]
-) -> typing.Optional[jsonrpc.Event]:
+    txn: typing.Optional["jsonrpc.Transaction"], receiver: typing.Union[diem_types.AccountAddress, str]
+) -> typing.Optional["jsonrpc.Event"]:
     """Find refund reference event from given transaction
 
     The event can be used as reference is the "receivedpayment" event.
@@ -107,7 +149,7 @@ def find_refund_reference_event(
     return None
 
 
-def refund_metadata_from_event(event: jsonrpc.Event) -> typing.Optional[bytes]:
+def refund_metadata_from_event(event: "jsonrpc.Event") -> typing.Optional[bytes]:
     """create refund metadat for the event
 
     The given event should be the reference event for the refund, it should have metadata describes
@@ -128,7 +170,7 @@ def refund_metadata_from_event(event: jsonrpc.Event) -> typing.Optional[bytes]:
 
     try:
         metadata_bytes = bytes.fromhex(event.data.metadata)
-        metadata = diem_types.Metadata.lcs_deserialize(metadata_bytes)
+        metadata = decode_metadata(metadata_bytes)
 
         if isinstance(metadata, diem_types.Metadata__GeneralMetadata):
             if isinstance(metadata.value, diem_types.GeneralMetadata__GeneralMetadataVersion0):
@@ -140,3 +182,107 @@ def refund_metadata_from_event(event: jsonrpc.Event) -> typing.Optional[bytes]:
         raise InvalidEventMetadataForRefundError(f"unknown metadata type: {metadata}")
     except ValueError as e:
         raise InvalidEventMetadataForRefundError(f"invalid event metadata for refund: {e}, event: {event}")
+
+
+def index_received_payment_events(
+    txns: typing.Sequence[typing.Optional["jsonrpc.Transaction"]],
+) -> typing.Dict[str, typing.Dict[int, "jsonrpc.Event"]]:
+    """Index "receivedpayment" events of transactions by receiver address hex
+
+    Returns receiver address => index of transaction in `txns` => the first "receivedpayment" event of
+    the transaction received by the address, which is the event returned by `find_refund_reference_event`.
+    """
+
+    index: typing.Dict[str, typing.Dict[int, "jsonrpc.Event"]] = {}
+    for i, txn in enumerate(txns):
+        if txn is None:
+            continue
+        for event in txn.events:
+            if event.data.type == "receivedpayment":
+                index.setdefault(event.data.receiver, {}).setdefault(i, event)
+    return index
+
+
+def refund_metadata_from_transactions(
+    txns: typing.Sequence[typing.Optional["jsonrpc.Transaction"]],
+    receiver: typing.Union[diem_types.AccountAddress, str],
+) -> typing.List[typing.Union[bytes, None, InvalidEventMetadataForRefundError]]:
+    """Create refund metadata for a batch of transactions received by the given receiver in one pass
+
+    The result of each transaction is same with calling `find_refund_reference_event` and
+    `refund_metadata_from_event`: None if the transaction is None or the reference event is not found,
+    otherwise the refund metadata bytes, or the InvalidEventMetadataForRefundError raised for the event.
+    """
+
+    index = index_received_payment_events(txns).get(utils.account_address_hex(receiver), {})
+    ret: typing.List[typing.Union[bytes, None, InvalidEventMetadataForRefundError]] = [None] * len(txns)
+    for i, event in index.items():
+        try:
+            ret[i] = refund_metadata_from_event(event)
+        except InvalidEventMetadataForRefundError as e:
+            ret[i] = e
+    return ret
+
+
+def _encode_optional_bytes(value: typing.Optional[bytes]) -> bytes:
+    if value is None:
+        return b"\x00"
+    return b"\x01" + utils.uleb128(len(value)) + bytes(value)
+
+
+def _decode_general_metadata_v0(metadata: bytes) -> typing.Optional[diem_types.GeneralMetadataV0]:
+    """Decode Metadata::GeneralMetadata(GeneralMetadataVersion0) bytes
+
+    Returns None if the bytes are not in the layout: prefix, optional to_subaddress bytes, optional
+    from_subaddress bytes and optional u64 referenced_event; only bytes shorter than 128 (one byte
+    uleb128 length) are decoded, the generic path decodes others.
+    """
+
+    to_subaddress, index = _decode_optional_bytes(metadata, len(_GENERAL_METADATA_V0_PREFIX))
+    if index < 0:
+        return None
+    from_subaddress, index = _decode_optional_bytes(metadata, index)
+    if index < 0 or index >= len(metadata):
+        return None
+    if metadata[index] == 0 and len(metadata) == index + 1:
+        referenced_event = None
+    elif metadata[index] == 1 and len(metadata) == index + 9:
+        referenced_event = serde_types.uint64(int.from_bytes(metadata[index + 1 :], "little"))  # pyre-ignore
+    else:
+        return None
+    return diem_types.GeneralMetadataV0(  # pyre-ignore
+        to_subaddress=to_subaddress, from_subaddress=from_subaddress, referenced_event=referenced_event
+    )
+
+
+def _decode_travel_rule_metadata_v0(metadata: bytes) -> typing.Optional[diem_types.TravelRuleMetadataV0]:
+    """Decode Metadata::TravelRuleMetadata(TravelRuleMetadataVersion0) bytes
+
+    Returns None if the bytes are not in the layout: prefix and optional off_chain_reference_id string
+    shorter than 128 bytes, or the string is not valid utf-8.
+    """
+
+    reference_id, index = _decode_optional_bytes(metadata, len(_TRAVEL_RULE_METADATA_V0_PREFIX))
+    if index != len(metadata):
+        return None
+    try:
+        return diem_types.TravelRuleMetadataV0(
+            off_chain_reference_id=reference_id.decode() if reference_id is not None else None
+        )
+    except UnicodeDecodeError:
+        return None
+
+
+def _decode_optional_bytes(data: bytes, index: int) -> typing.Tuple[typing.Optional[bytes], int]:
+    """returns the decoded value and next index, the index is -1 if data is not in the layout"""
+
+    if index >= len(data):
+        return (None, -1)
+    if data[index] == 0:
+        return (None, index + 1)
+    if data[index] != 1 or index + 1 >= len(data) or data[index + 1] >= 0x80:
+        return (None, -1)
+    end = index + 2 + data[index + 1]
+    if end > len(data):
+        return (None, -1)
+    return (data[index + 2 : end], end)
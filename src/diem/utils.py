@@ -5,10 +5,15 @@
 
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+import functools
 import hashlib
 import typing
 
-from . import diem_types, serde_types, jsonrpc, stdlib
+from . import diem_types, serde_types, lcs
+
+if typing.TYPE_CHECKING:
+    # imported on first use, they are slow to import and not required by most of the functions here
+    from . import jsonrpc, stdlib
 
 
 ACCOUNT_ADDRESS_LEN: int = diem_types.AccountAddress.LENGTH
@@ -17,6 +22,7 @@ DIEM_HASH_PREFIX: bytes = b"LIBRA::"
 ROOT_ADDRESS: str = "0000000000000000000000000a550c18"
 TREASURY_ADDRESS: str = "0000000000000000000000000b1e55ed"
 CORE_CODE_ADDRESS: str = "00000000000000000000000000000001"
+U64_MAX: int = (1 << 64) - 1
 
 
 class InvalidAccountAddressError(Exception):
@@ -113,6 +119,22 @@ def raw_transaction_signing_msg(txn: diem_types.RawTransaction) -> bytes:
     return diem_hash_seed(b"RawTransaction") + txn.lcs_serialize()
 
 
+def raw_transaction_signing_msgs(txns: typing.Iterable[diem_types.RawTransaction]) -> typing.List[bytes]:
+    """create signing messages for given `diem_types.RawTransaction`s, serialized by one reused buffer"""
+
+    seed = diem_hash_seed(b"RawTransaction")
+    serializer = lcs.LcsSerializer()
+    buffer = serializer.output
+    msgs = []
+    for txn in txns:
+        buffer.seek(0)
+        buffer.truncate()
+        buffer.write(seed)
+        serializer.serialize_any(txn, diem_types.RawTransaction)
+        msgs.append(serializer.get_buffer())
+    return msgs
+
+
 def transaction_hash(txn: diem_types.SignedTransaction) -> str:
     """create transaction hash from given `diem_types.SignedTransaction`
 
@@ -123,6 +145,28 @@ def transaction_hash(txn: diem_types.SignedTransaction) -> str:
     return hash(diem_hash_seed(b"Transaction"), user_txn.lcs_serialize()).hex()
 
 
+@functools.lru_cache(maxsize=1024)
+def uleb128(value: int) -> bytes:
+    """encode unsigned integer as ULEB128 bytes, which is LCS format of length and variant index
+
+    Encoded by `lcs.LcsSerializer`, results are cached as the values are mostly small lengths.
+    """
+
+    serializer = lcs.LcsSerializer()
+    serializer.serialize_u32_as_uleb128(value)
+    return serializer.get_buffer()
+
+
+def u64_bytes(value: int, name: str = "value") -> bytes:
+    """encode unsigned 64 bits integer as LCS bytes, raises `ValueError` if the value is out of range"""
+
+    value = int(value)
+    if not 0 <= value <= U64_MAX:
+        raise ValueError(f"{name} must be in range [0, {U64_MAX}], but got {value}")
+    return value.to_bytes(8, "little")
+
+
+@functools.lru_cache(maxsize=None)
 def diem_hash_seed(typ: bytes) -> bytes:
     return hash(DIEM_HASH_PREFIX, typ)
 
@@ -136,8 +180,8 @@ def hash(b1: bytes, b2: bytes) -> bytes:
 
 
 def decode_transaction_script(
-    txn: typing.Union[str, jsonrpc.TransactionData, jsonrpc.Transaction]
-) -> stdlib.ScriptCall:
+    txn: typing.Union[str, "jsonrpc.TransactionData", "jsonrpc.Transaction"]
+) -> "stdlib.ScriptCall":
     """decode jsonrpc.Transaction#transaction#script_bytes
 
     Returns `stdlib.ScriptCall`, which is same object we created for `diem_types.RawTransaction`
@@ -146,6 +190,8 @@ def decode_transaction_script(
     See diem.stdlib documentation for more details.
     """
 
+    from . import jsonrpc, stdlib
+
     if isinstance(txn, str):
         script = diem_types.Script.lcs_deserialize(bytes.fromhex(txn))
         return stdlib.decode_script(script)
@@ -157,7 +203,7 @@ def decode_transaction_script(
     raise TypeError(f"unknown transaction type: {txn}")
 
 
-def balance(account: jsonrpc.Account, currency: str) -> int:
+def balance(account: "jsonrpc.Account", currency: str) -> int:
     for b in account.balances:
         if b.currency == currency:
             return b.amount
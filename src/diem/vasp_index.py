@@ -0,0 +1,170 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Resolves child VASP account addresses to parent VASP account addresses locally
+
+`VaspIndex` keeps a child -> parent VASP address index, which is populated from the `createaccount`
+events of transactions (`index_transactions`) and from `get_account` results (`index_account`).
+Parent VASP addresses are indexed to themselves. The child to parent relationship never changes on
+chain, so indexed addresses are never invalidated; addresses not in the index are resolved by the
+client (one `get_account` call) and then indexed.
+
+```python
+
+from diem import vasp_index
+
+index = vasp_index.VaspIndex(client, path="vasps.bin")
+index.index_transactions(client.get_transactions(start, 1000, include_events=True))
+parent_address = index.get_parent_vasp_address(counterparty_address)
+```
+"""
+
+import typing
+
+from . import diem_types, hashtable, utils
+from .jsonrpc.constants import (
+    ACCOUNT_ROLE_CHILD_VASP,
+    ACCOUNT_ROLE_PARENT_VASP,
+    EVENT_DATA_CREATE_ACCOUNT,
+    TRANSACTION_DATA_USER,
+    VM_STATUS_EXECUTED,
+)
+
+if typing.TYPE_CHECKING:
+    from . import jsonrpc
+
+
+# `createaccount` event role_id values, see Diem framework `Roles` module
+PARENT_VASP_ROLE_ID: int = 5
+CHILD_VASP_ROLE_ID: int = 6
+
+DEFAULT_INDEX_CAPACITY: int = hashtable.DEFAULT_CAPACITY
+
+# index file is a `hashtable.Uint64HashTable` of (address, parent address) slots, an address is
+# 2 uint64 words of its big-endian halves
+_INDEX_MAGIC: int = int.from_bytes(b"DIEMVSP1", "little")
+_UINT64_MASK: int = (1 << 64) - 1
+
+
+class VaspIndex:
+    """VaspIndex maps child VASP account addresses to parent VASP account addresses
+
+    Addresses are stored in a compact hash table (`hashtable.Uint64HashTable`) of (address, parent
+    address) slots, kept at most half full and doubled when needed. The zero address marks empty
+    slots. Lookups are lock-free and safe while other threads add addresses.
+
+    The index is in memory by default; given a file path, the table is a memory-mapped file, which
+    is created if it does not exist, and changes are written to the file (call `flush` to make sure
+    they are on disk).
+    """
+
+    def __init__(
+        self,
+        client: typing.Optional["jsonrpc.Client"] = None,
+        capacity: int = DEFAULT_INDEX_CAPACITY,
+        path: typing.Optional[str] = None,
+    ) -> None:
+        self._client = client
+        self._table: hashtable.Uint64HashTable = hashtable.Uint64HashTable(
+            _INDEX_MAGIC, 2, 2, "VASP index", capacity, path
+        )
+
+    def flush(self) -> None:
+        """flush changes of memory-mapped index to disk, no-op for in memory index"""
+
+        self._table.flush()
+
+    def find_parent_vasp_address(self, address: typing.Union[diem_types.AccountAddress, str]) -> typing.Optional[str]:
+        """find parent VASP address of a child or parent VASP address in the index, returns None if not found"""
+
+        key = _address_key(address)
+        if key == (0, 0):
+            return None
+        parent = self._table.find(key)
+        return None if parent is None else _address_hex(*parent)
+
+    def get_parent_vasp_address(self, address: typing.Union[diem_types.AccountAddress, str]) -> str:
+        """returns parent VASP address of a child or parent VASP address, falls back to the client
+
+        Raises `ValueError` if the account is not a VASP account, and `jsonrpc.AccountNotFoundError`
+        if the account is not found.
+        """
+
+        parent = self.find_parent_vasp_address(address)
+        if parent is not None:
+            return parent
+        if self._client is None:
+            raise ValueError(f"account {utils.account_address_hex(address)} is not indexed and no client is given")
+
+        account = self._client.must_get_account(address)
+        parent = self.index_account(account)
+        if parent is None:
+            raise ValueError(f"given account address({utils.account_address_hex(address)}) is not a VASP account")
+        return parent
+
+    def add(
+        self,
+        address: typing.Union[diem_types.AccountAddress, str],
+        parent_vasp_address: typing.Union[diem_types.AccountAddress, str],
+    ) -> None:
+        """add or replace the parent VASP address of the given address"""
+
+        key = _address_key(address)
+        if key == (0, 0):
+            raise ValueError("zero address can't be indexed")
+        self._table.insert(key, _address_key(parent_vasp_address))
+
+    def index_account(self, account: "jsonrpc.Account") -> typing.Optional[str]:
+        """index a `get_account` result, returns the parent VASP address, or None if it is not a VASP account"""
+
+        role = account.role
+        if role.type == ACCOUNT_ROLE_PARENT_VASP:
+            parent = account.address
+        elif role.type == ACCOUNT_ROLE_CHILD_VASP:
+            parent = role.parent_vasp_address
+        else:
+            return None
+        self.add(account.address, parent)
+        return utils.account_address_hex(parent)
+
+    def index_transactions(self, txns: typing.Iterable["jsonrpc.Transaction"]) -> int:
+        """index VASP accounts created by the transactions, returns the number of accounts indexed
+
+        The parent VASP of a child VASP account is the sender of the transaction that created it,
+        hence transactions should include events.
+        """
+
+        count = 0
+        for txn in txns:
+            if txn.transaction.type != TRANSACTION_DATA_USER or txn.vm_status.type != VM_STATUS_EXECUTED:
+                continue
+            for event in txn.events:
+                data = event.data
+                if data.type != EVENT_DATA_CREATE_ACCOUNT:
+                    continue
+                if data.role_id == CHILD_VASP_ROLE_ID:
+                    self.add(data.created_address, txn.transaction.sender)
+                elif data.role_id == PARENT_VASP_ROLE_ID:
+                    self.add(data.created_address, data.created_address)
+                else:
+                    continue
+                count += 1
+        return count
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __contains__(self, address: typing.Union[diem_types.AccountAddress, str]) -> bool:
+        return self.find_parent_vasp_address(address) is not None
+
+
+def _address_key(address: typing.Union[diem_types.AccountAddress, str]) -> typing.Tuple[int, int]:
+    if isinstance(address, str) and len(address) == utils.ACCOUNT_ADDRESS_LEN * 2:
+        key = int.from_bytes(bytes.fromhex(address), "big")
+    else:
+        key = int.from_bytes(utils.account_address_bytes(address), "big")
+    return (key >> 64, key & _UINT64_MASK)
+
+
+def _address_hex(hi: int, lo: int) -> str:
+    return ((hi << 64) | lo).to_bytes(utils.ACCOUNT_ADDRESS_LEN, "big").hex()
@@ -0,0 +1,191 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Benchmarks of the SDK hot paths, runs offline with pytest-benchmark.
+
+Run and compare with the stored baseline, fails if min time of a benchmark regressed more than the
+threshold (`BENCH_THRESHOLD` in Makefile):
+
+```
+make bench
+```
+
+Save a new baseline after performance changes are merged (baselines are stored per machine type
+by pytest-benchmark under tests/benchmarks/baselines), with the Python version CI runs (3.8), as
+baselines are only compared on the same interpreter:
+
+```
+make bench-save
+```
+
+The `get_transactions` fixture is a synthetic JSON-RPC response of 20 transactions (block metadata
+and peer to peer transfers with travel rule metadata), not recorded from a Diem JSON-RPC service;
+it has the same format and response headers (`libra_chain_id`, `libra_ledger_version` and
+`libra_ledger_timestampusec`) that the client reads.
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from diem import diem_types, identifier, jsonrpc, payment_router, txnmetadata, utils, LocalAccount
+from diem.jsonrpc.client import _parse_list
+from ..helpers import gen_event, gen_raw_transaction
+import json, os, subprocess, sys, threading, typing
+import numpy as np
+
+
+FIXTURES_DIR: str = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+@pytest.fixture(scope="module")
+def account() -> LocalAccount:
+    return LocalAccount.generate()
+
+
+@pytest.fixture(scope="module")
+def signed_txn(account: LocalAccount) -> diem_types.SignedTransaction:
+    return account.sign(gen_raw_transaction(account, 1))
+
+
+@pytest.fixture(scope="module")
+def get_transactions_result() -> list:
+    with open(os.path.join(FIXTURES_DIR, "get_transactions.json")) as f:
+        return json.load(f)["result"]
+
+
+def test_lcs_serialize_signed_transaction(benchmark, signed_txn):
+    benchmark(signed_txn.lcs_serialize)
+
+
+def test_lcs_deserialize_signed_transaction(benchmark, signed_txn):
+    data = signed_txn.lcs_serialize()
+    assert benchmark(diem_types.SignedTransaction.lcs_deserialize, data) == signed_txn
+
+
+def test_transaction_hash(benchmark, signed_txn):
+    benchmark(utils.transaction_hash, signed_txn)
+
+
+def test_local_account_sign(benchmark, account):
+    txn = gen_raw_transaction(account, 1)
+    benchmark(account.sign, txn)
+
+
+def test_identifier_encode_account(benchmark, account):
+    subaddress = identifier.gen_subaddress()
+    benchmark(identifier.encode_account, account.account_address, subaddress, identifier.TLB)
+
+
+def test_identifier_decode_account(benchmark, account):
+    encoded = identifier.encode_account(account.account_address, identifier.gen_subaddress(), identifier.TLB)
+    benchmark(identifier.decode_account, encoded, identifier.TLB)
+
+
+def test_identifier_encode_accounts(benchmark):
+    addresses = np.random.randint(0, 256, size=(10_000, 16), dtype=np.uint8)
+    subaddresses = np.random.randint(0, 256, size=(10_000, 8), dtype=np.uint8)
+    benchmark(identifier.encode_accounts, addresses, subaddresses, identifier.TLB)
+
+
+def test_identifier_decode_accounts(benchmark):
+    addresses = np.random.randint(0, 256, size=(10_000, 16), dtype=np.uint8)
+    encoded = identifier.encode_accounts(addresses, None, identifier.TLB)
+    benchmark(identifier.decode_accounts, encoded, identifier.TLB)
+
+
+def test_identifier_decode_intent(benchmark, account):
+    encoded = identifier.encode_account(account.account_address, identifier.gen_subaddress(), identifier.TLB)
+    intent_id = identifier.encode_intent(encoded, "XUS", 1_000_000)
+    benchmark(identifier.decode_intent, intent_id, identifier.TLB)
+
+
+def test_identifier_decode_intent_url_parser(benchmark, account):
+    # general url parser path, compare with test_identifier_decode_intent
+    encoded = identifier.encode_account(account.account_address, identifier.gen_subaddress(), identifier.TLB)
+    intent_id = identifier.encode_intent(encoded, "XUS", 1_000_000)
+    benchmark(identifier._decode_intent_url, intent_id, identifier.TLB)
+
+
+def test_txnmetadata_travel_rule(benchmark, account):
+    benchmark(txnmetadata.travel_rule, "reference-id", account.account_address, 1_000_000)
+
+
+def test_txnmetadata_decode_general_metadata(benchmark):
+    metadata = txnmetadata.general_metadata(identifier.gen_subaddress(), identifier.gen_subaddress())
+    benchmark(txnmetadata.decode_metadata, metadata)
+
+
+def test_payment_router_route(benchmark, account):
+    registry = identifier.SubaddressRegistry()
+    subaddresses = [registry.allocate(i) for i in range(100)]
+    receiver = account.account_address.to_hex()
+    events = [
+        gen_event(receiver, txnmetadata.general_metadata(identifier.gen_subaddress(), subaddresses[i % 100]))
+        for i in range(1000)
+    ]
+    router = payment_router.PaymentRouter(registry.find_user_id, receiver=receiver, default_handler=lambda p: None)
+    assert len(benchmark(router.route, events)) == 1000
+
+
+def test_parse_get_transactions(benchmark, get_transactions_result):
+    parser = _parse_list(lambda: jsonrpc.Transaction())
+    txns = benchmark(parser, get_transactions_result)
+    assert len(txns) == len(get_transactions_result)
+
+
+def test_txnmetadata_refund_metadata_from_transactions(benchmark, get_transactions_result):
+    txns = _parse_list(lambda: jsonrpc.Transaction())(get_transactions_result * 50)
+    receiver = txns[1].events[1].data.receiver
+    ret = benchmark(txnmetadata.refund_metadata_from_transactions, txns, receiver)
+    assert len([metadata for metadata in ret if metadata]) > 0
+
+
+def test_client_last_known_state_contention(benchmark):
+    # 16 threads share one client, each thread tracks the ledger state of its responses as
+    # `_send_http_request` does; 10 responses per ledger version, interleaved across the threads
+    benchmark.pedantic(_run_last_known_state_threads, setup=lambda: _start_last_known_state_threads(16, 2000), rounds=5)
+
+
+def _start_last_known_state_threads(threads: int, iterations: int) -> typing.Tuple[tuple, dict]:
+    client = jsonrpc.Client("url")
+    start = threading.Event()
+
+    def worker(versions: typing.List[int]) -> None:
+        start.wait()
+        for version in versions:
+            try:
+                client.update_last_known_state(2, version, version)
+            except jsonrpc.StaleResponseError:
+                pass
+            client.get_last_known_state()
+
+    # versions are computed before the threads start, no shared state other than the client is accessed
+    workers = [
+        threading.Thread(target=worker, args=([(i * threads + t) // 10 for i in range(iterations)],))
+        for t in range(threads)
+    ]
+    for w in workers:
+        w.start()
+    return ((start, workers), {})
+
+
+def _run_last_known_state_threads(start: threading.Event, workers: typing.List[threading.Thread]) -> None:
+    start.set()
+    for w in workers:
+        w.join()
+
+
+def test_import_diem(benchmark):
+    # new interpreter for every round, includes interpreter startup time
+    benchmark.pedantic(_import_in_new_interpreter, args=("import diem",), rounds=10)
+
+
+def test_import_diem_local_account(benchmark):
+    benchmark.pedantic(_import_in_new_interpreter, args=("from diem import LocalAccount",), rounds=5)
+
+
+def _import_in_new_interpreter(statement: str) -> None:
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "src")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([src, os.environ.get("PYTHONPATH", "")]))
+    subprocess.check_call([sys.executable, "-c", statement], env=env)
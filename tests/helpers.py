@@ -0,0 +1,37 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Test data generators shared by tests and benchmarks"""
+
+from diem import diem_types, chain_ids, jsonrpc, utils, LocalAccount
+
+
+def gen_raw_transaction(account: LocalAccount, seq: int) -> diem_types.RawTransaction:
+    return diem_types.RawTransaction(  # pyre-ignore
+        sender=account.account_address,
+        sequence_number=diem_types.st.uint64(seq),
+        payload=diem_types.TransactionPayload__Script(
+            value=diem_types.Script(code=b"code", ty_args=[utils.currency_code("Coin1")], args=[])
+        ),
+        max_gas_amount=diem_types.st.uint64(1_000_000),
+        gas_unit_price=diem_types.st.uint64(0),
+        gas_currency_code="Coin1",
+        expiration_timestamp_secs=diem_types.st.uint64(1611792876),
+        chain_id=chain_ids.TESTING,
+    )
+
+
+def gen_event(
+    receiver: str, metadata: bytes, sequence_number: int = 0, event_type: str = "receivedpayment"
+) -> jsonrpc.Event:
+    return jsonrpc.Event(
+        key="0000000000000000" + receiver,
+        sequence_number=sequence_number,
+        data=jsonrpc.EventData(
+            type=event_type,
+            amount=jsonrpc.Amount(amount=100, currency="XUS"),
+            sender=LocalAccount.generate().account_address.to_hex(),
+            receiver=receiver,
+            metadata=metadata.hex(),
+        ),
+    )
@@ -12,3 +12,15 @@ def test_new_auth_key_from_public_key():
     assert auth_key.hex() == "459c77a38803bd53f3adee52703810e3a74fd7c46952c497e75afb0a7932586d"
     assert auth_key.prefix().hex() == "459c77a38803bd53f3adee52703810e3"
     assert auth_key.account_address().to_hex() == "a74fd7c46952c497e75afb0a7932586d"
+
+
+def test_auth_key_derived_values_are_cached():
+    auth_key = AuthKey(bytes.fromhex("459c77a38803bd53f3adee52703810e3a74fd7c46952c497e75afb0a7932586d"))
+    assert auth_key.account_address() is auth_key.account_address()
+    assert auth_key.prefix() is auth_key.prefix()
+    assert auth_key.hex() is auth_key.hex()
+
+    auth_key.data = bytes.fromhex("00000000000000000000000000000000a74fd7c46952c497e75afb0a7932586e")
+    assert auth_key.prefix() == bytes(16)
+    assert auth_key.account_address().to_hex() == "a74fd7c46952c497e75afb0a7932586e"
+    assert auth_key.hex() == "00000000000000000000000000000000a74fd7c46952c497e75afb0a7932586e"
@@ -3,8 +3,8 @@
 
 
 from diem import jsonrpc, testnet
-from concurrent.futures import ThreadPoolExecutor
-import pytest, time
+from concurrent.futures import Future, ThreadPoolExecutor
+import dataclasses, json as json_lib, pytest, requests, threading, time
 
 
 def test_update_last_known_state():
@@ -40,6 +40,43 @@ def test_update_last_known_state():
     assert client.get_last_known_state().timestamp_usecs == 3
 
 
+def test_last_known_state_is_immutable_snapshot():
+    client = jsonrpc.Client("url")
+    client.update_last_known_state(2, 2, 2)
+    state = client.get_last_known_state()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        state.version = 3
+
+    client.update_last_known_state(2, 3, 3)
+    assert state.version == 2
+    assert client.get_last_known_state().version == 3
+
+
+def test_update_last_known_state_concurrently():
+    client = jsonrpc.Client("url")
+    errors = []
+
+    def update(start):
+        for version in range(start, 2000, 8):
+            try:
+                client.update_last_known_state(2, version, version)
+            except jsonrpc.StaleResponseError:
+                pass
+            except Exception as e:
+                errors.append(e)
+            state = client.get_last_known_state()
+            if state.version != state.timestamp_usecs:
+                errors.append(state)
+
+    threads = [threading.Thread(target=update, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert client.get_last_known_state() == jsonrpc.State(chain_id=2, version=1999, timestamp_usecs=1999)
+
+
 def test_invalid_server_url():
     client = jsonrpc.Client("url")
     with pytest.raises(jsonrpc.NetworkError):
@@ -102,10 +139,319 @@ def test_raises_error_if_primary_and_backup_both_failed():
         assert client.get_currencies()
 
 
+def test_load_balancing_routes_to_fastest_endpoint():
+    executor = ThreadPoolExecutor(2)
+    rs = jsonrpc.RequestWithLoadBalancing(backups=["backup"], executor=executor, min_hedge_samples=1000)
+    client = jsonrpc.Client("primary", rs=rs)
+    client._send_http_request = gen_metadata_response(client, snap="primary")
+
+    # first 2 requests probe both endpoints
+    winners = [client.get_metadata().script_hash_allow_list[0] for _ in range(10)]
+    assert winners[2:] == ["backup"] * 8
+    executor.shutdown()
+
+
+def test_load_balancing_fails_over_and_ejects_failed_endpoint():
+    executor = ThreadPoolExecutor(2)
+    rs = jsonrpc.RequestWithLoadBalancing(
+        backups=["backup"], executor=executor, failure_threshold=1, reset_timeout_secs=0.2
+    )
+    client = jsonrpc.Client("primary", rs=rs)
+    client._send_http_request = gen_metadata_response(client, fail="primary")
+    for _ in range(5):
+        assert client.get_metadata().script_hash_allow_list == ["backup"]
+
+    health = {e.url: e for e in rs.endpoints()}
+    assert not health["primary"].is_available()
+    assert health["backup"].is_available()
+
+    # primary recovers and is reinstated by the trial request after reset timeout
+    client._send_http_request = gen_metadata_response(client, fail="backup")
+    time.sleep(0.2)
+    assert health["primary"].is_available()
+    assert client.get_metadata().script_hash_allow_list == ["primary"]
+    assert health["primary"].opened_at is None
+    executor.shutdown()
+
+
+def test_load_balancing_hedges_slow_request():
+    executor = ThreadPoolExecutor(2)
+    rs = jsonrpc.RequestWithLoadBalancing(backups=["backup"], executor=executor, min_hedge_samples=1)
+    client = jsonrpc.Client("primary", rs=rs)
+    client._send_http_request = gen_metadata_response(client)
+    client.get_metadata()
+    client.get_metadata()
+
+    # primary becomes slow, hedged request to backup returns first
+    client._send_http_request = gen_metadata_response(client, snap="primary")
+    start = time.time()
+    assert client.get_metadata().script_hash_allow_list == ["backup"]
+    assert time.time() - start < 0.1
+    executor.shutdown()
+
+
+def test_load_balancing_does_not_count_client_errors_as_endpoint_failures():
+    executor = ThreadPoolExecutor(2)
+    rs = jsonrpc.RequestWithLoadBalancing(backups=["backup"], executor=executor, failure_threshold=1)
+    client = jsonrpc.Client("primary", rs=rs)
+
+    def bad_request(url, request, ignore_stale_response):
+        response = requests.Response()
+        response.status_code = 400
+        raise requests.HTTPError("400 Client Error", response=response)
+
+    client._send_http_request = bad_request
+    for _ in range(3):
+        with pytest.raises(jsonrpc.NetworkError):
+            client.get_metadata()
+    assert all(e.is_available() and e.consecutive_failures == 0 for e in rs.endpoints())
+    executor.shutdown()
+
+
+def test_load_balancing_does_not_hedge_to_ejected_endpoint():
+    executor = ThreadPoolExecutor(2)
+    rs = jsonrpc.RequestWithLoadBalancing(
+        backups=["backup"], executor=executor, min_hedge_samples=1, failure_threshold=1, reset_timeout_secs=60
+    )
+    client = jsonrpc.Client("primary", rs=rs)
+    client._send_http_request = gen_metadata_response(client)
+    client.get_metadata()
+    client.get_metadata()
+
+    urls = []
+    send_request = gen_metadata_response(client, fail="backup", snap="primary")
+
+    def record_url(url, request, ignore_stale_response):
+        urls.append(url)
+        return send_request(url, request, ignore_stale_response)
+
+    client._send_http_request = record_url
+    # primary is slow: the hedged request fails and ejects backup, then backup is not sent requests anymore
+    for _ in range(3):
+        assert client.get_metadata().script_hash_allow_list == ["primary"]
+    assert urls.count("backup") == 1
+    health = {e.url: e for e in rs.endpoints()}
+    assert not health["backup"].is_available()
+    executor.shutdown()
+
+
+def test_load_balancing_releases_trial_request_cancelled_in_queue():
+    executor = ThreadPoolExecutor(1)
+    rs = jsonrpc.RequestWithLoadBalancing(
+        backups=["backup"],
+        executor=executor,
+        min_hedge_samples=1,
+        ewma_alpha=1,
+        failure_threshold=1,
+        reset_timeout_secs=0,
+    )
+    client = jsonrpc.Client("primary", rs=rs)
+    client._send_http_request = gen_metadata_response(client)
+    client.get_metadata()
+    client.get_metadata()
+
+    # primary is ejected and half-open right away, it is the best scored endpoint for the trial request
+    health = {e.url: e for e in rs.endpoints()}
+    health["primary"].record_failure(0)
+    assert health["primary"].is_available()
+
+    # the only worker is busy: primary request is queued, the hedged request runs inline and wins
+    blocker = threading.Event()
+    executor.submit(blocker.wait)
+    submitted = []
+
+    def submit(fn):
+        submitted.append(fn)
+        if len(submitted) == 1:
+            return ThreadPoolExecutor.submit(executor, fn)
+        future = Future()
+        future.set_result(fn())
+        return future
+
+    executor.submit = submit
+    try:
+        assert client.get_metadata().script_hash_allow_list == ["backup"]
+        assert len(submitted) == 2
+        assert health["primary"].is_available()
+    finally:
+        blocker.set()
+        executor.shutdown()
+
+
+def test_endpoint_health():
+    health = jsonrpc.EndpointHealth("url", ewma_alpha=0.5, failure_threshold=2, reset_timeout_secs=60)
+    assert health.latency_percentile(95) is None
+    assert health.score(10, 0.01) == 0
+
+    health.record_success(0.2, 10)
+    health.record_success(0.4, 12)
+    assert health.latency_ewma_secs == pytest.approx(0.3)
+    assert health.ledger_version == 12
+    assert health.latency_percentile(50) == 0.4
+    assert health.score(22, 0.01) == pytest.approx(0.3 + 0.1)
+
+    health.record_failure(0.1)
+    assert health.error_rate == 0.5
+    assert health.is_available()
+    health.record_failure(0.1)
+    assert not health.is_available()
+
+
+def test_hedging_strategy_sends_to_backup_only_after_hedge_delay():
+    executor = ThreadPoolExecutor(2)
+    rs = jsonrpc.RequestWithHedging(backups=["backup"], executor=executor, min_samples=5)
+    client = jsonrpc.Client("primary", rs=rs)
+    urls = []
+    send_request = gen_metadata_response(client, snap="primary")
+
+    def record_url(url, request, ignore_stale_response):
+        urls.append(url)
+        return send_request(url, request, ignore_stale_response)
+
+    client._send_http_request = record_url
+    # initial hedge delay is 1 second, primary wins
+    for _ in range(5):
+        assert client.get_metadata().script_hash_allow_list == ["primary"]
+    assert urls == ["primary"] * 5
+    assert rs.histogram.count == 5
+    assert 0.1 <= rs.hedge_delay_secs() <= 0.25
+
+    executor.shutdown()
+
+
+def test_hedging_strategy_does_not_observe_failed_primary_latency():
+    executor = ThreadPoolExecutor(2)
+    rs = jsonrpc.RequestWithHedging(backups=["backup"], executor=executor)
+    client = jsonrpc.Client("primary", rs=rs)
+    client._send_http_request = gen_metadata_response(client, fail="primary")
+    for _ in range(3):
+        assert client.get_metadata().script_hash_allow_list == ["backup"]
+    assert rs.histogram.count == 0
+
+    client._send_http_request = gen_metadata_response(client)
+    client.get_metadata()
+    assert rs.histogram.count == 1
+    executor.shutdown()
+
+
+def test_hedging_strategy_returns_backup_response_when_primary_is_slow():
+    executor = ThreadPoolExecutor(2)
+    rs = jsonrpc.RequestWithHedging(backups=["backup"], executor=executor, initial_hedge_delay_secs=0.01)
+    client = jsonrpc.Client("primary", rs=rs)
+    client._send_http_request = gen_metadata_response(client, snap="primary")
+    assert client.get_metadata().script_hash_allow_list == ["backup"]
+
+    client._send_http_request = gen_metadata_response(client, fail="primary", snap="backup")
+    assert client.get_metadata().script_hash_allow_list == ["backup"]
+    executor.shutdown()
+
+
+def test_latency_histogram():
+    histogram = jsonrpc.LatencyHistogram(buckets=[0.1, 0.2, 0.4])
+    assert histogram.percentile(95) is None
+
+    for latency in [0.05, 0.15, 0.15, 0.3]:
+        histogram.observe(latency)
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(0.65)
+    assert histogram.buckets() == [(0.1, 1), (0.2, 3), (0.4, 4), (float("inf"), 4)]
+    assert histogram.percentile(25) == pytest.approx(0.1)
+    assert histogram.percentile(50) == pytest.approx(0.15)
+    assert histogram.percentile(100) == pytest.approx(0.3)
+
+    histogram.observe(1)
+    assert histogram.percentile(100) == 1
+
+
+def test_observer_receives_call_events():
+    observer = RecordObserver()
+    client = jsonrpc.Client("http://url", retry=jsonrpc.Retry(3, 0.01, jsonrpc.StaleResponseError), observer=observer)
+    client._session = FakeSession(
+        [
+            {"result": {"version": 2}, "libra_chain_id": 2, "libra_ledger_version": 2, "libra_ledger_timestampusec": 2},
+            {"result": {"version": 1}, "libra_chain_id": 2, "libra_ledger_version": 1, "libra_ledger_timestampusec": 1},
+            {"result": {"version": 3}, "libra_chain_id": 2, "libra_ledger_version": 3, "libra_ledger_timestampusec": 3},
+            {"result": None, "libra_chain_id": 2, "libra_ledger_version": 1, "libra_ledger_timestampusec": 1},
+        ]
+    )
+
+    assert client.get_metadata().version == 2
+    # second response is stale, retried
+    assert client.get_metadata().version == 3
+    # stale response is ignored for submit
+    client.submit("00")
+
+    calls = [e for e in observer.events if e[0] == "on_call"]
+    assert [(c[1], c[3]) for c in calls] == [
+        ("get_metadata", None),
+        ("get_metadata", jsonrpc.StaleResponseError),
+        ("get_metadata", None),
+        ("submit", None),
+    ]
+    assert [e[1:] for e in observer.events if e[0] == "on_retry"] == [("get_metadata", 1)]
+    assert [e[1:] for e in observer.events if e[0] == "on_stale_response_ignored"] == [("http://url", "submit")]
+    # stale response raised error, hence no endpoint selected
+    selected = [e[1:] for e in observer.events if e[0] == "on_endpoint_selected"]
+    assert selected == [("http://url", "get_metadata")] * 2 + [("http://url", "submit")]
+    assert len([e for e in observer.events if e[0] == "on_result_parsed"]) == 2
+    http_requests = [e for e in observer.events if e[0] == "on_http_request"]
+    assert len(http_requests) == 4
+    url, method, _, bytes_sent, bytes_received, error = http_requests[0][1:]
+    assert (url, method, error) == ("http://url", "get_metadata", None)
+    assert bytes_sent > 0
+    assert bytes_received > 0
+
+
+def test_observer_receives_backup_endpoint_selected():
+    observer = RecordObserver()
+    executor = ThreadPoolExecutor(2)
+    rs = jsonrpc.RequestWithBackups(backups=["backup"], executor=executor, fallback=True)
+    client = jsonrpc.Client("primary", rs=rs, observer=observer)
+    client._send_http_request = gen_metadata_response(client, fail="primary")
+    client.get_metadata()
+    assert [e[1:] for e in observer.events if e[0] == "on_endpoint_selected"] == [("backup", "get_metadata")]
+    executor.shutdown()
+
+
+class RecordObserver(jsonrpc.Observer):
+    def __init__(self):
+        self.events = []
+
+    def on_call(self, method, duration_secs, error):
+        self.events.append(("on_call", method, duration_secs, type(error) if error else None))
+
+    def on_retry(self, method, retries):
+        self.events.append(("on_retry", method, retries))
+
+    def on_http_request(self, url, method, duration_secs, bytes_sent, bytes_received, error):
+        self.events.append(("on_http_request", url, method, duration_secs, bytes_sent, bytes_received, error))
+
+    def on_result_parsed(self, method, duration_secs):
+        self.events.append(("on_result_parsed", method))
+
+    def on_stale_response_ignored(self, url, method):
+        self.events.append(("on_stale_response_ignored", url, method))
+
+    def on_endpoint_selected(self, url, method):
+        self.events.append(("on_endpoint_selected", url, method))
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+
+    def post(self, url, json, timeout):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json_lib.dumps({"jsonrpc": "2.0", "id": 1, **self.responses.pop(0)}).encode()
+        response.request = requests.Request("POST", url, json=json).prepare()
+        return response
+
+
 def gen_metadata_response(client, fail=None, snap=None):
     def send_request(url, request, ignore_stale_response):
         if fail == url:
-            raise StaleResponseError("error")
+            raise jsonrpc.StaleResponseError("error")
 
         if snap == url:
             time.sleep(0.1)
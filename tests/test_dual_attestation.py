@@ -0,0 +1,252 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import dual_attestation, jsonrpc, txnmetadata, utils, LocalAccount
+from diem.testing import MockServer, Ledger
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pytest, typing
+
+
+def gen_requests(n: int) -> typing.List[dual_attestation.Request]:
+    sender = LocalAccount.generate().account_address
+    return [(f"ref-{i}", sender, 1_000_000 + i) for i in range(n)]
+
+
+def test_sign_and_verify():
+    account = LocalAccount.generate()
+    requests = gen_requests(5)
+
+    results = dual_attestation.sign(account.compliance_key, requests)
+    assert len(results) == len(requests)
+    for (reference_id, sender, amount), (metadata, signature) in zip(requests, results):
+        expected_metadata, msg = txnmetadata.travel_rule(reference_id, sender, amount)
+        assert metadata == expected_metadata
+        account.compliance_key.public_key().verify(signature, msg)
+
+    signatures = [signature for _, signature in results]
+    assert dual_attestation.verify(account.compliance_key.public_key(), requests, signatures) == [True] * 5
+
+
+def test_sign_and_verify_with_executor():
+    account = LocalAccount.generate()
+    requests = gen_requests(10)
+    with ThreadPoolExecutor(4) as executor:
+        results = dual_attestation.sign(account.compliance_key, requests, executor=executor, chunk_size=3)
+        signatures = [signature for _, signature in results]
+        assert results == dual_attestation.sign(account.compliance_key, requests)
+        public_key = account.compliance_key.public_key()
+        assert dual_attestation.verify(public_key, requests, signatures, executor=executor, chunk_size=3) == [True] * 10
+        assert dual_attestation.sign(account.compliance_key, [], executor=executor) == []
+
+
+def test_sign_and_verify_with_default_worker_pool():
+    account = LocalAccount.generate()
+    requests = gen_requests(10)
+    results = dual_attestation.sign(account.compliance_key, requests, chunk_size=3)
+    assert results == dual_attestation.sign(account.compliance_key, requests)
+    assert dual_attestation._executor is not None
+
+    signatures = [signature for _, signature in results]
+    public_key = account.compliance_key.public_key()
+    assert dual_attestation.verify(public_key, requests, signatures, chunk_size=3) == [True] * 10
+
+
+def test_sign_with_process_pool():
+    account = LocalAccount.generate()
+    requests = gen_requests(4)
+    with ProcessPoolExecutor(2) as executor:
+        results = dual_attestation.sign(account.compliance_key, requests, executor=executor, chunk_size=2)
+    assert results == dual_attestation.sign(account.compliance_key, requests)
+
+
+def test_verify_invalid_signatures():
+    account = LocalAccount.generate()
+    requests = gen_requests(3)
+    signatures = [signature for _, signature in dual_attestation.sign(account.compliance_key, requests)]
+
+    tampered = list(requests)
+    tampered[1] = (tampered[1][0], tampered[1][1], tampered[1][2] + 1)
+    assert dual_attestation.verify(account.compliance_key.public_key(), tampered, signatures) == [True, False, True]
+
+    other = LocalAccount.generate().compliance_key.public_key()
+    assert dual_attestation.verify(other, requests, signatures) == [False] * 3
+
+    with pytest.raises(ValueError):
+        dual_attestation.verify(other, requests, signatures[:2])
+
+
+def gen_vasp_accounts(ledger: Ledger) -> typing.Tuple[LocalAccount, LocalAccount]:
+    parent, child = LocalAccount.generate(), LocalAccount.generate()
+    ledger.add_account(
+        {
+            "address": parent.account_address.to_hex(),
+            "sequence_number": 0,
+            "role": {
+                "type": jsonrpc.ACCOUNT_ROLE_PARENT_VASP,
+                "base_url": "http://parent",
+                "compliance_key": parent.compliance_public_key_bytes.hex(),
+                "compliance_key_rotation_events_key": "0000000000000000" + parent.account_address.to_hex(),
+                "base_url_rotation_events_key": "0100000000000000" + parent.account_address.to_hex(),
+            },
+        }
+    )
+    ledger.add_account(
+        {
+            "address": child.account_address.to_hex(),
+            "sequence_number": 0,
+            "role": {"type": jsonrpc.ACCOUNT_ROLE_CHILD_VASP, "parent_vasp_address": parent.account_address.to_hex()},
+        }
+    )
+    return (parent, child)
+
+
+def gen_rotation_event(key: str, seq: int = 0, version: int = 100, **data: typing.Any) -> jsonrpc.Event:
+    return jsonrpc.Event(key=key, sequence_number=seq, transaction_version=version, data=jsonrpc.EventData(**data))
+
+
+def test_compliance_key_cache():
+    ledger = Ledger(versions_per_sec=0)
+    parent, child = gen_vasp_accounts(ledger)
+    with MockServer(ledger) as server:
+        cache = dual_attestation.ComplianceKeyCache(jsonrpc.Client(server.url))
+
+        requests = gen_requests(4)
+        signatures = [signature for _, signature in dual_attestation.sign(parent.compliance_key, requests)]
+        assert cache.verify(child.account_address, requests, signatures) == [True] * 4
+        assert cache.verify(parent.account_address.to_hex(), requests, signatures) == [True] * 4
+        assert cache.verify(child.account_address.to_hex(), requests, signatures) == [True] * 4
+        assert server.num_requests["get_account"] == 2
+
+        base_url, key = cache.get(child.account_address)
+        assert base_url == "http://parent"
+        assert utils.public_key_bytes(key) == parent.compliance_public_key_bytes
+
+        cache.invalidate(child.account_address)
+        cache.get(child.account_address)
+        assert server.num_requests["get_account"] == 3
+
+        cache.invalidate()
+        cache.get(parent.account_address)
+        assert server.num_requests["get_account"] == 4
+
+        with pytest.raises(jsonrpc.AccountNotFoundError):
+            cache.get(LocalAccount.generate().account_address)
+
+
+def test_compliance_key_cache_observes_rotation_events():
+    ledger = Ledger(versions_per_sec=0)
+    parent, child = gen_vasp_accounts(ledger)
+    with MockServer(ledger) as server:
+        cache = dual_attestation.ComplianceKeyCache(jsonrpc.Client(server.url))
+        cache.get(child.account_address)
+        (compliance_events_key, start), (base_url_events_key, _) = cache.rotation_events_keys()
+        assert start == 0
+
+        new_key = LocalAccount.generate()
+        events = [
+            gen_rotation_event(
+                compliance_events_key,
+                type=jsonrpc.EVENT_DATA_COMPLIANCE_KEY_ROTATION,
+                new_compliance_public_key=new_key.compliance_public_key_bytes.hex(),
+            ),
+            gen_rotation_event(
+                base_url_events_key, type=jsonrpc.EVENT_DATA_BASE_URL_ROTATION, new_base_url="http://rotated"
+            ),
+            gen_rotation_event(
+                "0000000000000000" + LocalAccount.generate().account_address.to_hex(),
+                type=jsonrpc.EVENT_DATA_BASE_URL_ROTATION,
+                new_base_url="http://unknown",
+            ),
+            gen_rotation_event(base_url_events_key, 1, type=jsonrpc.EVENT_DATA_RECEIVED_PAYMENT),
+        ]
+        assert cache.observe(events) == 2
+        assert cache.rotation_events_keys() == [(compliance_events_key, 1), (base_url_events_key, 1)]
+
+        requests = gen_requests(2)
+        signatures = [signature for _, signature in dual_attestation.sign(new_key.compliance_key, requests)]
+        assert cache.verify(child.account_address, requests, signatures) == [True] * 2
+        base_url, _ = cache.get(parent.account_address)
+        assert base_url == "http://rotated"
+        assert server.num_requests["get_account"] == 2
+
+
+def test_compliance_key_cache_ignores_old_rotation_events():
+    ledger = Ledger(versions_per_sec=0)
+    parent, child = gen_vasp_accounts(ledger)
+    ledger.advance(10)
+    with MockServer(ledger) as server:
+        cache = dual_attestation.ComplianceKeyCache(jsonrpc.Client(server.url))
+        cache.get(child.account_address)
+        [(compliance_events_key, _), (base_url_events_key, _)] = cache.rotation_events_keys()
+
+        def rotate(seq: int, version: int, base_url: str) -> jsonrpc.Event:
+            data = {"type": jsonrpc.EVENT_DATA_BASE_URL_ROTATION, "new_base_url": base_url}
+            return gen_rotation_event(base_url_events_key, seq, version, **data)
+
+        # rotations until the last known ledger version before fetching the parent account (11, the
+        # version the child account is fetched at) are included in the account
+        assert cache.observe([rotate(0, 11, "http://old"), rotate(1, 12, "http://v1")]) == 1
+        assert cache.get(parent.account_address)[0] == "http://v1"
+        assert cache.rotation_events_keys() == [(compliance_events_key, 0), (base_url_events_key, 2)]
+
+        # observed already
+        assert cache.observe([rotate(0, 11, "http://old"), rotate(1, 12, "http://old")]) == 0
+        assert cache.observe([rotate(2, 13, "http://v2")]) == 1
+        assert cache.get(parent.account_address)[0] == "http://v2"
+
+        cache.invalidate(child.account_address)
+        assert cache.rotation_events_keys() == []
+
+
+def test_compliance_key_cache_keeps_entry_updated_during_fetch():
+    ledger = Ledger(versions_per_sec=0)
+    parent, _ = gen_vasp_accounts(ledger)
+    with MockServer(ledger) as server:
+        client = jsonrpc.Client(server.url)
+        cache = dual_attestation.ComplianceKeyCache(client)
+        cached = cache.get(parent.account_address)
+
+        class RacingClient:
+            """fetches the account, then another thread caches a newer entry before the fetch returns"""
+
+            def __init__(self) -> None:
+                self.get_last_known_state = client.get_last_known_state
+
+            def must_get_account(self, address: str) -> jsonrpc.Account:
+                account = client.must_get_account(address)
+                racing._keys[address] = ("http://newer", cached[1])
+                return account
+
+        racing = dual_attestation.ComplianceKeyCache(RacingClient())  # pyre-ignore
+        assert racing.get(parent.account_address)[0] == "http://newer"
+
+
+def test_compliance_key_cache_applies_rotation_events_after_fetched_version():
+    ledger = Ledger(versions_per_sec=0)
+    parent, _ = gen_vasp_accounts(ledger)
+    ledger.advance(10)
+    with MockServer(ledger) as server:
+        client = jsonrpc.Client(server.url)
+        client.get_metadata()
+
+        class AdvancingClient:
+            """fetches the account at version 11, then another request advances the last known state"""
+
+            def __init__(self) -> None:
+                self.get_last_known_state = client.get_last_known_state
+
+            def must_get_account(self, address: str) -> jsonrpc.Account:
+                account = client.must_get_account(address)
+                ledger.advance(5)
+                client.get_metadata()
+                return account
+
+        cache = dual_attestation.ComplianceKeyCache(AdvancingClient())  # pyre-ignore
+        cache.get(parent.account_address)
+        assert client.get_last_known_state().version == 16
+        [_, (base_url_events_key, _)] = cache.rotation_events_keys()
+
+        # the rotation after the fetched version is applied, though it is before the last known version
+        data = {"type": jsonrpc.EVENT_DATA_BASE_URL_ROTATION, "new_base_url": "http://v1"}
+        assert cache.observe([gen_rotation_event(base_url_events_key, 0, 13, **data)]) == 1
+        assert cache.get(parent.account_address)[0] == "http://v1"
@@ -0,0 +1,50 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import hashtable
+import pytest, random
+
+MAGIC: int = int.from_bytes(b"TESTTBL1", "little")
+
+
+def test_insert_find_and_grow():
+    table = hashtable.Uint64HashTable(MAGIC, 2, 3, "test table", capacity=1)
+    rng = random.Random(0)
+    items = {(rng.getrandbits(64), rng.getrandbits(64)): (i, 2 ** 64 - 1, i * 2) for i in range(1000)}
+    for key, value in items.items():
+        assert table.insert(key, value) is None
+    assert len(table) == len(items)
+    assert table.capacity >= len(items)
+    assert all(table.find(key) == value for key, value in items.items())
+    assert table.find((1, 2)) is None
+    assert dict(table.items()) == items
+
+    key = next(iter(items))
+    assert table.insert(key, (1, 2, 3), replace=False) == items[key]
+    assert table.find(key) == items[key]
+    assert table.insert(key, (1, 2, 3)) == items[key]
+    assert table.find(key) == (1, 2, 3)
+    assert len(table) == len(items)
+
+    assert table.insert((0, 1), (1, 1, 1)) is None
+    assert table.find((0, 1)) == (1, 1, 1)
+    with pytest.raises(ValueError, match="zero key"):
+        table.insert((0, 0), (1, 1, 1))
+
+
+def test_save_load_and_invalid_file(tmp_path):
+    path = str(tmp_path / "table.bin")
+    table = hashtable.Uint64HashTable(MAGIC, 1, 1, "test table", capacity=2, path=path)
+    for i in range(1, 100):
+        table.insert((i,), (i * 10,))
+    table.flush()
+
+    loaded = hashtable.Uint64HashTable(MAGIC, 1, 1, "test table")
+    loaded.load(path)
+    assert len(loaded) == 99
+    assert loaded.find((42,)) == (420,)
+
+    with pytest.raises(ValueError, match="invalid test table file"):
+        hashtable.Uint64HashTable(MAGIC + 1, 1, 1, "test table", path=path)
+    with pytest.raises(ValueError, match="invalid test table file"):
+        hashtable.Uint64HashTable(MAGIC, 1, 2, "test table", path=path)
@@ -1,7 +1,7 @@
 # Copyright (c) The Diem Core Contributors
 # SPDX-License-Identifier: Apache-2.0
 
-import pytest
+import numpy as np, pytest
 from diem import identifier, utils, InvalidSubAddressError, InvalidAccountAddressError
 
 
@@ -117,6 +117,126 @@ def test_decode_addr_fail():
         identifier.decode_account(invalid_char_encoded_address, "lbr")
 
 
+def test_encode_decode_accounts():
+    accounts = [(test_onchain_address, test_sub_address), (test_onchain_address, None)]
+    accounts += [
+        (utils.account_address(identifier.gen_subaddress() * 2), identifier.gen_subaddress()) for _ in range(10)
+    ]
+    onchain_addrs = [addr for addr, _ in accounts]
+    subaddrs = [subaddr for _, subaddr in accounts]
+    expected = [identifier.encode_account(addr, subaddr, "lbr") for addr, subaddr in accounts]
+    assert expected[:2] == [enocded_addr_with_subaddr, enocded_addr_with_none_subaddr]
+
+    encoded = identifier.encode_accounts(onchain_addrs, subaddrs, "lbr")
+    assert encoded == expected
+
+    addresses, subaddresses = identifier.decode_accounts(encoded, "lbr")
+    assert addresses.shape == (len(accounts), 16)
+    assert subaddresses.shape == (len(accounts), 8)
+    for i, encoded_addr in enumerate(encoded):
+        addr, subaddr = identifier.decode_account(encoded_addr, "lbr")
+        assert addresses[i].tobytes() == addr.to_bytes()
+        assert subaddresses[i].tobytes() == (subaddr or bytes(8))
+
+    # numpy arrays input
+    assert identifier.encode_accounts(addresses, subaddresses, "lbr") == expected
+    assert identifier.encode_accounts(addresses, None, "abc") == [
+        identifier.encode_account(addr, None, "abc") for addr in onchain_addrs
+    ]
+
+    # upper case
+    addresses, _ = identifier.decode_accounts([enocded_addr_with_subaddr.upper()], "lbr")
+    assert addresses[0].tobytes().hex() == test_onchain_address
+
+    assert identifier.encode_accounts([], None, "lbr") == []
+    assert identifier.decode_accounts([], "lbr")[0].shape == (0, 16)
+
+
+def test_encode_accounts_fail():
+    with pytest.raises(InvalidSubAddressError):
+        identifier.encode_accounts([test_onchain_address], [test_sub_address[:-2]], "lbr")
+
+    with pytest.raises(InvalidAccountAddressError):
+        identifier.encode_accounts([test_onchain_address + "ff"], None, "lbr")
+
+    with pytest.raises(ValueError):
+        identifier.encode_accounts(np.zeros((2, 15), dtype=np.uint8), None, "lbr")
+
+    with pytest.raises(ValueError):
+        identifier.encode_accounts(np.zeros((2, 16), dtype=np.uint8), np.zeros((1, 8), dtype=np.uint8), "lbr")
+
+
+def test_decode_accounts_fail():
+    invalid_addresses = [
+        "btc1p7ujcndcl7nudzwt8fglhx6wxn08kgs5tm6mz4usw5p72t",  # invalid hrp
+        "lbr1q7ujcndcl7nudzwt8fglhx6wxn08kgs5tm6mz4usw5p72t",  # invalid version
+        "lbr1p7ujcndcl7nudzwt8fglhx6wxn08kgs5tm6mz4usw5p72p",  # invalid checksum
+        "LbR1p7ujcndcl7nudzwt8fglhx6wxn08kgs5tm6mz4usw5P72T",  # mixed case
+        "lbr1p7ujcndcl7nudzwt8fglhx6wxnvqqqqqqqqqqqqelu3xv",  # short payload
+        "lbr2p7ujcndcl7nudzwt8fglhx6wxn08kgs5tm6mz4usw5p72t",  # invalid separator
+        "lbr1pbujcndcl7nudzwt8fglhx6wxn08kgs5tm6mz4usw5p72t",  # invalid char
+        "lbr1p7ujcndcl7nudzwt8fglhx6wxn08kgs5tm6mz4usw5p72é",  # non-ascii char
+    ]
+    for invalid in invalid_addresses:
+        with pytest.raises(ValueError) as single_error:
+            identifier.decode_account(invalid, "lbr")
+        with pytest.raises(ValueError, match="index: 1") as batch_error:
+            identifier.decode_accounts([enocded_addr_with_subaddr, invalid], "lbr")
+        assert str(single_error.value).split("got error: ")[1] in str(batch_error.value)
+
+    with pytest.raises(ValueError):
+        identifier.decode_accounts([enocded_addr_with_subaddr], "tlb")
+
+
+def test_account_cache():
+    identifier.set_account_cache_size(2)
+    try:
+        assert identifier.encode_account(test_onchain_address, test_sub_address, "lbr") == enocded_addr_with_subaddr
+        assert identifier.encode_account(test_onchain_address, test_sub_address, "lbr") == enocded_addr_with_subaddr
+        # same key: hex-encoded and bytes address / sub-address, none and zero sub-address
+        identifier.encode_account(
+            utils.account_address(test_onchain_address), utils.sub_address(test_sub_address), "lbr"
+        )
+        identifier.encode_account(test_onchain_address, None, "lbr")
+        identifier.encode_account(test_onchain_address, zero_sub_address, "lbr")
+        identifier.encode_account(test_onchain_address, None, "tlb")
+        info = identifier.account_cache_info()["encode_account"]
+        assert (info.hits, info.misses, info.evictions, info.maxsize, info.currsize) == (3, 3, 1, 2, 2)
+
+        addr, subaddr = identifier.decode_account(enocded_addr_with_subaddr, "lbr")
+        assert identifier.decode_account(enocded_addr_with_subaddr, "lbr") == (addr, subaddr)
+        assert identifier.account_cache_info()["decode_account"].hits == 1
+
+        # errors are not cached
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                identifier.decode_account(enocded_addr_with_subaddr, "tlb")
+        info = identifier.account_cache_info()["decode_account"]
+        assert (info.hits, info.misses, info.evictions, info.currsize) == (1, 3, 0, 1)
+
+        identifier.set_account_cache_size(0)
+        assert identifier.account_cache_info() == {}
+        assert identifier.encode_account(test_onchain_address, test_sub_address, "lbr") == enocded_addr_with_subaddr
+        assert identifier.decode_account(enocded_addr_with_subaddr, "lbr") == (addr, subaddr)
+
+        with pytest.raises(ValueError):
+            identifier.set_account_cache_size(-1)
+    finally:
+        identifier.set_account_cache_size()
+
+
+def test_account_cache_does_not_count_failures_as_evictions():
+    identifier.set_account_cache_size(2)
+    try:
+        for encoded in ["invalid", enocded_addr_with_subaddr[:-1], enocded_addr_with_subaddr + "q"]:
+            with pytest.raises(ValueError):
+                identifier.decode_account(encoded, "lbr")
+        info = identifier.account_cache_info()["decode_account"]
+        assert (info.misses, info.evictions, info.currsize) == (3, 0, 0)
+    finally:
+        identifier.set_account_cache_size()
+
+
 def test_intent_identifier():
     account_id = identifier.encode_account(test_onchain_address, None, "lbr")
     intent_id = identifier.encode_intent(account_id, "Coin1", 123)
@@ -131,6 +251,11 @@ def test_intent_identifier():
 
     assert account_id == intent.account_id
 
+    # account id is cached, and decoded intent account id is lower case
+    assert intent.account_id is intent.account_id
+    upper_case_intent_id = identifier.encode_intent(account_id.upper(), "Coin1", 1)
+    assert identifier.decode_intent(upper_case_intent_id, "lbr").account_id == account_id
+
 
 def test_intent_identifier_with_sub_address():
     account_id = identifier.encode_account(test_onchain_address, test_sub_address, "lbr")
@@ -172,3 +297,39 @@ def test_intent_identifier_decode_errors():
     # hrp not match
     with pytest.raises(identifier.InvalidIntentIdentifierError):
         identifier.decode_intent("diem://%s?am=2&c=Coin1" % (enocded_addr_with_none_subaddr), "tlb")
+
+
+def test_decode_intent_fast_path_same_with_url_parser():
+    account_id = identifier.encode_account(test_onchain_address, test_sub_address, "lbr")
+    intent_ids = [
+        identifier.encode_intent(account_id, "Coin1", 123),
+        "diem://%s?am=123&c=Coin1" % account_id,
+        "diem://%s?c=Coin1&am=0123" % account_id.upper(),
+        # not in encode_intent format, decoded by url parser
+        "diem://%s?c=Coin1&am=123&x=y" % account_id,
+        "diem://%s?c=Co%%69n1&am=%%2B123#fragment" % account_id,
+        "DIEM://%s/path?c=Coin1&am=123" % account_id,
+    ]
+    for intent_id in intent_ids:
+        intent = identifier.decode_intent(intent_id, "lbr")
+        expected = identifier._decode_intent_url(intent_id, "lbr")
+        assert intent.account_address == expected.account_address
+        assert intent.sub_address == expected.sub_address == bytes.fromhex(test_sub_address)
+        assert intent.currency_code == expected.currency_code == "Coin1"
+        assert intent.amount == expected.amount == 123
+        assert intent.account_id == expected.account_id == account_id
+
+
+def test_decode_intents():
+    valid = identifier.encode_intent(enocded_addr_with_none_subaddr, "Coin1", 123)
+    invalid = "diem://%s?c=Coin1&am=str" % enocded_addr_with_none_subaddr
+    intents = identifier.decode_intents([valid, invalid, valid.replace("lbr", "tlb")], "lbr")
+    assert len(intents) == 3
+    assert isinstance(intents[0], identifier.Intent)
+    assert intents[0].amount == 123
+    assert isinstance(intents[1], identifier.InvalidIntentIdentifierError)
+    assert "Can't decode amount" in str(intents[1])
+    assert isinstance(intents[2], identifier.InvalidIntentIdentifierError)
+    assert "decode account identifier failed" in str(intents[2])
+
+    assert identifier.decode_intents([], "lbr") == []
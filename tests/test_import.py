@@ -0,0 +1,89 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+import diem, json, os, pkgutil, subprocess, sys, typing
+
+
+# import time budget in seconds, measured in a new interpreter and generous for slow CI machines;
+# `import diem` takes milliseconds, eagerly importing the submodules takes more than 0.3 seconds
+IMPORT_DIEM_BUDGET_SECS: float = 0.25
+
+HEAVY_MODULES = ["diem.stdlib", "diem.jsonrpc", "diem.jsonrpc.jsonrpc_pb2", "google.protobuf", "requests"]
+
+
+def test_import_diem_is_lazy():
+    modules = run_import("import diem")
+    assert [m for m in modules if m.split(".")[0] == "diem"] == ["diem"]
+    assert "numpy" not in modules
+
+
+def test_import_diem_time_budget():
+    code = "import time; start = time.perf_counter(); import diem; print(time.perf_counter() - start)"
+    secs = float(subprocess.check_output([sys.executable, "-c", code], env=import_env()))
+    assert secs < IMPORT_DIEM_BUDGET_SECS
+
+
+def test_import_utils_does_not_load_stdlib_and_jsonrpc():
+    modules = run_import("from diem import utils, LocalAccount, identifier, txnmetadata")
+    assert not set(HEAVY_MODULES) & set(modules)
+
+
+def test_import_jsonrpc_constants_does_not_load_protobuf():
+    modules = run_import("from diem.jsonrpc import constants")
+    assert "google.protobuf" not in modules
+    assert "requests" not in modules
+
+
+def test_import_star():
+    assert sorted(diem.__all__) == sorted(diem._EXPORTS)
+    modules = run_import("from diem import *")
+    assert "diem.stdlib" not in modules
+    assert "diem.jsonrpc" not in modules
+
+
+def test_submodules_match_package_contents():
+    for package in [diem, diem.jsonrpc]:
+        assert package._SUBMODULES == {m.name for m in pkgutil.iter_modules(package.__path__)}  # pyre-ignore
+
+
+def test_lazy_attributes():
+    modules = run_import("import diem; diem.LocalAccount; diem.jsonrpc.Client; diem.stdlib")
+    assert set(HEAVY_MODULES) <= set(modules)
+
+    assert diem.LocalAccount is diem.local_account.LocalAccount
+    assert diem.AuthKey is diem.auth_key.AuthKey
+    assert diem.jsonrpc.Client is diem.jsonrpc.client.Client
+    assert diem.jsonrpc.Transaction is diem.jsonrpc.jsonrpc_pb2.Transaction
+    assert "LocalAccount" in dir(diem)
+    assert "Client" in dir(diem.jsonrpc)
+    assert diem.jsonrpc.rate_limit is sys.modules["diem.jsonrpc.rate_limit"]
+    assert "rate_limit" in dir(diem.jsonrpc)
+
+
+def test_unknown_attribute():
+    for module in [diem, diem.jsonrpc]:
+        try:
+            module.unknown
+        except AttributeError as e:
+            assert "unknown" in str(e)
+        else:
+            raise AssertionError("expected AttributeError")
+
+
+def run_import(statement: str) -> typing.List[str]:
+    """runs the import statement in a new interpreter, returns names of the imported modules"""
+
+    code = f"""
+import json, sys
+{statement}
+print(json.dumps(list(sys.modules)))
+"""
+    output = subprocess.check_output([sys.executable, "-c", code], env=import_env())
+    return json.loads(output)
+
+
+def import_env() -> typing.Dict[str, str]:
+    """returns environment variables of the new interpreter, which imports diem from the tested source"""
+
+    src = os.path.dirname(os.path.dirname(os.path.abspath(diem.__file__)))
+    return dict(os.environ, PYTHONPATH=os.pathsep.join([src, os.environ.get("PYTHONPATH", "")]))
@@ -0,0 +1,74 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import keygen, stdlib, utils, AuthKey
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pytest
+
+
+def test_generate():
+    keys = keygen.generate(5, chunk_size=2)
+    assert len(keys) == 5
+    assert keys.private_keys.shape == (5, 32)
+    assert keys.auth_key_prefixes.shape == (5, 16)
+    assert keys.account_addresses.shape == (5, 16)
+    assert len(set(keys.private_keys[i].tobytes() for i in range(5))) == 5
+
+    for i in range(5):
+        account = keys.account(i)
+        assert account.public_key_bytes == keys.public_keys[i].tobytes()
+        assert account.auth_key.data == keys.auth_keys[i].tobytes()
+        assert account.account_address == keys.account_address(i)
+        assert account.auth_key.prefix() == keys.auth_key_prefix(i)
+        assert AuthKey(keys.auth_keys[i].tobytes()).account_address() == account.account_address
+
+
+def test_generate_with_process_pool():
+    with ProcessPoolExecutor(2) as executor:
+        keys = keygen.generate(7, executor=executor, chunk_size=3)
+    assert len(keys) == 7
+    assert keys.account(6).account_address == keys.account_address(6)
+
+
+def test_derive():
+    seed = b"seed" * 8
+    keys = keygen.derive(seed, 10, chunk_size=3)
+    assert np.array_equal(keys.private_keys, keygen.derive(seed, 10).private_keys)
+    assert np.array_equal(keys.auth_keys[4:], keygen.derive(seed, 6, start=4).auth_keys)
+    assert keys.account(3).account_address == keygen.derive(seed, 1, start=3).account_address(0)
+
+    assert not np.array_equal(keys.private_keys, keygen.derive(b"other", 10).private_keys)
+    assert not np.array_equal(keys.private_keys, keygen.derive(seed, 10, salt=b"salt").private_keys)
+
+    with ProcessPoolExecutor(2) as executor:
+        assert np.array_equal(keys.auth_keys, keygen.derive(seed, 10, executor=executor, chunk_size=4).auth_keys)
+
+
+def test_hkdf():
+    # RFC 5869 structure: PRK = HMAC(salt, IKM), OKM = HMAC(PRK, info | 0x01) for one block
+    prk = keygen.hkdf_extract(b"salt", b"seed")
+    assert len(prk) == 32
+    assert keygen.hkdf_expand(prk, b"info") != keygen.hkdf_expand(prk, b"info2")
+
+
+def test_empty_and_invalid():
+    assert len(keygen.generate(0)) == 0
+    assert keygen.generate(0).create_child_vasp_account_scripts("Coin1", 1) == []
+    with pytest.raises(ValueError):
+        keygen.generate(-1)
+
+
+def test_create_child_vasp_account_scripts():
+    keys = keygen.generate(3)
+    scripts = keys.create_child_vasp_account_scripts("Coin1", child_initial_balance=100)
+    assert len(scripts) == 3
+    for i, script in enumerate(scripts):
+        account = keys.account(i)
+        assert script == stdlib.encode_create_child_vasp_account_script(
+            coin_type=utils.currency_code("Coin1"),
+            child_address=account.account_address,
+            auth_key_prefix=account.auth_key.prefix(),
+            add_all_currencies=False,
+            child_initial_balance=100,
+        )
@@ -0,0 +1,45 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import utils, LocalAccount
+from .helpers import gen_raw_transaction
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+import pytest
+
+
+def test_derived_values_are_cached():
+    account = LocalAccount.generate()
+    assert account.public_key is account.public_key
+    assert account.public_key_bytes is account.public_key_bytes
+    assert account.auth_key is account.auth_key
+    assert account.account_address is account.account_address
+    assert account.account_address == account.auth_key.account_address()
+    assert account.public_key_bytes == utils.public_key_bytes(account.private_key.public_key())
+
+    with pytest.raises(AttributeError):
+        account.unknown = 1
+
+    # changing private key resets derived values
+    address = account.account_address
+    account.private_key = Ed25519PrivateKey.generate()
+    assert account.account_address != address
+    assert account.public_key_bytes == utils.public_key_bytes(account.private_key.public_key())
+
+
+def test_sign_many():
+    account = LocalAccount.generate()
+    txns = [gen_raw_transaction(account, seq) for seq in range(5)]
+
+    signed_txns = account.sign_many(txns)
+    assert signed_txns == [account.sign(txn) for txn in txns]
+    assert account.sign_many([]) == []
+
+
+def test_sign_many_with_process_pool():
+    account = LocalAccount.generate()
+    txns = [gen_raw_transaction(account, seq) for seq in range(5)]
+
+    with ProcessPoolExecutor(2) as executor:
+        signed_txns = account.sign_many(txns, executor=executor, chunk_size=2)
+    assert signed_txns == [account.sign(txn) for txn in txns]
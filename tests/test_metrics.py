@@ -0,0 +1,73 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import jsonrpc
+
+
+def test_counter():
+    registry = jsonrpc.MetricsRegistry()
+    counter = registry.counter("requests_total", "requests")
+    assert registry.counter("requests_total") is counter
+
+    counter.inc(method="get_account")
+    counter.inc(2, method="get_account")
+    counter.inc(method="submit")
+    assert counter.value(method="get_account") == 3
+    assert counter.value(method="submit") == 1
+    assert counter.value(method="unknown") == 0
+
+
+def test_gauge():
+    registry = jsonrpc.MetricsRegistry()
+    gauge = registry.gauge("queue_depth", "queue depth")
+    assert registry.gauge("queue_depth") is gauge
+
+    gauge.set(3, url="a")
+    gauge.set(1, url="a")
+    assert gauge.value(url="a") == 1
+    assert gauge.value(url="b") == 0
+    assert registry.expose() == '# HELP queue_depth queue depth\n# TYPE queue_depth gauge\nqueue_depth{url="a"} 1\n'
+
+
+def test_expose():
+    registry = jsonrpc.MetricsRegistry()
+    registry.counter("requests_total", "requests").inc(url='http://"a"')
+    registry.histogram("duration_seconds", "duration", buckets=[0.1, 1]).observe(0.5, method="submit")
+
+    assert registry.expose() == "\n".join(
+        [
+            "# HELP requests_total requests",
+            "# TYPE requests_total counter",
+            'requests_total{url="http://\\"a\\""} 1',
+            "# HELP duration_seconds duration",
+            "# TYPE duration_seconds histogram",
+            'duration_seconds_bucket{method="submit",le="0.1"} 0',
+            'duration_seconds_bucket{method="submit",le="1"} 1',
+            'duration_seconds_bucket{method="submit",le="+Inf"} 1',
+            'duration_seconds_sum{method="submit"} 0.5',
+            'duration_seconds_count{method="submit"} 1',
+            "",
+        ]
+    )
+
+
+def test_metrics_observer():
+    observer = jsonrpc.MetricsObserver()
+    observer.on_call("get_account", 0.2, None)
+    observer.on_call("get_account", 0.3, jsonrpc.NetworkError())
+    observer.on_retry("get_account", 1)
+    observer.on_http_request("url", "get_account", 0.1, 100, 200, None)
+    observer.on_result_parsed("get_account", 0.01)
+    observer.on_stale_response_ignored("url", "submit")
+    observer.on_endpoint_selected("url", "get_account")
+
+    registry = observer.registry
+    assert registry.get("diem_jsonrpc_calls_total").value(method="get_account", result="success") == 1
+    assert registry.get("diem_jsonrpc_calls_total").value(method="get_account", result="error") == 1
+    assert registry.get("diem_jsonrpc_call_duration_seconds").labels(method="get_account").count == 2
+    assert registry.get("diem_jsonrpc_retries_total").value(method="get_account") == 1
+    assert registry.get("diem_jsonrpc_request_bytes_total").value(method="get_account") == 100
+    assert registry.get("diem_jsonrpc_response_bytes_total").value(method="get_account") == 200
+    assert registry.get("diem_jsonrpc_parse_duration_seconds").labels(method="get_account").count == 1
+    assert registry.get("diem_jsonrpc_stale_responses_ignored_total").value(url="url", method="submit") == 1
+    assert registry.get("diem_jsonrpc_endpoint_selected_total").value(url="url") == 1
@@ -0,0 +1,189 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import jsonrpc, chain_ids, txnbuilder, diem_types, LocalAccount
+from diem.testing import MockServer, Ledger
+from concurrent.futures import ThreadPoolExecutor
+import json, os, pytest, requests, time
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "benchmarks", "fixtures", "get_transactions.json")
+
+
+def gen_signed_txn(account: LocalAccount, seq: int, expiration_secs: int = 30) -> diem_types.SignedTransaction:
+    template = txnbuilder.TransactionTemplate(
+        account.account_address, chain_ids.TESTING, "Coin1", expiration_secs=expiration_secs
+    )
+    builder = txnbuilder.TransactionBuilder(template)
+    raw_txn = builder.peer_to_peer_with_metadata(seq, LocalAccount.generate().account_address, 100)
+    return diem_types.SignedTransaction.lcs_deserialize(builder.sign(account, raw_txn))
+
+
+def test_ledger_version_progression():
+    with MockServer(Ledger(version=10, versions_per_sec=0)) as server:
+        client = jsonrpc.Client(server.url)
+        metadata = client.get_metadata()
+        assert metadata.version == 10
+        assert metadata.chain_id == chain_ids.TESTING.to_int()
+
+        server.ledger.advance(5)
+        assert client.get_metadata().version == 15
+        assert client.get_last_known_state().version == 15
+        assert server.num_requests["get_metadata"] == 2
+
+    with MockServer(Ledger(version=10, versions_per_sec=1000)) as server:
+        client = jsonrpc.Client(server.url)
+        first = client.get_metadata().version
+        time.sleep(0.01)
+        assert client.get_metadata().version > first
+
+
+def test_submit_and_wait_for_transaction():
+    with MockServer(Ledger(versions_per_sec=100)) as server:
+        client = jsonrpc.Client(server.url)
+        account = LocalAccount.generate()
+        assert client.get_account(account.account_address) is None
+
+        txn = gen_signed_txn(account, 0)
+        client.submit(txn)
+        executed = client.wait_for_transaction(txn, timeout_secs=5)
+        assert executed.vm_status.type == jsonrpc.VM_STATUS_EXECUTED
+        assert executed.transaction.sequence_number == 0
+        assert client.get_account_sequence(account.account_address) == 1
+        assert client.get_transactions(executed.version, 1)[0].hash == executed.hash
+        assert client.get_account_transactions(account.account_address, 0, 10)[0].hash == executed.hash
+
+        # sequence number too old
+        with pytest.raises(jsonrpc.JsonRpcError, match="SEQUENCE_NUMBER_TOO_OLD"):
+            client.submit(gen_signed_txn(account, 0), raise_stale_response=True)
+
+
+def test_transaction_waits_for_previous_sequence_number():
+    ledger = Ledger(versions_per_sec=0)
+    with MockServer(ledger) as server:
+        client = jsonrpc.Client(server.url)
+        account = LocalAccount.generate()
+        client.submit(gen_signed_txn(account, 1))
+        ledger.advance(2)
+        assert client.get_account_sequence(account.account_address) == 0
+
+        client.submit(gen_signed_txn(account, 0))
+        ledger.advance(2)
+        assert client.get_account_sequence(account.account_address) == 2
+
+
+def test_concurrent_submit_and_wait():
+    accounts = [LocalAccount.generate() for _ in range(10)]
+    with MockServer(Ledger(versions_per_sec=200), latency_secs=0.005, latency_jitter_secs=0.005) as server:
+        client = jsonrpc.Client(server.url)
+
+        def submit_and_wait(account: LocalAccount) -> jsonrpc.Transaction:
+            txn = gen_signed_txn(account, 0)
+            client.submit(txn)
+            return client.wait_for_transaction(txn, timeout_secs=5)
+
+        with ThreadPoolExecutor(10) as executor:
+            txns = list(executor.map(submit_and_wait, accounts))
+        assert len(set(txn.version for txn in txns)) == len(accounts)
+
+
+def test_wait_for_expired_transaction():
+    ledger = Ledger(versions_per_sec=0)
+    with MockServer(ledger) as server:
+        client = jsonrpc.Client(server.url)
+        txn = gen_signed_txn(LocalAccount.generate(), 0, expiration_secs=1)
+        client.submit(txn)
+        with pytest.raises(jsonrpc.TransactionExpired):
+            # the transaction is never executed because ledger version is not advanced
+            client.wait_for_transaction(txn, timeout_secs=5)
+
+
+def test_serve_recorded_transactions():
+    with open(FIXTURE) as f:
+        fixture = json.load(f)["result"]
+    ledger = Ledger(versions_per_sec=0)
+    ledger.add_transactions(fixture)
+    with MockServer(ledger) as server:
+        client = jsonrpc.Client(server.url)
+        assert client.get_metadata().version == fixture[-1]["version"]
+
+        txns = client.get_transactions(fixture[0]["version"], 100, True)
+        assert [txn.hash for txn in txns] == [txn["hash"] for txn in fixture]
+
+        event = txns[1].events[0]
+        assert client.get_events(event.key, event.sequence_number, 1) == [event]
+
+
+def test_latency_injection():
+    with MockServer(latency_secs=0.05) as server:
+        client = jsonrpc.Client(server.url)
+        start = time.time()
+        client.get_metadata()
+        assert time.time() - start >= 0.05
+
+
+def test_stale_response_injection():
+    with MockServer(Ledger(version=100, versions_per_sec=0)) as server:
+        client = jsonrpc.Client(server.url, retry=jsonrpc.Retry(2, 0.01, jsonrpc.StaleResponseError))
+        client.get_metadata()
+
+        server.stale_rate = 1
+        with pytest.raises(jsonrpc.StaleResponseError):
+            client.get_metadata()
+        assert server.num_requests["get_metadata"] == 3
+
+
+def test_stale_response_timestamp_is_ledger_timestamp_of_the_version():
+    now = [1000.0]
+    ledger = Ledger(version=100, versions_per_sec=0, clock=lambda: now[0])
+    for _ in range(3):
+        now[0] += 60
+        ledger.advance(5)
+
+    assert ledger.state() == (115, 1180_000_000)
+    assert ledger.state(5) == (110, 1120_000_000)
+    assert ledger.state(7) == (108, 1060_000_000)
+    assert ledger.state(1000) == (0, 1000_000_000)
+
+    with MockServer(ledger, stale_rate=1, stale_versions=10) as server:
+        response = requests.post(server.url, json={"jsonrpc": "2.0", "id": 1, "method": "get_currencies"}).json()
+        assert response["libra_ledger_version"] == 105
+        assert response["libra_ledger_timestampusec"] == 1060_000_000
+
+
+def test_error_injection():
+    with MockServer(error_rate=1) as server:
+        client = jsonrpc.Client(server.url)
+        with pytest.raises(jsonrpc.JsonRpcError, match="injected error"):
+            client.get_metadata()
+
+        server.error_http_status = 503
+        with pytest.raises(jsonrpc.NetworkError):
+            client.get_metadata()
+
+
+def test_request_with_backups_falls_back_to_healthy_server():
+    with MockServer(error_rate=1, error_http_status=500) as primary, MockServer() as backup:
+        executor = ThreadPoolExecutor(2)
+        rs = jsonrpc.RequestWithBackups(backups=[backup.url], executor=executor, fallback=True)
+        client = jsonrpc.Client(primary.url, rs=rs)
+        assert client.get_metadata() is not None
+        assert primary.num_requests["get_metadata"] == 1
+        assert backup.num_requests["get_metadata"] == 1
+        executor.shutdown()
+
+
+def test_handlers_and_unknown_method():
+    with MockServer(handlers={"get_currencies": lambda params: [{"code": "XUS", "scaling_factor": 1000000}]}) as server:
+        client = jsonrpc.Client(server.url)
+        assert client.get_currencies()[0].code == "XUS"
+
+        with pytest.raises(jsonrpc.JsonRpcError, match="Method not found"):
+            client.execute("unknown", [])
+
+
+def test_batch_request():
+    with MockServer(Ledger(version=5, versions_per_sec=0)) as server:
+        requests_body = [{"jsonrpc": "2.0", "id": i, "method": "get_metadata", "params": []} for i in range(3)]
+        responses = requests.post(server.url, json=requests_body).json()
+        assert [r["id"] for r in responses] == [0, 1, 2]
+        assert all(r["result"]["version"] == 5 for r in responses)
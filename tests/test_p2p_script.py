@@ -0,0 +1,58 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import p2p_script, stdlib, utils, LocalAccount
+import pytest
+
+
+def generic(currency, payee, amount, metadata=b"", metadata_signature=b"") -> bytes:
+    return stdlib.encode_peer_to_peer_with_metadata_script(
+        currency=utils.currency_code(currency),
+        payee=payee,
+        amount=amount,
+        metadata=metadata,
+        metadata_signature=metadata_signature,
+    ).lcs_serialize()
+
+
+@pytest.mark.parametrize("currency", ["Coin1", "XUS", "LBR"])
+@pytest.mark.parametrize("amount", [0, 1, 1_000_000, 2**64 - 1])
+@pytest.mark.parametrize("metadata", [b"", b"m", b"m" * 200])
+def test_encode_matches_generic_path(currency, amount, metadata):
+    payee = LocalAccount.generate().account_address
+    expected = generic(currency, payee, amount, metadata, b"s" * 64)
+    assert (
+        p2p_script.encode_peer_to_peer_with_metadata_script_bytes(currency, payee, amount, metadata, b"s" * 64)
+        == expected
+    )
+    assert (
+        p2p_script.encode_peer_to_peer_with_metadata_script_bytes(
+            currency, payee.to_bytes(), amount, metadata, b"s" * 64
+        )
+        == expected
+    )
+
+
+def test_encode_bulk_matches_generic_path():
+    payees = [LocalAccount.generate().account_address for _ in range(4)]
+    amounts = [1, 2, 3, 4]
+    metadatas = [b"", b"a", b"bb" * 100, b""]
+    signatures = [b"", b"s" * 64, b"", b"t" * 64]
+
+    ret = p2p_script.encode_peer_to_peer_with_metadata_scripts_bytes("Coin1", payees, amounts, metadatas, signatures)
+    assert ret == [generic("Coin1", *args) for args in zip(payees, amounts, metadatas, signatures)]
+
+    ret = p2p_script.encode_peer_to_peer_with_metadata_scripts_bytes("Coin1", [p.to_bytes() for p in payees], amounts)
+    assert ret == [generic("Coin1", p, a) for p, a in zip(payees, amounts)]
+
+
+def test_invalid_arguments():
+    payee = LocalAccount.generate().account_address
+    with pytest.raises(utils.InvalidAccountAddressError):
+        p2p_script.encode_peer_to_peer_with_metadata_script_bytes("Coin1", b"short", 1)
+    with pytest.raises(ValueError, match="amount"):
+        p2p_script.encode_peer_to_peer_with_metadata_script_bytes("Coin1", payee, -1)
+    with pytest.raises(ValueError):
+        p2p_script.encode_peer_to_peer_with_metadata_scripts_bytes("Coin1", [payee], [1, 2])
+    with pytest.raises(ValueError):
+        p2p_script.encode_peer_to_peer_with_metadata_scripts_bytes("Coin1", [payee], [1], metadatas=[])
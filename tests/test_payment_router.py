@@ -0,0 +1,85 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import identifier, payment_router, txnmetadata, LocalAccount
+from .helpers import gen_event
+import typing
+
+
+def test_route_payments():
+    receiver = LocalAccount.generate().account_address.to_hex()
+    registry = identifier.SubaddressRegistry()
+    alice, bob = registry.allocate(1), registry.allocate(2)
+    reference_ids = {"ref-id": 2}
+
+    received: typing.Dict[typing.Optional[int], typing.List[payment_router.IncomingPayment]] = {}
+    router = payment_router.PaymentRouter(
+        registry.find_user_id,
+        receiver=receiver,
+        default_handler=lambda payment: received.setdefault(None, []).append(payment),
+        find_travel_rule_user_id=reference_ids.get,
+    )
+    router.add_handler(1, lambda payment: received.setdefault(1, []).append(payment))
+    router.add_handler(2, lambda payment: received.setdefault(2, []).append(payment))
+
+    sender_address = LocalAccount.generate().account_address
+    events = [
+        gen_event(receiver, txnmetadata.general_metadata(identifier.gen_subaddress(), alice)),
+        gen_event(receiver, txnmetadata.general_metadata(None, bob, 5)),
+        gen_event(receiver, txnmetadata.travel_rule("ref-id", sender_address, 100)[0]),
+        gen_event(receiver, txnmetadata.general_metadata(None, identifier.gen_subaddress())),
+        gen_event(receiver, b""),
+        gen_event(receiver, b"invalid"),
+        gen_event(receiver, txnmetadata.general_metadata(None, alice), event_type="sentpayment"),
+        gen_event(LocalAccount.generate().account_address.to_hex(), txnmetadata.general_metadata(None, alice)),
+    ]
+    payments = router.route(events)
+
+    assert [p.payment_type for p in payments] == [
+        payment_router.PAYMENT_TYPE_GENERAL,
+        payment_router.PAYMENT_TYPE_REFUND,
+        payment_router.PAYMENT_TYPE_TRAVEL_RULE,
+        payment_router.PAYMENT_TYPE_GENERAL,
+        payment_router.PAYMENT_TYPE_UNKNOWN,
+        payment_router.PAYMENT_TYPE_UNKNOWN,
+    ]
+    assert [p.user_id for p in payments] == [1, 2, 2, None, None, None]
+    assert payments[0].to_subaddress == alice
+    assert payments[0].metadata == txnmetadata.decode_metadata(bytes.fromhex(events[0].data.metadata))
+    assert payments[0].amount == 100
+    assert payments[0].currency == "XUS"
+    assert payments[0].sender == events[0].data.sender
+    assert payments[4].metadata is None
+    assert payments[5].metadata is None
+
+    assert received[1] == payments[:1]
+    assert received[2] == payments[1:3]
+    assert received[None] == payments[3:]
+
+    metrics = router.metrics
+    assert metrics.get("diem_payment_router_payments_total").value(type="general") == 2
+    assert metrics.get("diem_payment_router_payments_total").value(type="unknown") == 2
+    assert metrics.get("diem_payment_router_dispatched_total").value(result="handled") == 6
+    assert metrics.get("diem_payment_router_skipped_events_total").value() == 2
+    assert router.throughput() > 0
+
+
+def test_unhandled_payments():
+    router = payment_router.PaymentRouter(lambda subaddress: 1)
+    assert router.throughput() == 0
+
+    receiver = LocalAccount.generate().account_address.to_hex()
+    payments = router.route([gen_event(receiver, txnmetadata.general_metadata(None, identifier.gen_subaddress()))])
+    assert payments[0].user_id == 1
+    assert router.metrics.get("diem_payment_router_dispatched_total").value(result="unhandled") == 1
+
+    received = []
+    router.add_handler(1, received.append)
+    router.route([gen_event(receiver, txnmetadata.general_metadata(None, identifier.gen_subaddress()))])
+    assert len(received) == 1
+
+    router.remove_handler(1)
+    router.route([gen_event(receiver, txnmetadata.general_metadata(None, identifier.gen_subaddress()))])
+    assert len(received) == 1
+    assert router.metrics.get("diem_payment_router_dispatched_total").value(result="unhandled") == 2
+    assert router.route([]) == []
@@ -0,0 +1,128 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import jsonrpc
+from concurrent.futures import ThreadPoolExecutor
+import pytest, threading, time
+
+
+def test_method_class():
+    assert jsonrpc.rate_limit.method_class("submit") == jsonrpc.SUBMIT
+    assert jsonrpc.rate_limit.method_class("get_account") == jsonrpc.READ
+
+
+def test_invalid_limit():
+    with pytest.raises(ValueError):
+        jsonrpc.Governor(jsonrpc.Limit(requests_per_sec=0, burst=1, max_in_flight=1))
+
+
+def test_token_bucket_queues_requests_exceeding_rate():
+    governor = jsonrpc.Governor(jsonrpc.Limit(requests_per_sec=50, burst=2, max_in_flight=10))
+    start = time.time()
+    for _ in range(7):
+        with governor.acquired():
+            pass
+    # 2 burst tokens, then 5 tokens refilled in 0.1 second
+    assert time.time() - start >= 0.09
+    assert governor.in_flight == 0
+
+
+def test_max_in_flight_requests():
+    limiter = jsonrpc.RateLimiter(read=jsonrpc.Limit(requests_per_sec=1000, burst=100, max_in_flight=2))
+    lock = threading.Lock()
+    in_flight = []
+    queue_depths = []
+
+    def send():
+        with limiter.acquire("url", "get_account"):
+            with lock:
+                in_flight.append(limiter.stats()[("url", jsonrpc.READ)][1])
+                queue_depths.append(limiter.queue_depth())
+            time.sleep(0.02)
+
+    with ThreadPoolExecutor(8) as executor:
+        for _ in range(16):
+            executor.submit(send)
+
+    assert max(in_flight) == 2
+    assert max(queue_depths) > 0
+    assert limiter.queue_depth() == 0
+    assert limiter.queue_depth("url", jsonrpc.READ) == 0
+
+
+def test_waiting_requests_are_served_in_fifo_order():
+    governor = jsonrpc.Governor(jsonrpc.Limit(requests_per_sec=1000, burst=100, max_in_flight=1))
+    order = []
+
+    def send(i):
+        with governor.acquired():
+            order.append(i)
+
+    governor.acquire()
+    threads = []
+    for i in range(5):
+        t = threading.Thread(target=send, args=(i,))
+        t.start()
+        threads.append(t)
+        # wait for the request queued before starting next one
+        while governor.queue_depth < i + 1:
+            time.sleep(0.001)
+    governor.release()
+    for t in threads:
+        t.join()
+    assert order == list(range(5))
+    assert governor.queue_depth == 0
+
+
+def test_queue_depth_gauge():
+    registry = jsonrpc.MetricsRegistry()
+    limiter = jsonrpc.RateLimiter(
+        read=jsonrpc.Limit(requests_per_sec=1000, burst=100, max_in_flight=1), metrics=registry
+    )
+    gauge = registry.get("diem_jsonrpc_rate_limit_queue_depth")
+    depths = []
+
+    def send():
+        with limiter.acquire("url", "get_account"):
+            pass
+
+    with limiter.acquire("url", "get_account"):
+        t = threading.Thread(target=send)
+        t.start()
+        while limiter.queue_depth() == 0:
+            time.sleep(0.001)
+        depths.append(gauge.value(url="url", method_class=jsonrpc.READ))
+    t.join()
+    depths.append(gauge.value(url="url", method_class=jsonrpc.READ))
+    assert depths == [1, 0]
+    assert "# TYPE diem_jsonrpc_rate_limit_queue_depth gauge" in registry.expose()
+
+
+def test_limits_by_endpoint_and_method_class():
+    limiter = jsonrpc.RateLimiter(read=jsonrpc.Limit(requests_per_sec=1000, burst=10, max_in_flight=1))
+    with limiter.acquire("url", "get_account"):
+        # submit is not limited
+        with limiter.acquire("url", "submit"):
+            pass
+        # another endpoint has its own limit
+        with limiter.acquire("backup", "get_account"):
+            pass
+    assert limiter.governor("url", jsonrpc.SUBMIT) is None
+    assert set(limiter.stats().keys()) == {("url", jsonrpc.READ), ("backup", jsonrpc.READ)}
+
+
+def test_client_with_rate_limiter():
+    limiter = jsonrpc.RateLimiter(read=jsonrpc.Limit(requests_per_sec=1000, burst=10, max_in_flight=1))
+    client = jsonrpc.Client("http://url", rate_limiter=limiter)
+    in_flight = []
+
+    class Session:
+        def post(self, url, json, timeout):
+            in_flight.append(limiter.stats()[(url, jsonrpc.READ)][1])
+            raise jsonrpc.NetworkError("error")
+
+    client._session = Session()
+    with pytest.raises(jsonrpc.NetworkError):
+        client.get_currencies()
+    assert in_flight == [1]
+    assert limiter.stats()[("http://url", jsonrpc.READ)] == (0, 0)
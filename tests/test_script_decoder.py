@@ -0,0 +1,78 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import script_decoder, stdlib, utils, jsonrpc, LocalAccount
+import hashlib
+
+P2P = stdlib.ScriptCall__PeerToPeerWithMetadata
+
+
+def gen_p2p_script() -> bytes:
+    return stdlib.encode_peer_to_peer_with_metadata_script(
+        currency=utils.currency_code("Coin1"),
+        payee=LocalAccount.generate().account_address,
+        amount=123,  # pyre-ignore
+        metadata=b"metadata",
+        metadata_signature=b"",
+    ).lcs_serialize()
+
+
+def test_all_stdlib_scripts_are_indexed():
+    registry = script_decoder.ScriptRegistry()
+    known = registry.known_scripts()
+    assert len(known) == len(stdlib.SCRIPT_DECODER_MAP)
+    for script in known:
+        assert issubclass(script.type, stdlib.ScriptCall)
+        assert registry.classify_hash(script.hash) == script.type
+
+
+def test_classify():
+    registry = script_decoder.ScriptRegistry()
+    script = gen_p2p_script()
+    assert registry.classify(script) == P2P
+    assert registry.classify(script.hex()) == P2P
+
+    add_currency = stdlib.encode_add_currency_to_account_script(utils.currency_code("Coin1")).lcs_serialize()
+    assert registry.classify(add_currency) == stdlib.ScriptCall__AddCurrencyToAccount
+
+    assert registry.classify(b"\x04code\x00\x00") is None
+    assert registry.classify(b"") is None
+    assert registry.classify(b"\xff\xff\xff\xff\xff\xff") is None
+    # same length with p2p script code, but different code bytes
+    code = stdlib.PEER_TO_PEER_WITH_METADATA_CODE
+    assert registry.classify(script.replace(code, code[:-1] + b"\x00")) is None
+
+
+def test_decode_only_requested_types():
+    registry = script_decoder.ScriptRegistry()
+    script = gen_p2p_script()
+
+    call = registry.decode(script)
+    assert call == utils.decode_transaction_script(script.hex())
+    assert registry.decode(script, types=[P2P]) == call
+    assert registry.decode(script, types={stdlib.ScriptCall__AddCurrencyToAccount}) is None
+    assert registry.decode(b"\x04code\x00\x00") is None
+
+
+def test_decode_transaction():
+    registry = script_decoder.default_registry()
+    assert registry is script_decoder.default_registry()
+    script = gen_p2p_script()
+    code_hash = hashlib.sha3_256(stdlib.PEER_TO_PEER_WITH_METADATA_CODE).hexdigest()
+
+    txn = jsonrpc.Transaction(transaction=jsonrpc.TransactionData(script_hash=code_hash, script_bytes=script.hex()))
+    assert registry.classify_transaction(txn) == P2P
+    assert registry.decode_transaction(txn, types=[P2P]).amount == 123
+    assert registry.decode_transaction(txn, types=[stdlib.ScriptCall__Burn]) is None
+
+    # no script hash
+    data = jsonrpc.TransactionData(script_bytes=script.hex())
+    assert registry.classify_transaction(data) == P2P
+    assert registry.decode_transaction(data).metadata == b"metadata"
+
+    assert registry.classify_transaction(jsonrpc.TransactionData(type="blockmetadata")) is None
+    assert registry.decode_transaction(jsonrpc.TransactionData(type="blockmetadata")) is None
+
+
+def test_script_type():
+    assert script_decoder.script_type(stdlib.decode_peer_to_peer_with_metadata_script) == P2P
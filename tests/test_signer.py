@@ -0,0 +1,178 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import LocalAccount, Signer
+from diem.signer import BatchingSigner, RemoteSigner, SignerServer, SignerError
+from .helpers import gen_raw_transaction
+from concurrent.futures import ThreadPoolExecutor
+import asyncio, pytest, socket, threading
+
+
+@pytest.fixture
+def account() -> LocalAccount:
+    return LocalAccount.generate()
+
+
+@pytest.fixture
+def server(account: LocalAccount):
+    server = SignerServer(("localhost", 0), account)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_local_account_is_signer(account):
+    assert isinstance(account, Signer)
+    txns = [gen_raw_transaction(account, seq) for seq in range(3)]
+    assert Signer.sign_many(account, txns) == [account.sign(txn) for txn in txns]
+    assert Signer.sign(account, txns[0]) == account.sign(txns[0])
+
+
+def test_remote_signer(account, server):
+    remote = RemoteSigner(server.server_address)
+    assert remote.public_key_bytes == account.public_key_bytes
+
+    txns = [gen_raw_transaction(account, seq) for seq in range(5)]
+    assert remote.sign(txns[0]) == account.sign(txns[0])
+
+    num_requests = server.num_requests
+    assert remote.sign_many(txns) == [account.sign(txn) for txn in txns]
+    assert server.num_requests == num_requests + 1
+    remote.close()
+
+    # reconnects after closed
+    assert remote.sign(txns[1]) == account.sign(txns[1])
+    remote.close()
+
+
+class FailingSigner(Signer):
+    def __init__(self, signatures=None):
+        self.signatures = signatures
+
+    @property
+    def public_key_bytes(self):
+        return b"\0" * 32
+
+    def sign_message(self, msg):
+        raise ValueError("failed")
+
+    def sign_messages(self, msgs):
+        if self.signatures is None:
+            raise ValueError("failed")
+        return self.signatures
+
+
+def test_signer_is_abstract():
+    with pytest.raises(TypeError):
+        Signer()
+
+    class IncompleteSigner(Signer):
+        def sign_message(self, msg):
+            return b""
+
+    with pytest.raises(TypeError):
+        IncompleteSigner()
+
+
+def test_remote_signer_error(server):
+    server.signer = FailingSigner()
+    remote = RemoteSigner(server.server_address)
+    with pytest.raises(SignerError, match="ValueError: failed"):
+        remote.sign_message(b"msg")
+    remote.close()
+
+
+def test_remote_signer_closes_connection_closed_by_key_service():
+    listener = socket.create_server(("localhost", 0))
+
+    def serve():
+        conn, _ = listener.accept()
+        with conn:
+            conn.makefile("rb").readline()
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    remote = RemoteSigner(listener.getsockname(), timeout_secs=5)
+    conn = socket.create_connection(listener.getsockname())
+    remote._file = file = conn.makefile("rwb")
+    conn.close()
+    with pytest.raises(SignerError, match="closed connection"):
+        remote.sign_message(b"msg")
+    thread.join()
+    listener.close()
+    assert file.closed
+    assert remote._file is None
+
+
+def test_remote_signer_connection_error():
+    server = SignerServer(("localhost", 0), LocalAccount.generate())
+    address = server.server_address
+    server.server_close()
+
+    with pytest.raises(SignerError):
+        RemoteSigner(address, timeout_secs=1).sign_message(b"msg")
+
+
+def test_batching_signer(account, server):
+    remote = RemoteSigner(server.server_address)
+    batching = BatchingSigner(remote, max_batch_size=10, max_delay_secs=0.05)
+    txns = [gen_raw_transaction(account, seq) for seq in range(20)]
+
+    num_requests = server.num_requests
+    with ThreadPoolExecutor(20) as executor:
+        signed_txns = list(executor.map(batching.sign, txns))
+    assert signed_txns == [account.sign(txn) for txn in txns]
+    assert server.num_requests - num_requests < len(txns)
+
+    batching.close()
+    remote.close()
+
+
+def test_batching_signer_async(account, server):
+    remote = RemoteSigner(server.server_address)
+    batching = BatchingSigner(remote, max_batch_size=10, max_delay_secs=0.05)
+    txns = [gen_raw_transaction(account, seq) for seq in range(10)]
+
+    async def sign_all():
+        return await asyncio.gather(*[batching.sign_async(txn) for txn in txns])
+
+    num_requests = server.num_requests
+    assert asyncio.run(sign_all()) == [account.sign(txn) for txn in txns]
+    # public key was fetched before, all messages are signed in one batch
+    assert server.num_requests == num_requests + 1
+
+    batching.close()
+    remote.close()
+
+
+def test_batching_signer_error():
+    batching = BatchingSigner(FailingSigner())
+    with pytest.raises(ValueError, match="failed"):
+        batching.sign_message(b"msg")
+    batching.close()
+
+
+def test_batching_signer_fails_all_requests_if_signatures_are_missing():
+    batching = BatchingSigner(FailingSigner(signatures=[b"sig"]), max_batch_size=3, max_delay_secs=0.05)
+    futures = [batching.submit(msg) for msg in [b"a", b"b", b"c"]]
+    for future in futures:
+        with pytest.raises(SignerError, match="expected 3 signatures, but got 1"):
+            future.result(timeout=5)
+    batching.close()
+
+
+def test_batching_signer_rejects_messages_after_close():
+    batching = BatchingSigner(FailingSigner(signatures=[b"sig"]))
+    assert batching.sign_message(b"msg") == b"sig"
+    batching.close()
+    batching.close()
+    with pytest.raises(SignerError, match="closed"):
+        batching.submit(b"msg")
+    with pytest.raises(SignerError, match="closed"):
+        batching.sign_message(b"msg")
+
+
+def test_default_async_sign(account):
+    txn = gen_raw_transaction(account, 0)
+    assert asyncio.run(Signer.sign_async(account, txn)) == account.sign(txn)
@@ -0,0 +1,115 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import identifier, InvalidSubAddressError
+from diem.identifier import SubaddressRegistry
+import os, pytest, threading, typing
+
+
+def test_allocate_and_find_user_id():
+    registry = SubaddressRegistry(capacity=4)
+    assert registry.capacity == 4
+    subaddresses = [registry.allocate(i) for i in range(100)]
+    assert len(set(subaddresses)) == 100
+    assert len(registry) == 100
+    assert registry.capacity >= 100
+
+    for i, subaddress in enumerate(subaddresses):
+        assert len(subaddress) == identifier.DIEM_SUBADDRESS_SIZE
+        assert registry.find_user_id(subaddress) == i
+        assert registry.find_user_id(subaddress.hex()) == i
+        assert subaddress in registry
+    assert registry.find_user_id(identifier.gen_subaddress()) is None
+    assert registry.find_user_id(identifier.DIEM_ZERO_SUBADDRESS) is None
+    assert sorted(registry.items(), key=lambda item: item[1]) == [(s, i) for i, s in enumerate(subaddresses)]
+
+
+def test_register():
+    registry = SubaddressRegistry()
+    registry.register("cf64428bdeb62af2", 2 ** 64 - 1)
+    assert registry.find_user_id(bytes.fromhex("cf64428bdeb62af2")) == 2 ** 64 - 1
+
+    with pytest.raises(ValueError, match="registered"):
+        registry.register("cf64428bdeb62af2", 1)
+    with pytest.raises(ValueError, match="zero"):
+        registry.register(identifier.DIEM_ZERO_SUBADDRESS, 1)
+    with pytest.raises(ValueError, match="user id"):
+        registry.register(identifier.gen_subaddress(), -1)
+    with pytest.raises(ValueError, match="user id"):
+        registry.allocate(2 ** 64)
+    with pytest.raises(InvalidSubAddressError):
+        registry.register(b"123", 1)
+    with pytest.raises(InvalidSubAddressError):
+        registry.find_user_id(b"123")
+    assert len(registry) == 1
+
+
+def test_save_and_load(tmp_path):
+    registry = SubaddressRegistry()
+    subaddresses = [registry.allocate(i) for i in range(50)]
+    path = str(tmp_path / "registry.bin")
+    registry.save(path)
+
+    loaded = SubaddressRegistry.load(path)
+    assert len(loaded) == 50
+    assert loaded.capacity == registry.capacity
+    assert [loaded.find_user_id(s) for s in subaddresses] == list(range(50))
+
+    # loaded registry is a copy in memory
+    loaded.allocate(50)
+    assert len(SubaddressRegistry.load(path)) == 50
+
+    with open(str(tmp_path / "invalid.bin"), "wb") as f:
+        f.write(b"hello world")
+    with pytest.raises(ValueError, match="invalid sub-address registry file"):
+        SubaddressRegistry.load(str(tmp_path / "invalid.bin"))
+
+
+def test_memory_mapped_registry(tmp_path):
+    path = str(tmp_path / "registry.bin")
+    registry = SubaddressRegistry(capacity=2, path=path)
+    assert os.path.exists(path)
+
+    # grows the file
+    subaddresses = [registry.allocate(i) for i in range(20)]
+    registry.flush()
+    assert os.listdir(str(tmp_path)) == ["registry.bin"]
+
+    reopened = SubaddressRegistry(path=path)
+    assert len(reopened) == 20
+    assert [reopened.find_user_id(s) for s in subaddresses] == list(range(20))
+    assert [SubaddressRegistry.load(path).find_user_id(s) for s in subaddresses] == list(range(20))
+
+    # changes are written to the file
+    subaddress = reopened.allocate(20)
+    reopened.flush()
+    assert SubaddressRegistry(path=path).find_user_id(subaddress) == 20
+
+
+def test_find_user_id_while_growing():
+    registry = SubaddressRegistry(capacity=2)
+    allocated: typing.List[bytes] = [registry.allocate(0)]
+    done = threading.Event()
+    errors: typing.List[str] = []
+
+    def lookup() -> None:
+        while not done.is_set():
+            # sub-addresses allocated before this snapshot must be found while the table grows
+            for user_id, subaddress in enumerate(list(allocated)):
+                if registry.find_user_id(subaddress) != user_id:
+                    errors.append(f"user {user_id} not found by {subaddress.hex()}")
+
+    threads = [threading.Thread(target=lookup) for _ in range(4)]
+    for t in threads:
+        t.start()
+    try:
+        for user_id in range(1, 20_000):
+            allocated.append(registry.allocate(user_id))
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+
+    assert errors == []
+    assert len(registry) == len(allocated)
+    assert sorted(user_id for _, user_id in registry.items()) == list(range(len(allocated)))
@@ -0,0 +1,110 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import diem_types, chain_ids, stdlib, txnbuilder, utils, LocalAccount
+import pytest
+from .helpers import gen_raw_transaction
+
+
+def gen_builder(account: LocalAccount) -> txnbuilder.TransactionBuilder:
+    template = txnbuilder.TransactionTemplate(
+        sender=account.account_address, chain_id=chain_ids.TESTING, currency="Coin1", expiration_secs=30
+    )
+    return txnbuilder.TransactionBuilder(template, clock=lambda: 1611792846.5)
+
+
+def test_build_matches_raw_transaction_lcs_serialize():
+    account = LocalAccount.generate()
+    builder = gen_builder(account)
+    txn = gen_raw_transaction(account, 7)
+
+    raw_txn = builder.build(7, txn.payload.value)
+    assert raw_txn == txn.lcs_serialize()
+    assert diem_types.RawTransaction.lcs_deserialize(raw_txn) == txn
+    assert builder.build(7, txn.payload.value, expiration_timestamp_secs=123) != raw_txn
+
+
+def test_peer_to_peer_with_metadata():
+    account = LocalAccount.generate()
+    payee = LocalAccount.generate().account_address
+    builder = gen_builder(account)
+
+    raw_txn = builder.peer_to_peer_with_metadata(
+        2**40, payee, 1_000_000, metadata=b"meta", metadata_signature=b"s" * 64
+    )
+    expected = diem_types.RawTransaction(  # pyre-ignore
+        sender=account.account_address,
+        sequence_number=diem_types.st.uint64(2**40),
+        payload=diem_types.TransactionPayload__Script(
+            value=stdlib.encode_peer_to_peer_with_metadata_script(
+                currency=utils.currency_code("Coin1"),
+                payee=payee,
+                amount=diem_types.st.uint64(1_000_000),
+                metadata=b"meta",
+                metadata_signature=b"s" * 64,
+            )
+        ),
+        max_gas_amount=diem_types.st.uint64(1_000_000),
+        gas_unit_price=diem_types.st.uint64(0),
+        gas_currency_code="Coin1",
+        expiration_timestamp_secs=diem_types.st.uint64(1611792876),
+        chain_id=chain_ids.TESTING,
+    )
+    assert raw_txn == expected.lcs_serialize()
+
+
+def test_sign():
+    account = LocalAccount.generate()
+    builder = gen_builder(account)
+    txns = [gen_raw_transaction(account, seq) for seq in range(3)]
+    raw_txns = [builder.build(txn.sequence_number, txn.payload.value) for txn in txns]
+
+    assert txnbuilder.signing_msg(raw_txns[0]) == utils.raw_transaction_signing_msg(txns[0])
+    signed_txn = builder.sign(account, raw_txns[0])
+    assert signed_txn == account.sign(txns[0]).lcs_serialize()
+    assert builder.sign_many(account, raw_txns) == [account.sign(txn).lcs_serialize() for txn in txns]
+
+
+def test_uleb128():
+    assert utils.uleb128(0) == b"\x00"
+    assert utils.uleb128(127) == b"\x7f"
+    assert utils.uleb128(128) == b"\x80\x01"
+    assert utils.uleb128(300) == b"\xac\x02"
+    assert utils.uleb128(2**32 - 1) == b"\xff\xff\xff\xff\x0f"
+
+
+def test_out_of_range_fields():
+    account = LocalAccount.generate()
+    builder = gen_builder(account)
+    payee = LocalAccount.generate().account_address
+
+    with pytest.raises(ValueError, match="sequence_number"):
+        builder.peer_to_peer_with_metadata(-1, payee, 1)
+    with pytest.raises(ValueError, match="sequence_number"):
+        builder.peer_to_peer_with_metadata(2**64, payee, 1)
+    with pytest.raises(ValueError, match="amount"):
+        builder.peer_to_peer_with_metadata(0, payee, 2**64)
+    with pytest.raises(ValueError, match="amount"):
+        builder.peer_to_peer_with_metadata_many(0, [payee], [-1])
+    with pytest.raises(ValueError, match="expiration_timestamp_secs"):
+        builder.peer_to_peer_with_metadata(0, payee, 1, expiration_timestamp_secs=-1)
+    with pytest.raises(ValueError, match="max_gas_amount"):
+        txnbuilder.TransactionTemplate(
+            sender=account.account_address, chain_id=chain_ids.TESTING, currency="Coin1", max_gas_amount=2**64
+        )
+    assert builder.peer_to_peer_with_metadata(2**64 - 1, payee, 2**64 - 1)
+
+
+def test_peer_to_peer_with_metadata_many():
+    account = LocalAccount.generate()
+    builder = gen_builder(account)
+    payees = [LocalAccount.generate().account_address for _ in range(3)]
+
+    raw_txns = builder.peer_to_peer_with_metadata_many(5, payees, [10, 20, 30], metadatas=[b"a", b"", b"c"])
+    assert raw_txns == [
+        builder.peer_to_peer_with_metadata(5 + i, payee, amount, metadata)
+        for i, (payee, amount, metadata) in enumerate(zip(payees, [10, 20, 30], [b"a", b"", b"c"]))
+    ]
+    txn = diem_types.RawTransaction.lcs_deserialize(raw_txns[2])
+    assert txn.sequence_number == 7
+    assert txn.payload.value.args[0].value == payees[2]
@@ -1,8 +1,8 @@
 # Copyright (c) The Diem Core Contributors
 # SPDX-License-Identifier: Apache-2.0
 
-import pytest
-from diem import utils, txnmetadata, jsonrpc, diem_types
+import pytest, typing
+from diem import utils, txnmetadata, jsonrpc, diem_types, serde_types
 
 
 def test_travel_rule_metadata():
@@ -18,6 +18,14 @@ def test_travel_rule_metadata():
     )
 
 
+def test_metadata_rejects_out_of_range_u64():
+    address = utils.account_address("f72589b71ff4f8d139674a3f7369c69b")
+    with pytest.raises(ValueError, match="amount"):
+        txnmetadata.travel_rule("ref", address, -1)
+    with pytest.raises(ValueError, match="referenced_event"):
+        txnmetadata.general_metadata(None, b"\x01" * 8, utils.U64_MAX + 1)
+
+
 def test_new_general_metadata_for_nones():
     ret = txnmetadata.general_metadata(None, None)
     assert ret == b""
@@ -43,6 +51,76 @@ def test_new_general_metadata_from_to_sub_address():
     assert ret.hex() == "01000108111111153010a11101088f8b82153010a1bd00"
 
 
+def test_decode_metadata():
+    subaddress = bytes.fromhex("8f8b82153010a1bd")
+    sender_address = utils.account_address("f72589b71ff4f8d139674a3f7369c69b")
+    metadatas = [
+        txnmetadata.general_metadata(subaddress, None),
+        txnmetadata.general_metadata(None, subaddress, 2 ** 64 - 1),
+        txnmetadata.general_metadata(subaddress, subaddress[:4], 0),
+        txnmetadata.travel_rule("ref", sender_address, 100)[0],
+        diem_types.Metadata__UnstructuredBytesMetadata(
+            value=diem_types.UnstructuredBytesMetadata(metadata=b"hello")
+        ).lcs_serialize(),
+    ]
+    for metadata in metadatas:
+        assert txnmetadata.decode_metadata(metadata) == diem_types.Metadata.lcs_deserialize(metadata)
+        assert txnmetadata.decode_metadata(metadata).lcs_serialize() == metadata
+
+    gmv0 = txnmetadata.decode_metadata(metadatas[1]).value.value
+    assert gmv0.to_subaddress == subaddress
+    assert gmv0.from_subaddress is None
+    assert gmv0.referenced_event == 2 ** 64 - 1
+
+    for invalid in [b"", b"\x01", b"\x01\x00", metadatas[0][:-1], metadatas[0] + b"\x00", metadatas[1][:-1]]:
+        with pytest.raises(ValueError):
+            txnmetadata.decode_metadata(invalid)
+
+
+def test_metadata_codecs_same_with_generic_serializer():
+    subaddress = bytes.fromhex("8f8b82153010a1bd")
+    sender_address = utils.account_address("f72589b71ff4f8d139674a3f7369c69b")
+    long_bytes = b"x" * 200
+
+    for from_subaddress, to_subaddress, referenced_event in [
+        (subaddress, None, None),
+        (None, subaddress, 2 ** 64 - 1),
+        (subaddress, subaddress, 0),
+        (long_bytes, b"", 5),
+    ]:
+        metadata = diem_types.Metadata__GeneralMetadata(
+            value=diem_types.GeneralMetadata__GeneralMetadataVersion0(
+                value=diem_types.GeneralMetadataV0(
+                    from_subaddress=from_subaddress,
+                    to_subaddress=to_subaddress,
+                    referenced_event=serde_types.uint64(referenced_event) if referenced_event else None,
+                )
+            )
+        )
+        encoded = txnmetadata.general_metadata(from_subaddress, to_subaddress, referenced_event)
+        assert encoded == metadata.lcs_serialize()
+        assert txnmetadata.decode_metadata(encoded) == metadata
+
+    for reference_id in ["ref-id", "", "é" * 100, None]:
+        metadata = diem_types.Metadata__TravelRuleMetadata(
+            value=diem_types.TravelRuleMetadata__TravelRuleMetadataVersion0(
+                value=diem_types.TravelRuleMetadataV0(off_chain_reference_id=reference_id)
+            )
+        )
+        attest = txnmetadata.Attest(
+            metadata=metadata, sender_address=sender_address, amount=serde_types.uint64(2 ** 64 - 1)
+        )
+        encoded, signing_msg = txnmetadata.travel_rule(reference_id, sender_address, 2 ** 64 - 1)
+        assert encoded == metadata.lcs_serialize()
+        assert signing_msg == attest.lcs_serialize() + b"@@$$LIBRA_ATTEST$$@@"
+        assert txnmetadata.travel_rule_signing_msg(encoded, sender_address.to_hex(), 2 ** 64 - 1) == signing_msg
+        assert txnmetadata.decode_metadata(encoded) == metadata
+
+    # invalid utf-8 string
+    with pytest.raises(ValueError):
+        txnmetadata.decode_metadata(bytes.fromhex("02000101ff"))
+
+
 def test_find_refund_reference_event():
     # None for no transaction given
     assert txnmetadata.find_refund_reference_event(None, None) is None
@@ -63,6 +141,48 @@ def test_find_refund_reference_event():
     assert event.data.receiver == "f72589b71ff4f8d139674a3f7369c69b"
 
 
+def test_refund_metadata_from_transactions():
+    receiver = "f72589b71ff4f8d139674a3f7369c69b"
+    other = "8f8b82153010a1bd8f8b82153010a1bd"
+    from_sub_address = utils.sub_address("8f8b82153010a1bd")
+    to_sub_address = utils.sub_address("111111153010a111")
+    metadata = txnmetadata.general_metadata(from_sub_address, to_sub_address)
+
+    def txn(*events: typing.Tuple[str, str, str, int]) -> jsonrpc.Transaction:
+        ret = jsonrpc.Transaction()
+        for event_type, event_receiver, event_metadata, seq in events:
+            ret.events.add(
+                data=jsonrpc.EventData(type=event_type, receiver=event_receiver, metadata=event_metadata),
+                sequence_number=seq,
+            )
+        return ret
+
+    txns = [
+        txn(("sentpayment", receiver, metadata.hex(), 1), ("receivedpayment", receiver, metadata.hex(), 2)),
+        None,
+        txn(("receivedpayment", other, metadata.hex(), 3)),
+        txn(("receivedpayment", receiver, "", 4)),
+        txn(("receivedpayment", receiver, "invalid", 5)),
+        txn(("receivedpayment", receiver, metadata.hex(), 6), ("receivedpayment", receiver, "", 7)),
+    ]
+
+    index = txnmetadata.index_received_payment_events(txns)
+    assert {address: sorted(events) for address, events in index.items()} == {receiver: [0, 3, 4, 5], other: [2]}
+    for i in [0, 3, 5]:
+        assert index[receiver][i] == txnmetadata.find_refund_reference_event(txns[i], receiver)
+
+    ret = txnmetadata.refund_metadata_from_transactions(txns, utils.account_address(receiver))
+    assert len(ret) == len(txns)
+    assert ret[0] == txnmetadata.general_metadata(to_sub_address, from_sub_address, 2)
+    assert ret[1] is None
+    assert ret[2] is None
+    assert ret[3] == b""
+    assert isinstance(ret[4], txnmetadata.InvalidEventMetadataForRefundError)
+    assert ret[5] == txnmetadata.general_metadata(to_sub_address, from_sub_address, 6)
+
+    assert txnmetadata.refund_metadata_from_transactions([], receiver) == []
+
+
 def test_refund_metadata_from_event():
     from_sub_address = "8f8b82153010a1bd"
     to_sub_address = "111111153010a111"
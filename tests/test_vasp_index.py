@@ -0,0 +1,140 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import jsonrpc, vasp_index, LocalAccount
+from diem.testing import MockServer, Ledger
+import os, pytest, threading, typing
+
+
+def gen_address() -> str:
+    return LocalAccount.generate().account_address.to_hex()
+
+
+def gen_create_account_txn(
+    sender: str, created_address: str, role_id: int, vm_status: str = jsonrpc.VM_STATUS_EXECUTED
+) -> jsonrpc.Transaction:
+    return jsonrpc.Transaction(
+        transaction=jsonrpc.TransactionData(type=jsonrpc.TRANSACTION_DATA_USER, sender=sender),
+        vm_status=jsonrpc.VMStatus(type=vm_status),
+        events=[
+            jsonrpc.Event(data=jsonrpc.EventData(type=jsonrpc.EVENT_DATA_SENT_PAYMENT)),
+            jsonrpc.Event(
+                data=jsonrpc.EventData(
+                    type=jsonrpc.EVENT_DATA_CREATE_ACCOUNT, created_address=created_address, role_id=role_id
+                )
+            ),
+        ],
+    )
+
+
+def test_index_transactions():
+    index = vasp_index.VaspIndex()
+    root, parent, child, dd, failed = [gen_address() for _ in range(5)]
+    txns = [
+        gen_create_account_txn(root, parent, vasp_index.PARENT_VASP_ROLE_ID),
+        gen_create_account_txn(parent, child, vasp_index.CHILD_VASP_ROLE_ID),
+        gen_create_account_txn(root, dd, 2),
+        gen_create_account_txn(parent, failed, vasp_index.CHILD_VASP_ROLE_ID, jsonrpc.VM_STATUS_MOVE_ABORT),
+    ]
+    assert index.index_transactions(txns) == 2
+    assert len(index) == 2
+    assert index.find_parent_vasp_address(child) == parent
+    assert index.find_parent_vasp_address(parent) == parent
+    assert index.find_parent_vasp_address(dd) is None
+    assert failed not in index
+    assert "00" * 16 not in index
+
+    with pytest.raises(ValueError, match="not indexed"):
+        index.get_parent_vasp_address(dd)
+
+
+def test_add_and_grow():
+    index = vasp_index.VaspIndex(capacity=1)
+    parents = [gen_address() for _ in range(10)]
+    addresses = {gen_address(): parents[i % 10] for i in range(1000)}
+    for address, parent in addresses.items():
+        index.add(address, parent)
+    assert len(index) == len(addresses)
+    assert all(index.find_parent_vasp_address(address) == parent for address, parent in addresses.items())
+
+    address = next(iter(addresses))
+    index.add(address, parents[0])
+    assert len(index) == len(addresses)
+    assert index.find_parent_vasp_address(address) == parents[0]
+
+    with pytest.raises(ValueError):
+        index.add("00" * 16, parents[0])
+
+
+def test_find_while_growing():
+    index = vasp_index.VaspIndex(capacity=1)
+    parent = gen_address()
+    added: typing.List[str] = []
+    done = threading.Event()
+    errors: typing.List[str] = []
+
+    def lookup() -> None:
+        while not done.is_set():
+            for address in list(added):
+                if index.find_parent_vasp_address(address) != parent:
+                    errors.append(f"{address} not found")
+
+    threads = [threading.Thread(target=lookup) for _ in range(4)]
+    for t in threads:
+        t.start()
+    try:
+        for _ in range(5_000):
+            address = gen_address()
+            index.add(address, parent)
+            added.append(address)
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+
+    assert errors == []
+    assert len(index) == len(added)
+
+
+def test_memory_mapped_index(tmp_path):
+    path = str(tmp_path / "vasps.bin")
+    index = vasp_index.VaspIndex(capacity=2, path=path)
+    addresses = {gen_address(): gen_address() for _ in range(100)}
+    for address, parent in addresses.items():
+        index.add(address, parent)
+    index.flush()
+    assert not os.path.exists(f"{path}.tmp")
+
+    reopened = vasp_index.VaspIndex(path=path)
+    assert len(reopened) == len(addresses)
+    assert all(reopened.find_parent_vasp_address(address) == parent for address, parent in addresses.items())
+
+    with open(path, "r+b") as f:
+        f.write(b"\0" * 8)
+    with pytest.raises(ValueError, match="invalid VASP index file"):
+        vasp_index.VaspIndex(path=path)
+
+
+def test_get_parent_vasp_address_falls_back_to_client():
+    ledger = Ledger(versions_per_sec=0)
+    parent, child, dd = gen_address(), gen_address(), gen_address()
+    accounts: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+        parent: {"type": jsonrpc.ACCOUNT_ROLE_PARENT_VASP},
+        child: {"type": jsonrpc.ACCOUNT_ROLE_CHILD_VASP, "parent_vasp_address": parent},
+        dd: {"type": jsonrpc.ACCOUNT_ROLE_DESIGNATED_DEALER},
+    }
+    for address, role in accounts.items():
+        ledger.add_account({"address": address, "sequence_number": 0, "role": role})
+
+    with MockServer(ledger) as server:
+        index = vasp_index.VaspIndex(jsonrpc.Client(server.url))
+        assert index.get_parent_vasp_address(child) == parent
+        assert index.get_parent_vasp_address(child) == parent
+        assert server.num_requests["get_account"] == 1
+        assert index.get_parent_vasp_address(parent) == parent
+        assert server.num_requests["get_account"] == 2
+
+        with pytest.raises(ValueError, match="not a VASP account"):
+            index.get_parent_vasp_address(dd)
+        with pytest.raises(jsonrpc.AccountNotFoundError):
+            index.get_parent_vasp_address(gen_address())